@@ -6,66 +6,76 @@ from datetime import datetime, timedelta
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'sofahub_backend.settings')
 django.setup()
 
-from products.models import Category, Tag, Product, ProductVariation
+from products.models import RoomCategory, ProductType, Tag, Product, ProductVariation
 
 
 def create_categories():
-    """Create hierarchical categories for furniture"""
-    print("=== Creating Categories ===")
-
-    categories_data = [
-        # Main categories (no parent)
-        {"name": "Living Room", "slug": "living-room", "parent": None},
-        {"name": "Bedroom", "slug": "bedroom", "parent": None},
-        {"name": "Dining", "slug": "dining", "parent": None},
-        {"name": "Office", "slug": "office", "parent": None},
-        {"name": "Outdoor", "slug": "outdoor", "parent": None},
-
-        # Subcategories for Living Room
-        {"name": "Sofas", "slug": "sofas", "parent": "Living Room"},
-        {"name": "Chairs", "slug": "chairs", "parent": "Living Room"},
-        {"name": "Coffee Tables", "slug": "coffee-tables", "parent": "Living Room"},
-        {"name": "TV Stands", "slug": "tv-stands", "parent": "Living Room"},
-
-        # Subcategories for Bedroom
-        {"name": "Beds", "slug": "beds", "parent": "Bedroom"},
-        {"name": "Wardrobes", "slug": "wardrobes", "parent": "Bedroom"},
-        {"name": "Dressers", "slug": "dressers", "parent": "Bedroom"},
-
-        # Subcategories for Dining
-        {"name": "Dining Tables", "slug": "dining-tables", "parent": "Dining"},
-        {"name": "Dining Chairs", "slug": "dining-chairs", "parent": "Dining"},
-
-        # Sub-subcategories
-        {"name": "3-Seater Sofas", "slug": "3-seater-sofas", "parent": "Sofas"},
-        {"name": "2-Seater Sofas", "slug": "2-seater-sofas", "parent": "Sofas"},
-        {"name": "King Size Beds", "slug": "king-size-beds", "parent": "Beds"},
-        {"name": "Queen Size Beds", "slug": "queen-size-beds", "parent": "Beds"},
+    """Create room categories and product types for furniture"""
+    print("=== Creating Room Categories ===")
+
+    rooms_data = [
+        {"name": "Living Room", "slug": "living-room"},
+        {"name": "Bedroom", "slug": "bedroom"},
+        {"name": "Dining", "slug": "dining"},
+        {"name": "Office", "slug": "office"},
+        {"name": "Outdoor", "slug": "outdoor"},
+    ]
+
+    types_data = [
+        {"name": "Sofas", "slug": "sofas"},
+        {"name": "Chairs", "slug": "chairs"},
+        {"name": "Coffee Tables", "slug": "coffee-tables"},
+        {"name": "TV Stands", "slug": "tv-stands"},
+        {"name": "Beds", "slug": "beds"},
+        {"name": "Wardrobes", "slug": "wardrobes"},
+        {"name": "Dressers", "slug": "dressers"},
+        {"name": "Dining Tables", "slug": "dining-tables"},
+        {"name": "Dining Chairs", "slug": "dining-chairs"},
+        {"name": "3-Seater Sofas", "slug": "3-seater-sofas"},
+        {"name": "2-Seater Sofas", "slug": "2-seater-sofas"},
+        {"name": "King Size Beds", "slug": "king-size-beds"},
+        {"name": "Queen Size Beds", "slug": "queen-size-beds"},
     ]
 
     created_categories = {}
 
-    for cat_data in categories_data:
-        parent = None
-        if cat_data["parent"]:
-            parent = created_categories.get(cat_data["parent"])
+    for order, room_data in enumerate(rooms_data, start=1):
+        room, created = RoomCategory.objects.get_or_create(
+            slug=room_data["slug"],
+            defaults={
+                'name': room_data["name"],
+                'description': f"Beautiful furniture for your {room_data['name'].lower()}",
+                'order': order,
+                'is_active': True
+            }
+        )
+
+        if created:
+            print(f"✅ Created room category: {room_data['name']}")
+        else:
+            print(f"ℹ️ Room category exists: {room_data['name']}")
+
+        created_categories[room_data["name"]] = room
+
+    print("\n=== Creating Product Types ===")
 
-        category, created = Category.objects.get_or_create(
-            name=cat_data["name"],
+    for order, type_data in enumerate(types_data, start=1):
+        product_type, created = ProductType.objects.get_or_create(
+            slug=type_data["slug"],
             defaults={
-                'slug': cat_data["slug"],
-                'parent': parent,
-                'description': f"Beautiful {cat_data['name'].lower()} for your home",
+                'name': type_data["name"],
+                'description': f"Beautiful {type_data['name'].lower()} for your home",
+                'order': order,
                 'is_active': True
             }
         )
 
         if created:
-            print(f"✅ Created category: {cat_data['name']}")
+            print(f"✅ Created product type: {type_data['name']}")
         else:
-            print(f"ℹ️ Category exists: {cat_data['name']}")
+            print(f"ℹ️ Product type exists: {type_data['name']}")
 
-        created_categories[cat_data["name"]] = category
+        created_categories[type_data["name"]] = product_type
 
     return created_categories
 
@@ -239,11 +249,13 @@ def create_products(categories, tags):
         )
 
         if created:
-            # Add MULTIPLE categories
+            # Add MULTIPLE room categories and product types
             for cat_name in product_data["categories"]:
                 category = categories.get(cat_name)
-                if category:
-                    product.categories.add(category)
+                if isinstance(category, RoomCategory):
+                    product.room_categories.add(category)
+                elif isinstance(category, ProductType):
+                    product.product_types.add(category)
 
             # Add tags
             for tag_name in product_data["tags"]:
@@ -289,7 +301,8 @@ def main():
     # Summary
     print("=" * 60)
     print("📊 TEST DATA SUMMARY:")
-    print(f"📁 Categories: {len(categories)}")
+    print(f"📁 Room Categories: {RoomCategory.objects.count()}")
+    print(f"📂 Product Types: {ProductType.objects.count()}")
     print(f"🏷️ Tags: {len(tags)}")
     print(f"🛋️ Products: {len(products)}")
 
@@ -38,14 +38,14 @@ class BlogPostAdmin(admin.ModelAdmin):
         'status', 'is_featured', 'tags', 'author', 
         'published_at', 'created_at'
     ]
-    search_fields = ['title', 'excerpt', 'content']
+    search_fields = ['title', 'excerpt', 'search_text']
     prepopulated_fields = {'slug': ('title',)}
     autocomplete_fields = ['tags', 'related_products', 'related_categories']
-    readonly_fields = ['created_at', 'updated_at']
+    readonly_fields = ['content_format', 'reading_time', 'created_at', 'updated_at']
     
     fieldsets = [
         (None, {
-            'fields': ['title', 'slug', 'excerpt', 'content', 'author']
+            'fields': ['title', 'slug', 'excerpt', 'content', 'content_format', 'reading_time', 'author']
         }),
         ('Media', {
             'fields': ['featured_image', 'featured_image_alt']
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from blog.models import BlogPost
+from blog.search import rebuild_search_index
+
+RENDERED_FIELDS = ['content_format', 'rendered_content', 'search_text', 'reading_time']
+
+
+class Command(BaseCommand):
+    help = 'Backfill rendered content, search text and reading time for blog posts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--missing-only', action='store_true',
+                            help='Only process posts that have never been rendered')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = BlogPost.objects.only('id', 'content', *RENDERED_FIELDS).order_by('id')
+        if options['missing_only']:
+            queryset = queryset.filter(rendered_content='')
+
+        updated = 0
+        batch = []
+        for post in queryset.iterator(chunk_size=batch_size):
+            post.render_content()
+            batch.append(post)
+            if len(batch) >= batch_size:
+                BlogPost.objects.bulk_update(batch, RENDERED_FIELDS)
+                updated += len(batch)
+                batch = []
+        if batch:
+            BlogPost.objects.bulk_update(batch, RENDERED_FIELDS)
+            updated += len(batch)
+
+        # bulk_update skips signals, so refresh the SQLite search table in one go
+        if updated:
+            rebuild_search_index()
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Rendered {updated} blog post(s)"))
@@ -0,0 +1,37 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0003_blogpost_related_categories_blogpost_related_products'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='blogpost',
+            name='content_format',
+            field=models.CharField(choices=[('text', 'Plain text'), ('html', 'HTML')], default='text', editable=False, max_length=10),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='reading_time',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Estimated reading time in minutes.'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='rendered_content',
+            field=models.TextField(blank=True, editable=False, help_text='Sanitized HTML generated from content.'),
+        ),
+        migrations.AddField(
+            model_name='blogpost',
+            name='search_text',
+            field=models.TextField(blank=True, editable=False, help_text='Plain text of the content, used for search.'),
+        ),
+        migrations.AddIndex(
+            model_name='blogpost',
+            index=models.Index(fields=['status', '-published_at'], name='blog_blogpo_status_c0e87f_idx'),
+        ),
+    ]
@@ -0,0 +1,97 @@
+"""
+Full-text search index for blog posts.
+
+PostgreSQL: a weighted ``search_vector`` tsvector column (title A, excerpt B,
+body C) kept current by a trigger and covered by a GIN index.
+SQLite: an FTS5 table kept in sync by blog.signals.
+Other backends get nothing and blog.search falls back to icontains.
+"""
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "ALTER TABLE blog_blogpost ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION blog_blogpost_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('english', coalesce(NEW.excerpt, '')), 'B') ||
+            setweight(to_tsvector('english', coalesce(NEW.search_text, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER blog_blogpost_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, excerpt, search_text ON blog_blogpost
+    FOR EACH ROW EXECUTE FUNCTION blog_blogpost_search_vector_update()
+    """,
+    # Fire the trigger for existing rows
+    "UPDATE blog_blogpost SET title = title",
+    "CREATE INDEX blog_blogpost_search_vector_idx ON blog_blogpost USING GIN (search_vector)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS blog_blogpost_search_vector_idx",
+    "DROP TRIGGER IF EXISTS blog_blogpost_search_vector_trigger ON blog_blogpost",
+    "DROP FUNCTION IF EXISTS blog_blogpost_search_vector_update()",
+    "ALTER TABLE blog_blogpost DROP COLUMN IF EXISTS search_vector",
+]
+
+# A standalone FTS5 table rather than triggers: SQLite schema changes rebuild
+# blog_blogpost and would silently drop triggers, so blog.signals keeps it in sync.
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE blog_blogpost_fts USING fts5(
+        title, excerpt, search_text, tokenize='porter unicode61'
+    )
+    """,
+    """
+    INSERT INTO blog_blogpost_fts(rowid, title, excerpt, search_text)
+    SELECT id, title, excerpt, search_text FROM blog_blogpost
+    """,
+]
+
+SQLITE_REVERSE = [
+    "DROP TABLE IF EXISTS blog_blogpost_fts",
+]
+
+
+def _sqlite_has_fts5(connection):
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA compile_options")
+        options = {row[0] for row in cursor.fetchall()}
+    return 'ENABLE_FTS5' in options
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_FORWARD)
+    elif connection.vendor == 'sqlite' and _sqlite_has_fts5(connection):
+        _run(schema_editor, SQLITE_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_REVERSE)
+    elif vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0004_blogpost_rendered_content'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -3,7 +3,11 @@ from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.text import slugify
 from django.conf import settings
-import re
+from core.models import TrackedFieldsMixin
+from .utils import render_content
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class BlogTag(models.Model):
@@ -24,11 +28,15 @@ class BlogTag(models.Model):
         super().save(*args, **kwargs)
 
 
-class BlogPost(models.Model):
+class BlogPost(TrackedFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('draft', 'Draft'),
         ('published', 'Published'),
     ]
+    CONTENT_FORMAT_CHOICES = [
+        ('text', 'Plain text'),
+        ('html', 'HTML'),
+    ]
     
     title = models.CharField(max_length=200)
     slug = models.SlugField(blank=True, max_length=200, unique=True)
@@ -39,6 +47,28 @@ class BlogPost(models.Model):
     content = models.TextField(
         help_text='Blog post content. Can be plain text or HTML.'
     )
+    # Derived from content on save (see blog.utils.render_content)
+    content_format = models.CharField(
+        choices=CONTENT_FORMAT_CHOICES,
+        default='text',
+        editable=False,
+        max_length=10
+    )
+    rendered_content = models.TextField(
+        blank=True,
+        editable=False,
+        help_text='Sanitized HTML generated from content.'
+    )
+    search_text = models.TextField(
+        blank=True,
+        editable=False,
+        help_text='Plain text of the content, used for search.'
+    )
+    reading_time = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text='Estimated reading time in minutes.'
+    )
     featured_image = models.ImageField(
         blank=True, 
         null=True, 
@@ -84,10 +114,15 @@ class BlogPost(models.Model):
         help_text='Furniture categories this post supports.'
     )
     
+    tracked_fields = ('slug', 'featured_image', 'title', 'excerpt', 'content')
+
     class Meta:
         verbose_name = 'Blog Post'
         verbose_name_plural = 'Blog Posts'
         ordering = ['-published_at', '-created_at']
+        indexes = [
+            models.Index(fields=['status', '-published_at']),
+        ]
     
     def __str__(self):
         return self.title
@@ -111,20 +146,12 @@ class BlogPost(models.Model):
         if self.status == 'published' and not self.published_at:
             self.published_at = timezone.now()
         
+        if self.has_changed('content') or (self.content and not self.rendered_content):
+            self.render_content()
+
         # Only optimize when a new featured image is uploaded or changed.
         # Re-optimizing the same image on every edit can make admin saves slow.
-        should_optimize_image = False
-        if self.featured_image:
-            if not self.pk:
-                should_optimize_image = True
-            else:
-                old_image_name = (
-                    BlogPost.objects.filter(pk=self.pk)
-                    .values_list('featured_image', flat=True)
-                    .first()
-                )
-                current_image_name = getattr(self.featured_image, 'name', None)
-                should_optimize_image = str(old_image_name or '') != str(current_image_name or '')
+        should_optimize_image = bool(self.featured_image) and self.has_changed('featured_image')
 
         # Handle featured image optimization based on mode
         if self.featured_image and should_optimize_image:
@@ -147,20 +174,28 @@ class BlogPost(models.Model):
                     self.featured_image = optimize_image_async(self.featured_image, max_width=1920, max_height=1920, quality=85)
                 # If 'false' or any other value, no optimization
             except Exception as e:
-                print(f"⚠️ Blog image optimization failed: {e}")
+                logger.warning("Blog image optimization failed: %s", e)
         
         self.full_clean()
         super().save(*args, **kwargs)
     
+    def render_content(self):
+        """Recompute the fields derived from content"""
+        (
+            self.content_format,
+            self.rendered_content,
+            self.search_text,
+            self.reading_time,
+        ) = render_content(self.content)
+
     @property
     def is_published(self):
         return self.status == 'published' and self.published_at is not None
     
     def is_html_content(self):
         """Check if content contains HTML tags"""
-        html_pattern = re.compile(r'<[^>]+>')
-        return bool(html_pattern.search(self.content))
+        return self.content_format == 'html'
     
     def get_content_type(self):
         """Return 'html' or 'text' based on content"""
-        return 'html' if self.is_html_content() else 'text'
+        return self.content_format
@@ -0,0 +1,132 @@
+"""
+Full-text search over blog posts.
+
+The index itself is created by blog migration 0005: a weighted tsvector
+column on PostgreSQL, an FTS5 table on SQLite. Matching and ranking happen in
+the same query that loads the posts; other backends fall back to icontains.
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, Count, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+SQLITE_FTS_TABLE = 'blog_blogpost_fts'
+# bm25 column weights for title, excerpt, search_text (mirrors the A/B/C weights on PostgreSQL)
+SQLITE_FTS_WEIGHTS = (10.0, 4.0, 1.0)
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+_sqlite_index_present = {}
+
+
+def search_backend(using='default'):
+    """'postgresql', 'sqlite' or None when no full-text index is available"""
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        return 'postgresql'
+    if connection.vendor == 'sqlite':
+        if using not in _sqlite_index_present:
+            _sqlite_index_present[using] = SQLITE_FTS_TABLE in connection.introspection.table_names()
+        return 'sqlite' if _sqlite_index_present[using] else None
+    return None
+
+
+def search_posts(queryset, query):
+    """
+    Restrict a BlogPost queryset to posts matching ``query``, annotated with
+    ``search_rank`` and ordered best match first.
+    """
+    terms = TOKEN_RE.findall(query or '')
+    if not terms:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    backend = search_backend(queryset.db)
+    if backend == 'postgresql':
+        tsquery = "websearch_to_tsquery('english', %s)"
+        match = RawSQL(f"blog_blogpost.search_vector @@ {tsquery}", [query], output_field=BooleanField())
+        rank = RawSQL(f"ts_rank_cd(blog_blogpost.search_vector, {tsquery})", [query], output_field=FloatField())
+    elif backend == 'sqlite':
+        # Quote every term so FTS5 operators in user input are treated as text; prefix-match each one
+        fts_query = ' '.join('"{}"*'.format(term) for term in terms)
+        weights = ', '.join(str(weight) for weight in SQLITE_FTS_WEIGHTS)
+        match = RawSQL(
+            f"blog_blogpost.id IN (SELECT rowid FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH %s)",
+            [fts_query],
+            output_field=BooleanField(),
+        )
+        rank = RawSQL(
+            f"SELECT -bm25({SQLITE_FTS_TABLE}, {weights}) FROM {SQLITE_FTS_TABLE} "
+            f"WHERE {SQLITE_FTS_TABLE} MATCH %s AND rowid = blog_blogpost.id",
+            [fts_query],
+            output_field=FloatField(),
+        )
+    else:
+        condition = Q()
+        for term in terms:
+            condition &= Q(title__icontains=term) | Q(excerpt__icontains=term) | Q(search_text__icontains=term)
+        return queryset.filter(condition).annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    return (
+        queryset
+        .alias(search_match=match)
+        .filter(search_match=True)
+        .annotate(search_rank=rank)
+        .order_by('-search_rank', '-published_at')
+    )
+
+
+def _facet(queryset, relation):
+    rows = (
+        queryset.filter(**{f'{relation}__isnull': False})
+        .values(f'{relation}__slug', f'{relation}__name')
+        .annotate(post_count=Count('pk', distinct=True))
+        .order_by('-post_count', f'{relation}__name')
+    )
+    return [
+        {'slug': row[f'{relation}__slug'], 'name': row[f'{relation}__name'], 'post_count': row['post_count']}
+        for row in rows
+    ]
+
+
+def facet_counts(queryset):
+    """Number of posts in ``queryset`` per tag and per related category"""
+    # Grouped over the search queryset itself: nesting it as a subquery would
+    # re-alias blog_blogpost and break the raw match/rank SQL.
+    queryset = queryset.order_by()
+    return {
+        'tags': _facet(queryset, 'tags'),
+        'categories': _facet(queryset, 'related_categories'),
+    }
+
+
+def index_post(post):
+    """Refresh a post's SQLite FTS row (PostgreSQL keeps its index current with a trigger)"""
+    using = post._state.db or 'default'
+    if search_backend(using) != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s", [post.pk])
+        cursor.execute(
+            f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, excerpt, search_text) VALUES (%s, %s, %s, %s)",
+            [post.pk, post.title, post.excerpt, post.search_text],
+        )
+
+
+def unindex_post(post_id, using='default'):
+    if search_backend(using) != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s", [post_id])
+
+
+def rebuild_search_index(using='default'):
+    """Repopulate the SQLite FTS table from blog_blogpost (after bulk updates)"""
+    if search_backend(using) != 'sqlite':
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"DELETE FROM {SQLITE_FTS_TABLE}")
+        cursor.execute(
+            f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, excerpt, search_text) "
+            "SELECT id, title, excerpt, search_text FROM blog_blogpost"
+        )
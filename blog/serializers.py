@@ -1,15 +1,36 @@
 from rest_framework import serializers
 from .models import BlogPost, BlogTag
 from django.contrib.auth.models import User
+from core.compiled import CompiledSerializerMixin
+from core.fieldsets import SparseFieldsetMixin
 
 
-class BlogTagSerializer(serializers.ModelSerializer):
+RELATED_PRODUCTS_LIMIT = 6
+
+
+def active_related_products(obj):
+    """Active related products, from the view's Prefetch when available"""
+    products = getattr(obj, 'active_related_products', None)
+    if products is None:
+        products = obj.related_products.filter(is_active=True).order_by('id')
+    return list(products[:RELATED_PRODUCTS_LIMIT])
+
+
+def active_related_categories(obj):
+    """Active related categories, from the view's Prefetch when available"""
+    categories = getattr(obj, 'active_related_categories', None)
+    if categories is None:
+        categories = obj.related_categories.filter(is_active=True)
+    return categories
+
+
+class BlogTagSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = BlogTag
         fields = ['id', 'name', 'slug', 'color']
 
 
-class BlogAuthorSerializer(serializers.ModelSerializer):
+class BlogAuthorSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     name = serializers.CharField(source='get_full_name')
     
     class Meta:
@@ -26,19 +47,23 @@ class BlogAuthorSerializer(serializers.ModelSerializer):
         return data
 
 
-class BlogPostListSerializer(serializers.ModelSerializer):
+class BlogPostListSerializer(SparseFieldsetMixin, CompiledSerializerMixin, serializers.ModelSerializer):
     author = BlogAuthorSerializer(read_only=True)
     tags = BlogTagSerializer(many=True, read_only=True)
     featured_image = serializers.SerializerMethodField()
+    content_type = serializers.CharField(source='content_format', read_only=True)
     related_products = serializers.SerializerMethodField()
     related_categories = serializers.SerializerMethodField()
-    
+
+    # The rendered body is only loaded and returned with ?expand=rendered_content
+    expandable_fields = ('content_type', 'rendered_content')
+
     class Meta:
         model = BlogPost
         fields = [
-            'id', 'title', 'slug', 'excerpt', 'featured_image',
+            'id', 'title', 'slug', 'excerpt', 'content_type', 'rendered_content', 'featured_image',
             'author', 'published_at', 'created_at', 'updated_at',
-            'tags', 'is_featured', 'related_products', 'related_categories'
+            'tags', 'is_featured', 'reading_time', 'related_products', 'related_categories'
         ]
     
     def get_featured_image(self, obj):
@@ -64,7 +89,7 @@ class BlogPostListSerializer(serializers.ModelSerializer):
                 'slug': product.slug,
                 'current_price': str(product.current_price),
             }
-            for product in obj.related_products.filter(is_active=True)[:6]
+            for product in active_related_products(obj)
         ]
 
     def get_related_categories(self, obj):
@@ -74,23 +99,23 @@ class BlogPostListSerializer(serializers.ModelSerializer):
                 'name': category.name,
                 'slug': category.slug,
             }
-            for category in obj.related_categories.filter(is_active=True)
+            for category in active_related_categories(obj)
         ]
 
 
-class BlogPostDetailSerializer(serializers.ModelSerializer):
+class BlogPostDetailSerializer(SparseFieldsetMixin, CompiledSerializerMixin, serializers.ModelSerializer):
     author = BlogAuthorSerializer(read_only=True)
     tags = BlogTagSerializer(many=True, read_only=True)
     featured_image = serializers.SerializerMethodField()
-    content_type = serializers.SerializerMethodField()
+    content_type = serializers.CharField(source='content_format', read_only=True)
     related_products = serializers.SerializerMethodField()
     related_categories = serializers.SerializerMethodField()
     
     class Meta:
         model = BlogPost
         fields = [
-            'id', 'title', 'slug', 'excerpt', 'content', 'content_type', 'featured_image',
-            'author', 'published_at', 'created_at', 'updated_at',
+            'id', 'title', 'slug', 'excerpt', 'content', 'content_type', 'rendered_content',
+            'reading_time', 'featured_image', 'author', 'published_at', 'created_at', 'updated_at',
             'tags', 'is_featured', 'related_products', 'related_categories'
         ]
     
@@ -109,23 +134,11 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
             }
         return None
     
-    def get_content_type(self, obj):
-        return obj.get_content_type()
-
     def get_related_products(self, obj):
-        related = obj.related_products.filter(is_active=True).prefetch_related('images')
         products = []
-        for product in related[:6]:
+        for product in active_related_products(obj):
             primary_image = None
-            images = list(product.images.all())
-            selected = None
-            for image in images:
-                if image.is_primary:
-                    selected = image
-                    break
-            if not selected and images:
-                selected = images[0]
-
+            selected = product.primary_image
             if selected and selected.image:
                 from core.utils import get_image_url
                 request = self.context.get('request')
@@ -151,5 +164,5 @@ class BlogPostDetailSerializer(serializers.ModelSerializer):
                 'name': category.name,
                 'slug': category.slug,
             }
-            for category in obj.related_categories.filter(is_active=True)
+            for category in active_related_categories(obj)
         ]
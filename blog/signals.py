@@ -0,0 +1,18 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import BlogPost
+from .search import index_post, unindex_post
+
+SEARCHABLE_FIELDS = {'title', 'excerpt', 'content'}
+
+
+@receiver(post_save, sender=BlogPost)
+def update_search_index(sender, instance, created, **kwargs):
+    """Keep the SQLite full-text table in step with the post"""
+    if created or instance.changed_fields & SEARCHABLE_FIELDS:
+        index_post(instance)
+
+
+@receiver(post_delete, sender=BlogPost)
+def remove_from_search_index(sender, instance, using, **kwargs):
+    unindex_post(instance.pk, using=using)
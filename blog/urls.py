@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('posts/', views.BlogPostList.as_view(), name='blog-post-list'),
+    path('search/', views.BlogPostSearch.as_view(), name='blog-post-search'),
     path('posts/<slug:slug>/', views.BlogPostDetail.as_view(), name='blog-post-detail'),
     path('tags/', views.BlogTagList.as_view(), name='blog-tag-list'),
 ]
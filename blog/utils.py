@@ -0,0 +1,182 @@
+"""
+Save-time content processing for blog posts.
+
+Everything here runs once when a post's content changes (see BlogPost.save),
+so API reads only ever return stored fields.
+"""
+import re
+from html import escape, unescape
+from html.parser import HTMLParser
+
+from django.utils.html import linebreaks
+
+HTML_TAG_RE = re.compile(r'<[^>]+>')
+WHITESPACE_RE = re.compile(r'\s+')
+
+WORDS_PER_MINUTE = 200
+
+ALLOWED_TAGS = {
+    'a', 'abbr', 'b', 'blockquote', 'br', 'code', 'div', 'em', 'figcaption', 'figure',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'hr', 'i', 'img', 'li', 'ol', 'p', 'pre',
+    's', 'span', 'strong', 'sub', 'sup', 'table', 'tbody', 'td', 'th', 'thead', 'tr',
+    'u', 'ul',
+}
+VOID_TAGS = {'br', 'hr', 'img'}
+# Tags whose whole content is dropped, not just the markup
+DROP_CONTENT_TAGS = {'script', 'style', 'iframe', 'object', 'embed', 'noscript', 'template'}
+ALLOWED_ATTRIBUTES = {
+    '*': {'class', 'title'},
+    'a': {'href', 'target', 'rel'},
+    'img': {'src', 'alt', 'width', 'height', 'loading'},
+    'td': {'colspan', 'rowspan'},
+    'th': {'colspan', 'rowspan'},
+}
+URL_ATTRIBUTES = {'href', 'src'}
+ALLOWED_URL_SCHEMES = ('http://', 'https://', 'mailto:', 'tel:', '/', '#')
+
+BLOCK_TAGS = {
+    'p', 'div', 'br', 'li', 'blockquote', 'pre', 'tr', 'hr', 'figure', 'figcaption',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+}
+
+
+def is_html(content):
+    """Whether the content contains HTML tags"""
+    return bool(HTML_TAG_RE.search(content or ''))
+
+
+def _safe_url(value):
+    """Allow known schemes and relative URLs; reject javascript:, data: and the like"""
+    value = (value or '').strip()
+    lowered = value.lower()
+    if lowered.startswith(ALLOWED_URL_SCHEMES):
+        return value
+    if ':' not in lowered.split('/')[0]:
+        return value
+    return None
+
+
+class _Sanitizer(HTMLParser):
+    """Re-emits only allowlisted tags/attributes; text is always escaped"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.open_tags = []
+        self.drop_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+            return
+        if self.drop_depth or tag not in ALLOWED_TAGS:
+            return
+
+        allowed = ALLOWED_ATTRIBUTES['*'] | ALLOWED_ATTRIBUTES.get(tag, set())
+        opens_new_window = tag == 'a' and any(name == 'target' for name, _ in attrs)
+        rendered = []
+        for name, value in attrs:
+            if name not in allowed or value is None:
+                continue
+            if opens_new_window and name == 'rel':
+                continue
+            if name in URL_ATTRIBUTES:
+                value = _safe_url(value)
+                if value is None:
+                    continue
+            rendered.append(f' {name}="{escape(value, quote=True)}"')
+        if opens_new_window:
+            rendered.append(' rel="noopener noreferrer"')
+
+        self.parts.append(f"<{tag}{''.join(rendered)}>")
+        if tag not in VOID_TAGS:
+            self.open_tags.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_TAGS and self.open_tags and self.open_tags[-1] == tag:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(self.drop_depth - 1, 0)
+            return
+        if self.drop_depth or tag not in self.open_tags:
+            return
+        # Close anything left open inside this tag so the output stays well formed
+        while self.open_tags:
+            open_tag = self.open_tags.pop()
+            self.parts.append(f'</{open_tag}>')
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        if not self.drop_depth:
+            self.parts.append(escape(data, quote=False))
+
+    def get_html(self):
+        self.close()
+        while self.open_tags:
+            self.parts.append(f'</{self.open_tags.pop()}>')
+        return ''.join(self.parts)
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.drop_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_endtag(self, tag):
+        if tag in DROP_CONTENT_TAGS:
+            self.drop_depth = max(self.drop_depth - 1, 0)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(' ')
+
+    def handle_data(self, data):
+        if not self.drop_depth:
+            self.parts.append(data)
+
+
+def sanitize_html(content):
+    """Strip everything outside the allowlist (scripts, event handlers, javascript: URLs)"""
+    sanitizer = _Sanitizer()
+    sanitizer.feed(content or '')
+    return sanitizer.get_html()
+
+
+def html_to_text(content):
+    """Plain text of an HTML fragment with whitespace collapsed"""
+    extractor = _TextExtractor()
+    extractor.feed(content or '')
+    extractor.close()
+    return WHITESPACE_RE.sub(' ', unescape(''.join(extractor.parts))).strip()
+
+
+def render_content(content):
+    """
+    Process post content once.
+
+    Returns (content_format, rendered_html, plain_text, reading_time_minutes).
+    Plain-text posts are escaped and wrapped in <p>/<br>; HTML posts are
+    sanitized.
+    """
+    content = content or ''
+    if is_html(content):
+        content_format = 'html'
+        rendered = sanitize_html(content)
+        text = html_to_text(rendered)
+    else:
+        content_format = 'text'
+        rendered = linebreaks(content, autoescape=True)
+        text = WHITESPACE_RE.sub(' ', content).strip()
+
+    words = len(text.split())
+    reading_time = max(1, round(words / WORDS_PER_MINUTE)) if words else 0
+    return content_format, rendered, text, reading_time
@@ -1,11 +1,62 @@
 from rest_framework import generics, filters
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import FilterSet, CharFilter
+from django.db.models import Prefetch
 from django.utils import timezone
 from .models import BlogPost, BlogTag
+from .search import facet_counts, search_posts
 from .serializers import BlogPostListSerializer, BlogPostDetailSerializer, BlogTagSerializer
+from core.fieldsets import SparseFieldsetViewMixin
+from core.pagination import OptionalPageNumberPagination
 from core.permissions import IsAdminOrReadOnly
+from products.models import Product, RoomCategory
+
+
+def blog_post_queryset(user, fields, with_product_images=False):
+    """
+    Blog posts with everything the serializers read loaded up front.
+
+    ``fields`` is the rendered fieldset (see core.fieldsets): relations outside
+    it are not loaded and the heavy content columns are deferred unless
+    rendered. Related products/categories are prefetched already filtered to
+    active rows into ``active_related_products`` / ``active_related_categories``
+    so the serializers never re-query per post.
+    """
+    fields = set(fields)
+    queryset = BlogPost.objects.all()
+    if 'author' in fields:
+        queryset = queryset.select_related('author')
+
+    prefetches = []
+    if 'tags' in fields:
+        prefetches.append('tags')
+    if 'related_products' in fields:
+        products = Product.objects.filter(is_active=True).order_by('id')
+        if with_product_images:
+            products = products.select_related('primary_image')
+        prefetches.append(Prefetch('related_products', queryset=products, to_attr='active_related_products'))
+    if 'related_categories' in fields:
+        prefetches.append(Prefetch(
+            'related_categories',
+            queryset=RoomCategory.objects.filter(is_active=True),
+            to_attr='active_related_categories',
+        ))
+    queryset = queryset.prefetch_related(*prefetches)
+
+    # search_text only feeds the search index; it is never rendered
+    deferred = ['search_text'] + [name for name in ('content', 'rendered_content') if name not in fields]
+    queryset = queryset.defer(*deferred)
+
+    # Only show published posts to non-admin users
+    if not user.is_staff:
+        queryset = queryset.filter(
+            status='published',
+            published_at__lte=timezone.now()
+        )
+
+    return queryset
 
 
 class BlogPostFilterSet(FilterSet):
@@ -25,9 +76,7 @@ class BlogPostFilterSet(FilterSet):
         if value:
             tag_slugs = [slug.strip() for slug in value.split(',') if slug.strip()]
             if tag_slugs:
-                tags = BlogTag.objects.filter(slug__in=tag_slugs)
-                if tags.exists():
-                    return queryset.filter(tags__in=tags).distinct()
+                return queryset.filter(tags__slug__in=tag_slugs).distinct()
         return queryset
 
     def filter_by_product(self, queryset, name, value):
@@ -41,31 +90,37 @@ class BlogPostFilterSet(FilterSet):
         return queryset
 
 
-class BlogPostList(generics.ListAPIView):
+class BlogSearchFilter(filters.SearchFilter):
+    """?search= matched against the full-text index instead of icontains scans"""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return search_posts(queryset, query)
+
+
+class BlogOrderingFilter(filters.OrderingFilter):
+    """?ordering= as usual; without it, ?search= results stay in rank order instead of the view's default"""
+
+    def get_default_ordering(self, view):
+        if view.request.query_params.get(BlogSearchFilter.search_param, '').strip():
+            return ['-search_rank', '-published_at']
+        return super().get_default_ordering(view)
+
+
+class BlogPostList(SparseFieldsetViewMixin, generics.ListAPIView):
     """Get all published blog posts"""
     serializer_class = BlogPostListSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, BlogSearchFilter, BlogOrderingFilter]
     filterset_class = BlogPostFilterSet
-    search_fields = ['title', 'excerpt', 'content']
     ordering_fields = ['published_at', 'created_at', 'title']
     ordering = ['-published_at']
+    pagination_class = OptionalPageNumberPagination
     
     def get_queryset(self):
-        queryset = BlogPost.objects.select_related('author').prefetch_related(
-            'tags',
-            'related_products',
-            'related_categories',
-        )
-        
-        # Only show published posts to non-admin users
-        if not self.request.user.is_staff:
-            queryset = queryset.filter(
-                status='published',
-                published_at__lte=timezone.now()
-            )
-        
-        return queryset
+        return blog_post_queryset(self.request.user, self.get_rendered_fields())
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -73,27 +128,56 @@ class BlogPostList(generics.ListAPIView):
         return context
 
 
-class BlogPostDetail(generics.RetrieveAPIView):
+class BlogPostSearch(SparseFieldsetViewMixin, generics.ListAPIView):
+    """
+    Ranked full-text search over blog posts (?q=), best match first.
+
+    Accepts the same tags/product/category filters as the post list and returns
+    per-tag and per-category counts for the matching posts alongside the results.
+    """
+    serializer_class = BlogPostListSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = BlogPostFilterSet
+    pagination_class = OptionalPageNumberPagination
+
+    def get_query(self):
+        return self.request.query_params.get('q', '').strip()
+
+    def get_queryset(self):
+        queryset = search_posts(blog_post_queryset(self.request.user, self.get_rendered_fields()), self.get_query())
+        if not self.get_query():
+            queryset = queryset.order_by('-published_at', '-created_at')
+        return queryset
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        facets = facet_counts(queryset)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            response = self.get_paginated_response(self.get_serializer(page, many=True).data)
+            response.data['query'] = self.get_query()
+            response.data['facets'] = facets
+            return response
+
+        results = self.get_serializer(queryset, many=True).data
+        return Response({
+            'query': self.get_query(),
+            'count': len(results),
+            'results': results,
+            'facets': facets,
+        })
+
+
+class BlogPostDetail(SparseFieldsetViewMixin, generics.RetrieveAPIView):
     """Get a single blog post by slug"""
     serializer_class = BlogPostDetailSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     lookup_field = 'slug'
     
     def get_queryset(self):
-        queryset = BlogPost.objects.select_related('author').prefetch_related(
-            'tags',
-            'related_products__images',
-            'related_categories',
-        )
-        
-        # Only show published posts to non-admin users
-        if not self.request.user.is_staff:
-            queryset = queryset.filter(
-                status='published',
-                published_at__lte=timezone.now()
-            )
-        
-        return queryset
+        return blog_post_queryset(self.request.user, self.get_rendered_fields(), with_product_images=True)
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -0,0 +1,82 @@
+import time
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from cart.models import Cart
+
+
+class Command(BaseCommand):
+    help = 'Delete abandoned carts and expired DB sessions in small batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30,
+                            help='Delete carts not updated for this many days (default: 30)')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Rows deleted per statement (default: 1000)')
+        parser.add_argument('--sleep', type=float, default=0.1,
+                            help='Seconds to pause between batches to limit DB load (default: 0.1)')
+        parser.add_argument('--max-batches', type=int, default=0,
+                            help='Stop after this many batches per table, 0 for no limit (default: 0)')
+        parser.add_argument('--skip-sessions', action='store_true',
+                            help='Only purge carts')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Count what would be deleted without deleting anything')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        report = {}
+
+        self.stdout.write(f"🧹 Purging carts idle since {cutoff:%Y-%m-%d %H:%M}")
+        stale_carts = Cart.objects.filter(updated_at__lt=cutoff).order_by('updated_at', 'id')
+        report.update(self._purge(stale_carts, Cart, options))
+
+        session_engine = settings.SESSION_ENGINE
+        if options['skip_sessions']:
+            pass
+        elif session_engine.endswith(('.db', '.cached_db')):
+            self.stdout.write("🧹 Purging expired sessions")
+            expired_sessions = Session.objects.filter(expire_date__lt=timezone.now()).order_by('expire_date')
+            report.update(self._purge(expired_sessions, Session, options))
+        else:
+            self.stdout.write(f"ℹ️  Session engine {session_engine} does not store sessions in the database, skipping")
+
+        self.stdout.write("\n📊 ROWS RECLAIMED" + (" (dry run)" if options['dry_run'] else ""))
+        for table, count in report.items():
+            self.stdout.write(f"   {table:<25} {count}")
+        self.stdout.write(f"   {'elapsed':<25} {time.monotonic() - started:.1f}s")
+
+    def _purge(self, queryset, model, options):
+        """
+        Delete rows matching ``queryset`` one batch of primary keys at a time.
+        Only the key column is read, so the scan can be served from the index.
+        Returns rows deleted per table.
+        """
+        if options['dry_run']:
+            return {model._meta.db_table: queryset.count()}
+
+        deleted = {}
+        batches = 0
+        pk_name = model._meta.pk.name
+        while True:
+            pks = list(queryset.values_list(pk_name, flat=True)[:options['batch_size']])
+            if not pks:
+                break
+
+            _, per_model = model.objects.filter(**{f'{pk_name}__in': pks}).delete()
+            for label, count in per_model.items():
+                table = apps.get_model(label)._meta.db_table
+                deleted[table] = deleted.get(table, 0) + count
+
+            batches += 1
+            if options['max_batches'] and batches >= options['max_batches']:
+                break
+            if options['sleep']:
+                time.sleep(options['sleep'])
+
+        return deleted or {model._meta.db_table: 0}
@@ -1,4 +1,5 @@
 from django.db import models
+from django.utils import timezone
 from products.models import ProductVariation
 from core.utils import generate_session_id
 
@@ -8,9 +9,20 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Covers the stale-cart scan in purge_stale_carts (index-only on PostgreSQL)
+            models.Index(fields=['updated_at', 'id']),
+        ]
+
     def __str__(self):
         return f"Cart {self.session_id}"
 
+    def touch(self):
+        """Mark the cart as active; item changes do not save the cart row itself"""
+        self.updated_at = timezone.now()
+        Cart.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
+
     @property
     def total_items(self):
         return sum(item.quantity for item in self.items.all())
@@ -1,12 +1,14 @@
 from rest_framework import serializers
 from .models import Cart, CartItem
-from products.serializers import ProductVariationSerializer
+from products.serializers import ProductVariationSerializer, VariationAttributesField
+from core.compiled import CompiledSerializerMixin
 
 
-class CartProductVariationSerializer(serializers.ModelSerializer):
+class CartProductVariationSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     """Custom serializer for cart that excludes SKU and modifier from attributes"""
     price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    attributes = serializers.SerializerMethodField()
+    # SKU and modifier are excluded from the attributes shown in the cart
+    attributes = VariationAttributesField(exclude=('sku', 'modifier'))
     product_name = serializers.CharField(source='product.name', read_only=True)
     product_image = serializers.SerializerMethodField()
 
@@ -14,41 +16,17 @@ class CartProductVariationSerializer(serializers.ModelSerializer):
         model = ProductVariationSerializer.Meta.model
         fields = ['id', 'sku', 'attributes', 'stock_quantity', 'price_modifier', 'price', 'is_active', 'product_name', 'product_image']
 
-    def get_attributes(self, obj):
-        """Safely parse attributes from JSON string or return as dict, excluding SKU and modifier"""
-        if isinstance(obj.attributes, dict):
-            attrs = obj.attributes
-        else:
-            try:
-                import json
-                attrs = json.loads(obj.attributes) if obj.attributes else {}
-            except (json.JSONDecodeError, TypeError):
-                attrs = {}
-        
-        # Filter out SKU and modifier for cart display
-        return {k: v for k, v in attrs.items() if k.lower() not in ['sku', 'modifier']}
-
     def get_product_image(self, obj):
         """Get the primary image of the product"""
         from core.utils import get_image_url
         
-        product = obj.product
-        request = self.context.get('request')
-        
-        # Try primary image first
-        primary_image = product.images.filter(is_primary=True).first()
-        if primary_image:
-            return get_image_url(primary_image.id, request)
-        
-        # Fallback to first image
-        first_image = product.images.first()
-        if first_image:
-            return get_image_url(first_image.id, request)
-        
+        # Product.primary_image_id already points at the primary (or first) image
+        if obj.product.primary_image_id:
+            return get_image_url(obj.product.primary_image_id, self.context.get('request'))
         return None
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     variation = CartProductVariationSerializer(read_only=True)
     unit_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
     total_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -58,7 +36,7 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ['id', 'variation', 'quantity', 'unit_price', 'total_price']
 
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_items = serializers.IntegerField(read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
@@ -1,10 +1,16 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
+from django.db.models import Prefetch, prefetch_related_objects
 from django.shortcuts import get_object_or_404
 from .models import Cart, CartItem
 from .serializers import CartSerializer, AddToCartSerializer, UpdateCartItemSerializer
 from products.models import ProductVariation
+from core.metrics import CART_ADDITIONS
+from core.utils import generate_session_id
+
+# Session key holding the cart's session_id for visitors without a custom session_id
+CART_SESSION_KEY = 'cart_session_id'
 
 
 def get_or_create_cart(request):
@@ -15,11 +21,14 @@ def get_or_create_cart(request):
         cart, created = Cart.objects.get_or_create(session_id=custom_session_id)
         return cart
     
-    # Fall back to Django's built-in session system
-    session_id = request.session.session_key
+    # Fall back to Django's built-in session system. The cart id is stored in
+    # the session rather than derived from the session key, so no session has
+    # to be created up front and signed-cookie sessions work too.
+    session_id = request.session.get(CART_SESSION_KEY)
     if not session_id:
-        request.session.create()
-        session_id = request.session.session_key
+        # Older carts were keyed by the session key itself
+        session_id = request.session.session_key or generate_session_id()
+        request.session[CART_SESSION_KEY] = session_id
 
     cart, created = Cart.objects.get_or_create(session_id=session_id)
     return cart
@@ -29,7 +38,12 @@ class CartDetail(generics.RetrieveAPIView):
     serializer_class = CartSerializer
 
     def get_object(self):
-        return get_or_create_cart(self.request)
+        cart = get_or_create_cart(self.request)
+        # Items, their variation and product (with its primary_image_id) in one query
+        prefetch_related_objects([cart], Prefetch(
+            'items', queryset=CartItem.objects.select_related('variation__product')
+        ))
+        return cart
     
     def get_serializer_context(self):
         context = super().get_serializer_context()
@@ -65,10 +79,13 @@ def add_to_cart(request):
             # Update quantity if item already exists
             cart_item.quantity += quantity
             cart_item.save()
+        cart.touch()
+        CART_ADDITIONS.inc(outcome='added' if created else 'quantity_increased')
 
         cart_serializer = CartSerializer(cart, context={'request': request})
         return Response(cart_serializer.data, status=status.HTTP_200_OK)
 
+    CART_ADDITIONS.inc(outcome='invalid')
     return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
@@ -101,6 +118,7 @@ def update_cart_item(request, item_id):
 
             cart_item.quantity = quantity
             cart_item.save()
+        cart.touch()
 
         cart_serializer = CartSerializer(cart, context={'request': request})
         return Response(cart_serializer.data, status=status.HTTP_200_OK)
@@ -119,6 +137,7 @@ def remove_from_cart(request, item_id):
     
     cart_item = get_object_or_404(CartItem, id=item_id, cart=cart)
     cart_item.delete()
+    cart.touch()
 
     cart_serializer = CartSerializer(cart, context={'request': request})
     return Response(cart_serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
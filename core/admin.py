@@ -80,14 +80,14 @@ from .models import Redirect
 
 @admin.register(Redirect)
 class RedirectAdmin(admin.ModelAdmin):
-    list_display = ['old_path', 'new_path', 'redirect_type', 'is_active', 'created_at']
-    list_filter = ['redirect_type', 'is_active', 'created_at']
+    list_display = ['old_path', 'new_path', 'redirect_type', 'match_prefix', 'is_active', 'created_at']
+    list_filter = ['redirect_type', 'match_prefix', 'is_active', 'created_at']
     search_fields = ['old_path', 'new_path']
     readonly_fields = ['created_at', 'updated_at']
     
     fieldsets = (
         ('Redirect Information', {
-            'fields': ('old_path', 'new_path', 'redirect_type', 'is_active')
+            'fields': ('old_path', 'new_path', 'redirect_type', 'match_prefix', 'is_active')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
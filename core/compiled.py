@@ -0,0 +1,80 @@
+"""
+Compiled representation for fixed-shape read serializers.
+
+DRF's Serializer.to_representation walks every field for every object,
+calling get_attribute() and to_representation() through several layers.
+CompiledSerializerMixin turns the readable fields into a flat plan once per
+serializer instance (the child of a many=True list is reused, so once per
+response): plain model columns are read with attrgetter and emitted as-is,
+and only fields that transform their value (dates, decimals, nested and
+method fields) pay for a to_representation() call. Output is identical.
+"""
+import operator
+
+from rest_framework import fields as drf_fields
+from rest_framework.fields import SkipField
+from rest_framework.relations import RelatedField, ManyRelatedField
+
+# Field classes whose to_representation() returns a model column's value unchanged.
+# Exact classes only: a subclass may override to_representation().
+PASSTHROUGH_FIELDS = frozenset({
+    drf_fields.BooleanField,
+    drf_fields.CharField,
+    drf_fields.EmailField,
+    drf_fields.IntegerField,
+    drf_fields.ReadOnlyField,
+    drf_fields.SlugField,
+    drf_fields.URLField,
+})
+
+
+def _concrete_attnames(serializer):
+    model = getattr(getattr(serializer, 'Meta', None), 'model', None)
+    if model is None:
+        return frozenset()
+    return frozenset(field.attname for field in model._meta.concrete_fields)
+
+
+def compile_fields(serializer):
+    """
+    [(name, getter, converter)] for the serializer's readable fields, or None
+    when a field needs DRF's generic handling (relational fields).
+    """
+    columns = _concrete_attnames(serializer)
+    plan = []
+    for field in serializer._readable_fields:
+        if isinstance(field, (RelatedField, ManyRelatedField)):
+            return None
+        source_attrs = field.source_attrs
+        is_column = len(source_attrs) == 1 and source_attrs[0] in columns
+        if type(field) in PASSTHROUGH_FIELDS and is_column:
+            plan.append((field.field_name, operator.attrgetter(source_attrs[0]), None))
+        elif is_column:
+            plan.append((field.field_name, operator.attrgetter(source_attrs[0]), field.to_representation))
+        else:
+            plan.append((field.field_name, field.get_attribute, field.to_representation))
+    return plan
+
+
+class CompiledSerializerMixin:
+    """Serializer mixin: to_representation() from a plan compiled on first use"""
+    # Switch off to compare against DRF's generic path (see benchmark_read_path)
+    compiled = True
+
+    def to_representation(self, instance):
+        if not CompiledSerializerMixin.compiled:
+            return super().to_representation(instance)
+        plan = getattr(self, '_compiled_plan', False)
+        if plan is False:
+            plan = self._compiled_plan = compile_fields(self)
+        if plan is None:
+            return super().to_representation(instance)
+
+        ret = {}
+        for name, get, convert in plan:
+            try:
+                value = get(instance)
+            except SkipField:
+                continue
+            ret[name] = value if convert is None or value is None else convert(value)
+        return ret
@@ -0,0 +1,107 @@
+"""
+Sparse fieldsets (?fields=) and field expansion (?expand=) for read endpoints.
+
+``?fields=id,name,slug`` renders only the named top-level fields and
+``?expand=images`` adds fields a serializer leaves out by default. Views
+resolve the selection once per request and build their queryset from it, so
+relations that are not rendered are neither prefetched nor serialized.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_field_names(value):
+    """Comma-separated names as a list, or None when the parameter is absent or empty"""
+    if not value:
+        return None
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    return names or None
+
+
+def resolve_fields(available, expandable, query_params):
+    """
+    Top-level fields to render, in serializer order.
+
+    Without ?fields= that is every field except the expandable ones; with it,
+    exactly the named fields. Anything in ?expand= is added on top. Unknown
+    names are a 400 so typos do not silently return empty objects.
+    """
+    requested = parse_field_names(query_params.get(FIELDS_PARAM))
+    expand = parse_field_names(query_params.get(EXPAND_PARAM)) or []
+
+    errors = {}
+    for param, names in ((FIELDS_PARAM, requested or []), (EXPAND_PARAM, expand)):
+        unknown = [name for name in names if name not in available]
+        if unknown:
+            errors[param] = f"Unknown field(s): {', '.join(unknown)}"
+    if errors:
+        raise ValidationError(errors)
+
+    if requested is None:
+        selected = {name for name in available if name not in expandable}
+    else:
+        selected = set(requested)
+    selected.update(expand)
+    return [name for name in available if name in selected]
+
+
+def _query_params(request):
+    if request is None:
+        return {}
+    # DRF requests expose query_params; plain Django requests (management commands) only GET
+    return getattr(request, 'query_params', None) or getattr(request, 'GET', {})
+
+
+class SparseFieldsetMixin:
+    """
+    Serializer mixin that renders only the fields picked by ?fields= / ?expand=.
+
+    ``Meta.fields`` lists everything the serializer can render and
+    ``expandable_fields`` the subset left out unless asked for. Only the
+    top-level serializer (or the child of a top-level many=True list) is
+    pruned; nested serializers render in full.
+    """
+    expandable_fields = ()
+
+    @classmethod
+    def resolve_fields(cls, query_params):
+        return resolve_fields(list(cls.Meta.fields), cls.expandable_fields, query_params)
+
+    @property
+    def rendered_fields(self):
+        context = self.context
+        if 'rendered_fields' not in context:
+            context['rendered_fields'] = self.resolve_fields(_query_params(context.get('request')))
+        return context['rendered_fields']
+
+    def _is_top_level(self):
+        parent = self.parent
+        return parent is None or (isinstance(parent, ListSerializer) and parent.parent is None)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._is_top_level():
+            return fields
+        rendered = set(self.rendered_fields)
+        return {name: field for name, field in fields.items() if name in rendered}
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin: resolves the fieldset once per request (get_rendered_fields)
+    so get_queryset can plan joins/prefetches from it, and hands the same
+    selection to the serializer.
+    """
+
+    def get_rendered_fields(self):
+        if not hasattr(self, '_rendered_fields'):
+            self._rendered_fields = self.get_serializer_class().resolve_fields(self.request.query_params)
+        return self._rendered_fields
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['rendered_fields'] = self.get_rendered_fields()
+        return context
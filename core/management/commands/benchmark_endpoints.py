@@ -0,0 +1,372 @@
+"""
+Endpoint benchmark suite with latency, query-count and payload budgets.
+
+Drives the storefront endpoints in-process through the full Django stack
+against the current database (use seed_catalog for a representative
+catalog): every product list sort/filter combination, product detail and
+images, cart read and add-to-cart, checkout with the M-Pesa gateway mocked
+out, the merchant feed, the blog list and the image endpoints.
+
+For each scenario it records p50/p95 latency, DB queries and response bytes
+and compares them with the stored baseline. More queries than the baseline,
+a p50/p95 above the latency budget or a payload above the bytes budget is a
+regression and the command exits non-zero. List scenarios are also re-run
+with a larger page (or cart) and must not issue more queries, which catches
+N+1 regressions even without a baseline. The committed baseline was
+recorded on a `seed_catalog --size medium` database; re-record it with
+--update-baseline on the machine that enforces the latency budgets.
+
+Writes happen inside a transaction that is rolled back at the end.
+"""
+import io
+import json
+import statistics
+import time
+import uuid
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from blog.models import BlogPost
+from cart.models import Cart, CartItem
+from products.models import Product, ProductImage, ProductType, ProductVariation, RoomCategory, Tag
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'core' / 'benchmark_baselines.json'
+
+BENCHMARK_CART = 'benchmark-endpoints'
+CHECKOUT_CART = 'benchmark-checkout'
+
+PRODUCT_SORTS = [('newest', ''), ('name', 'name'), ('name-desc', '-name'),
+                 ('price', 'base_price'), ('price-desc', '-base_price')]
+
+CHECKOUT_DATA = {
+    'customer_name': 'Benchmark Customer',
+    'customer_email': 'benchmark@example.com',
+    'customer_phone': '0712345678',
+    'shipping_address': '1 Benchmark Road',
+    'shipping_city': 'Nairobi',
+    'shipping_zip_code': '00100',
+}
+
+
+async def fake_stk_push(phone_number, amount, order_id):
+    """Stand-in for initiate_mpesa_payment_async: an accepted STK push without the network round trip"""
+    return {
+        'ResponseCode': '0',
+        'ResponseDescription': 'Success. Request accepted for processing',
+        'MerchantRequestID': f'bench-{uuid.uuid4().hex[:12]}',
+        'CheckoutRequestID': f'ws_CO_bench_{uuid.uuid4().hex}',
+    }
+
+
+async def streamed_size(response):
+    return sum([len(chunk) async for chunk in response.streaming_content])
+
+
+class Scenario:
+    """
+    One request to time. ``scaled`` is the same request with a bigger result,
+    ``max_requests`` caps the timed runs of endpoints that take seconds.
+    """
+
+    def __init__(self, name, path, method='get', data=None, status=200, setup=None, scaled=None,
+                 max_requests=None):
+        self.name = name
+        self.path = path
+        self.method = method
+        self.data = data
+        self.status = status
+        self.setup = setup
+        self.scaled = scaled
+        self.max_requests = max_requests
+
+    def prepare(self):
+        if self.setup:
+            self.setup()
+
+    def send(self, client):
+        if self.method == 'get':
+            response = client.get(self.path)
+        else:
+            response = client.post(self.path, self.data, content_type='application/json')
+        if response.streaming and response.is_async:
+            response.body_size = async_to_sync(streamed_size)(response)
+        elif response.streaming:
+            response.body_size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            response.body_size = len(response.content)
+        return response
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the API endpoints (p50/p95, queries, bytes) and fail on regressions against the baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=30,
+                            help='Timed requests per scenario (default: 30)')
+        parser.add_argument('--warmup', type=int, default=3,
+                            help='Untimed requests per scenario (default: 3)')
+        parser.add_argument('--only', action='append', default=[],
+                            help='Run scenarios whose name contains this text (repeatable)')
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                            help='Baseline JSON file (default: core/benchmark_baselines.json)')
+        parser.add_argument('--update-baseline', action='store_true',
+                            help='Write this run as the new baseline instead of comparing')
+        parser.add_argument('--latency-tolerance', type=float, default=0.5,
+                            help='Allowed p50 growth over the baseline, as a fraction; p95 gets twice this (default: 0.5)')
+        parser.add_argument('--min-latency-ms', type=float, default=10.0,
+                            help='Ignore latency growth smaller than this many ms (default: 10)')
+        parser.add_argument('--bytes-tolerance', type=float, default=0.10,
+                            help='Allowed response size growth, as a fraction (default: 0.10)')
+        parser.add_argument('--skip-latency', action='store_true',
+                            help='Only enforce query and size budgets (for machines unlike the baseline one)')
+        parser.add_argument('--cart-items', type=int, default=5,
+                            help='Items in the benchmark cart and the checkout cart (default: 5)')
+
+    def handle(self, *args, **options):
+        if not Product.objects.filter(is_active=True).exists():
+            raise CommandError('No active products: seed a catalog first (python manage.py seed_catalog)')
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING("⚠️ DEBUG is on: query logging inflates every timing"))
+
+        results = {}
+        failures = []
+        with transaction.atomic():
+            scenarios = self.build_scenarios(options['cart_items'])
+            if options['only']:
+                scenarios = [s for s in scenarios if any(text in s.name for text in options['only'])]
+            client = Client(HTTP_HOST='localhost')
+            # The views still print debug output; keep it out of the report
+            with mock.patch('orders.views.initiate_mpesa_payment_async', fake_stk_push), redirect_stdout(io.StringIO()):
+                for scenario in scenarios:
+                    result = self.measure(client, scenario, options['requests'], options['warmup'])
+                    results[scenario.name] = result
+                    if 'error' not in result and scenario.scaled:
+                        result['scaled_queries'] = self.count_queries(client, scenario.scaled)
+            transaction.set_rollback(True)
+
+        for name, result in results.items():
+            if 'error' in result:
+                failures.append(f"{name}: {result['error']}")
+            elif result.get('scaled_queries', 0) > result['queries']:
+                failures.append(
+                    f"{name}: {result['scaled_queries']} queries for a larger result vs {result['queries']} (N+1)"
+                )
+
+        if options['update_baseline']:
+            self.report(results, {}, options)
+            if failures:
+                raise CommandError('Not writing a baseline from a failing run:\n  ' + '\n  '.join(failures))
+            self.write_baseline(options['baseline'], results)
+            return
+
+        baseline = self.read_baseline(options['baseline'])
+        failures += self.report(results, baseline.get('scenarios', {}), options)
+        catalog = baseline.get('catalog')
+        if catalog and catalog != self.catalog_size():
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ Baseline catalog {catalog} differs from this database {self.catalog_size()}"
+            ))
+        if failures:
+            raise CommandError(f"{len(failures)} regression(s):\n  " + '\n  '.join(failures))
+        self.stdout.write(self.style.SUCCESS(f"✅ {len(results)} scenarios within budget"))
+
+    # -- scenarios ------------------------------------------------------------------
+
+    def build_scenarios(self, cart_items):
+        product = (
+            Product.objects.filter(is_active=True, primary_image__isnull=False).order_by('id').first()
+            or Product.objects.filter(is_active=True).order_by('id').first()
+        )
+        room = RoomCategory.objects.filter(products__is_active=True).order_by('order', 'id').first()
+        product_type = ProductType.objects.filter(products__is_active=True).order_by('order', 'id').first()
+        tag = Tag.objects.filter(products__is_active=True).exclude(slug='on-sale').order_by('id').first()
+        variations = list(
+            ProductVariation.objects.filter(is_active=True, product__is_active=True).order_by('id')[:max(cart_items, 1)]
+        )
+        post = BlogPost.objects.filter(status='published').order_by('id').first()
+
+        filters = [('all', '')]
+        if room:
+            filters.append(('room', f'room_categories={room.id}'))
+        if product_type:
+            filters.append(('type', f'product_types={product_type.id}'))
+        if tag:
+            filters.append(('tag', f'tags={tag.slug}'))
+        filters += [('color', 'color=black'), ('search', 'search=sofa')]
+
+        scenarios = []
+        for sort_name, ordering in PRODUCT_SORTS:
+            for filter_name, query in filters:
+                params = '&'.join(part for part in (query, f'ordering={ordering}' if ordering else '') if part)
+                path = f"/api/products/?{params + '&' if params else ''}page_size="
+                scenarios.append(Scenario(
+                    f'product_list:{sort_name}:{filter_name}', f'{path}24', scaled=Scenario('', f'{path}96'),
+                ))
+        scenarios.append(Scenario(
+            'product_list:unpaginated:room', f'/api/products/?room_categories={room.id}' if room else '/api/products/',
+            max_requests=10,
+        ))
+        scenarios.append(Scenario('product_detail', f'/api/products/{product.slug}/'))
+        scenarios.append(Scenario('product_images', f'/api/products/{product.slug}/images/'))
+
+        image = self.servable_image(product)
+        if image:
+            scenarios.append(Scenario('image_by_id', f'/api/images/{image.id}/'))
+            scenarios.append(Scenario('media_file', f'{settings.MEDIA_URL.rstrip("/")}/{image.image.name}'))
+
+        if variations:
+            self.fill_cart(BENCHMARK_CART, variations)
+            self.fill_cart(f'{BENCHMARK_CART}-1', variations[:1])
+            scenarios.append(Scenario(
+                'cart_detail', f'/api/cart/?session_id={BENCHMARK_CART}-1',
+                scaled=Scenario('', f'/api/cart/?session_id={BENCHMARK_CART}'),
+            ))
+            scenarios.append(Scenario(
+                'add_to_cart', '/api/cart/add/', method='post',
+                data={'session_id': f'{BENCHMARK_CART}-add', 'variation_id': variations[0].id, 'quantity': 1},
+                setup=lambda: self.fill_cart(f'{BENCHMARK_CART}-add', []),
+            ))
+            scenarios.append(Scenario(
+                'checkout', '/api/orders/checkout/', method='post', status=201,
+                data={**CHECKOUT_DATA, 'session_id': CHECKOUT_CART},
+                setup=lambda: self.fill_cart(CHECKOUT_CART, variations),
+            ))
+
+        scenarios.append(Scenario('merchant_feed', '/api/products/merchant-feed.xml', max_requests=5))
+        scenarios.append(Scenario(
+            'blog_list', '/api/blog/posts/?page_size=12', scaled=Scenario('', '/api/blog/posts/?page_size=48'),
+        ))
+        if post:
+            scenarios.append(Scenario('blog_detail', f'/api/blog/posts/{post.slug}/'))
+        return scenarios
+
+    def servable_image(self, product):
+        """An image whose file exists, preferring the benchmarked product's"""
+        candidates = list(ProductImage.objects.filter(product=product).order_by('order', 'id')[:5])
+        candidates += list(ProductImage.objects.order_by('id')[:20])
+        for image in candidates:
+            if image.image and default_storage.exists(image.image.name):
+                return image
+        return None
+
+    def fill_cart(self, session_id, variations):
+        cart, _ = Cart.objects.get_or_create(session_id=session_id)
+        cart.items.all().delete()
+        CartItem.objects.bulk_create([CartItem(cart=cart, variation=variation, quantity=1) for variation in variations])
+
+    # -- measurement ------------------------------------------------------------------
+
+    def count_queries(self, client, scenario):
+        scenario.prepare()
+        with CaptureQueriesContext(connection) as queries:
+            scenario.send(client)
+        return len(queries)
+
+    def measure(self, client, scenario, count, warmup):
+        # Queries are counted on a separate untimed request: capturing them slows the cursor down
+        scenario.prepare()
+        with CaptureQueriesContext(connection) as queries:
+            response = scenario.send(client)
+        # Read now: the next request's request_started signal clears the query log
+        query_count = len(queries)
+        if response.status_code != scenario.status:
+            return {'error': f'HTTP {response.status_code} (expected {scenario.status}) from {scenario.path}'}
+        size = response.body_size
+
+        if scenario.max_requests:
+            count = min(count, scenario.max_requests)
+            warmup = min(warmup, 1)
+        for _ in range(warmup):
+            scenario.prepare()
+            scenario.send(client)
+        timings = []
+        for _ in range(max(count, 1)):
+            scenario.prepare()
+            started = time.perf_counter()
+            scenario.send(client)
+            timings.append(time.perf_counter() - started)
+
+        timings.sort()
+        return {
+            'p50_ms': round(statistics.median(timings) * 1000, 2),
+            'p95_ms': round(timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000, 2),
+            'queries': query_count,
+            'bytes': size,
+        }
+
+    # -- baselines ---------------------------------------------------------------------
+
+    def catalog_size(self):
+        return {
+            'products': Product.objects.filter(is_active=True).count(),
+            'blog_posts': BlogPost.objects.filter(status='published').count(),
+        }
+
+    def read_baseline(self, path):
+        try:
+            with open(path, encoding='utf-8') as handle:
+                return json.load(handle)
+        except FileNotFoundError:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️ No baseline at {path}: only N+1 checks apply (create one with --update-baseline)"
+            ))
+            return {}
+
+    def write_baseline(self, path, results):
+        data = {
+            'generated_at': timezone.now().replace(microsecond=0).isoformat(),
+            'catalog': self.catalog_size(),
+            'scenarios': {
+                name: {key: value for key, value in result.items() if key != 'scaled_queries'}
+                for name, result in sorted(results.items())
+            },
+        }
+        with open(path, 'w', encoding='utf-8') as handle:
+            json.dump(data, handle, indent=2)
+            handle.write('\n')
+        self.stdout.write(self.style.SUCCESS(f"✅ Baseline with {len(results)} scenarios written to {path}"))
+
+    def report(self, results, baseline, options):
+        """Print one line per scenario; return the budget violations"""
+        failures = []
+        for name, result in results.items():
+            if 'error' in result:
+                self.stdout.write(self.style.ERROR(f"❌ {name}: {result['error']}"))
+                continue
+            line = (f"{name:34} p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+                    f"{result['queries']:3} queries  {result['bytes']:9} bytes")
+            expected = baseline.get(name)
+            if not expected:
+                self.stdout.write(f"   {line}" + ('  (no baseline)' if baseline else ''))
+                continue
+
+            problems = []
+            if result['queries'] > expected['queries']:
+                problems.append(f"queries {result['queries']} > {expected['queries']}")
+            if not options['skip_latency']:
+                # p95 of a few dozen samples is noisy, so it gets twice the tolerance of p50
+                for key, tolerance in (('p50_ms', options['latency_tolerance']),
+                                       ('p95_ms', options['latency_tolerance'] * 2)):
+                    budget = max(expected[key] * (1 + tolerance), expected[key] + options['min_latency_ms'])
+                    if result[key] > budget:
+                        problems.append(f"{key[:3]} {result[key]:.2f} ms > {budget:.2f} ms")
+            bytes_budget = expected['bytes'] * (1 + options['bytes_tolerance'])
+            if result['bytes'] > bytes_budget:
+                problems.append(f"{result['bytes']} bytes > {bytes_budget:.0f}")
+
+            if problems:
+                failures.append(f"{name}: {', '.join(problems)}")
+                self.stdout.write(self.style.ERROR(f"❌ {line}  {'; '.join(problems)}"))
+            else:
+                self.stdout.write(f"✅ {line}")
+        return failures
@@ -0,0 +1,150 @@
+"""
+Before/after throughput of the hot read endpoints.
+
+"before" is the generic path: DRF's JSONRenderer, DRF's per-field
+Serializer.to_representation and model-instance product cards. "after" is
+the fast path: FastJSONRenderer, compiled serializers and the values() product
+card read model. Requests go through the full Django stack in-process; the
+temporary benchmark cart is rolled back at the end.
+"""
+import statistics
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import Client
+from django.urls import resolve
+from rest_framework.renderers import JSONRenderer
+
+from cart.models import Cart, CartItem
+from core.compiled import CompiledSerializerMixin
+from core.renderers import FastJSONRenderer, has_fast_encoder
+from products.models import Product, ProductVariation
+from products.views import ProductList
+
+BENCHMARK_CART = 'benchmark-read-path'
+
+DEFAULT_PATHS = [
+    '/api/products/?page_size=48',
+    '/api/products/?page_size=48&ordering=base_price',
+    '/api/blog/posts/',
+    f'/api/cart/?session_id={BENCHMARK_CART}',
+]
+
+
+@contextmanager
+def generic_read_path(paths):
+    """Temporarily switch the given endpoints back to DRF's generic rendering path"""
+    views = {resolve(urlsplit(path).path).func.cls for path in paths}
+    saved = {view: view.renderer_classes for view in views}
+    ProductList.use_read_model = False
+    CompiledSerializerMixin.compiled = False
+    for view in views:
+        view.renderer_classes = [
+            JSONRenderer if renderer is FastJSONRenderer else renderer for renderer in view.renderer_classes
+        ]
+    try:
+        yield
+    finally:
+        ProductList.use_read_model = True
+        CompiledSerializerMixin.compiled = True
+        for view, renderers in saved.items():
+            view.renderer_classes = renderers
+
+
+class Command(BaseCommand):
+    help = 'Compare requests/sec of the product list, blog list and cart on the generic and fast read paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Timed requests per endpoint and mode (default: 100)')
+        parser.add_argument('--rounds', type=int, default=5,
+                            help='Alternate before/after this many times to even out drift (default: 5)')
+        parser.add_argument('--warmup', type=int, default=5,
+                            help='Untimed requests per endpoint and mode, each round (default: 5)')
+        parser.add_argument('--path', action='append', dest='paths',
+                            help='Endpoint to benchmark (repeatable; default: product list, blog list, cart)')
+        parser.add_argument('--cart-items', type=int, default=5,
+                            help='Items in the temporary benchmark cart (default: 5)')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        active_products = Product.objects.filter(is_active=True).count()
+        self.stdout.write(
+            f"Catalog: {active_products} active products | JSON encoder: "
+            f"{'orjson' if has_fast_encoder() else 'stdlib (install orjson for the fast encoder)'}"
+        )
+        if active_products < 10000:
+            self.stdout.write(self.style.WARNING(
+                "⚠️ Fewer than 10,000 active products: numbers will not be representative of production"
+            ))
+        if settings.DEBUG:
+            self.stdout.write(self.style.WARNING("⚠️ DEBUG is on: query logging inflates every timing"))
+
+        with transaction.atomic():
+            self._create_cart(options['cart_items'])
+            client = Client(HTTP_HOST='localhost')
+            rounds = max(options['rounds'], 1)
+            per_round = max(options['requests'] // rounds, 1)
+            before = {path: [] for path in paths}
+            after = {path: [] for path in paths}
+            for _ in range(rounds):
+                with generic_read_path(paths):
+                    for path in paths:
+                        self._measure(client, path, per_round, options['warmup'], before)
+                for path in paths:
+                    self._measure(client, path, per_round, options['warmup'], after)
+            transaction.set_rollback(True)
+
+        before = {path: self._summarize(samples) for path, samples in before.items()}
+        after = {path: self._summarize(samples) for path, samples in after.items()}
+
+        for path in paths:
+            old, new = before[path], after[path]
+            if old is None or new is None:
+                self.stdout.write(self.style.ERROR(f"❌ {path}: non-200 response, skipped"))
+                continue
+            speedup = new['rps'] / old['rps'] if old['rps'] else 0
+            self.stdout.write(
+                f"{path}\n"
+                f"   before {old['rps']:8.1f} req/s  p50 {old['p50']:7.2f} ms  p95 {old['p95']:7.2f} ms  {old['bytes']} bytes\n"
+                f"   after  {new['rps']:8.1f} req/s  p50 {new['p50']:7.2f} ms  p95 {new['p95']:7.2f} ms  {new['bytes']} bytes"
+            )
+            style = self.style.SUCCESS if speedup >= 1 else self.style.WARNING
+            self.stdout.write(style(f"   {'✅' if speedup >= 1 else '⚠️'} {speedup:.2f}x"))
+
+    def _create_cart(self, item_count):
+        cart, _ = Cart.objects.get_or_create(session_id=BENCHMARK_CART)
+        variations = ProductVariation.objects.filter(is_active=True, product__is_active=True)[:item_count]
+        CartItem.objects.bulk_create(
+            [CartItem(cart=cart, variation=variation, quantity=1) for variation in variations],
+            ignore_conflicts=True,
+        )
+
+    def _measure(self, client, path, count, warmup, results):
+        """Append (seconds, bytes) samples to results[path]; None marks a non-200 endpoint"""
+        if None in results[path]:
+            return
+        for _ in range(warmup):
+            if client.get(path).status_code != 200:
+                results[path].append(None)
+                return
+        for _ in range(count):
+            started = time.perf_counter()
+            response = client.get(path)
+            results[path].append((time.perf_counter() - started, len(response.content)))
+
+    def _summarize(self, samples):
+        if not samples or None in samples:
+            return None
+        timings = sorted(seconds for seconds, _ in samples)
+        total = sum(timings)
+        return {
+            'rps': len(timings) / total if total else 0,
+            'p50': statistics.median(timings) * 1000,
+            'p95': timings[max(int(len(timings) * 0.95) - 1, 0)] * 1000,
+            'bytes': samples[-1][1],
+        }
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from core.redirects import compact_redirects
+
+
+class Command(BaseCommand):
+    help = 'Point every redirect straight at its final target and deactivate redirect cycles'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what would change without changing anything',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        if dry_run:
+            self.stdout.write(self.style.WARNING('DRY RUN MODE - No changes will be made'))
+
+        result = compact_redirects(dry_run=dry_run)
+
+        self.stdout.write(f"\n🔗 Chains collapsed: {len(result['collapsed'])}")
+        for old_path, old_target, final_target in result['collapsed']:
+            self.stdout.write(f"   {old_path}: {old_target} → {final_target}")
+
+        self.stdout.write(f"\n🔁 Redirects that loop or lead into a loop (deactivated): {len(result['cycles'])}")
+        for old_path in result['cycles']:
+            self.stdout.write(f"   {old_path}")
+
+        self.stdout.write(self.style.SUCCESS("\n✅ Redirect compaction completed!"))
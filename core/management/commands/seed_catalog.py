@@ -0,0 +1,534 @@
+"""
+Bulk-generate a large, realistic catalog for performance work.
+
+Everything is written with bulk_create in batches from a seeded RNG, so the
+same --seed and size always produce the same data. Products, variations,
+images, tags, carts, orders and blog posts are all covered, and the fields
+that save() or signals would normally derive are filled in directly: the
+primary-image pointer, the variation attribute index, the On Sale tag,
+rendered blog content, the blog search index and the order rollups.
+
+Images point at a small pool of tiny generated JPEGs shared by all products,
+so a 100k-product catalog does not mean 100k files.
+"""
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.signals import post_delete
+from django.utils import timezone
+from django.utils.text import slugify
+
+from blog.models import BlogPost, BlogTag
+from blog.search import rebuild_search_index
+from blog.signals import remove_from_search_index
+from blog.utils import render_content
+from cart.models import Cart, CartItem
+from orders.models import Order, OrderItem
+from orders.signals import remove_order_from_rollup
+from products.attributes import attribute_pairs, canonicalize_attributes
+from products.models import (
+    Product, ProductFAQ, ProductImage, ProductType, ProductVariation, ProductVariationAttribute,
+    RoomCategory, Tag, sale_in_effect,
+)
+from products.signals import update_primary_image_on_delete
+
+# Named fixture sets: products, carts, orders, blog posts
+SIZES = {
+    'small': (1_000, 200, 500, 50),
+    'medium': (10_000, 2_000, 5_000, 200),
+    'large': (100_000, 20_000, 50_000, 500),
+}
+
+ROOMS = [
+    ('Living Room', 'living-room'), ('Bedroom', 'bedroom'), ('Dining Room', 'dining-room'),
+    ('Office', 'office'), ('Outdoor', 'outdoor'), ('Kids Room', 'kids-room'),
+]
+# name, slug, icon, singular noun, rooms it is sold for
+TYPES = [
+    ('Sofas', 'sofas', '🛋️', 'Sofa', ['living-room', 'outdoor']),
+    ('Chairs', 'chairs', '💺', 'Chair', ['living-room', 'dining-room', 'office', 'outdoor']),
+    ('Tables', 'tables', '🪑', 'Table', ['living-room', 'dining-room', 'outdoor']),
+    ('Beds', 'beds', '🛏️', 'Bed', ['bedroom', 'kids-room']),
+    ('Storage', 'storage', '🗄️', 'Wardrobe', ['bedroom', 'kids-room', 'office']),
+    ('Desks', 'desks', '💻', 'Desk', ['office', 'kids-room']),
+    ('Lighting', 'lighting', '💡', 'Floor Lamp', ['living-room', 'bedroom', 'office']),
+    ('Decor', 'decor', '🎨', 'Mirror', ['living-room', 'bedroom', 'dining-room']),
+]
+TAGS = [
+    ('New Arrival', 'new-arrival', '#00FF00'), ('Bestseller', 'bestseller', '#0000FF'),
+    ('Eco-Friendly', 'eco-friendly', '#008000'), ('Luxury', 'luxury', '#FFD700'),
+    ('Modern', 'modern', '#800080'), ('Minimalist', 'minimalist', '#808080'),
+    ('Vintage', 'vintage', '#8B4513'),
+]
+ON_SALE_TAG = ('On Sale', 'on-sale', '#FF0000')
+
+STYLES = [
+    'Nairobi', 'Karen', 'Lavington', 'Kilimani', 'Malindi', 'Lamu', 'Naivasha', 'Nanyuki',
+    'Savanna', 'Baobab', 'Acacia', 'Kilifi', 'Diani', 'Westlands', 'Runda', 'Muthaiga',
+]
+COLORS = ['black', 'grey', 'navy blue', 'cream', 'beige', 'walnut', 'oak', 'white', 'emerald', 'mustard', 'charcoal']
+MATERIALS = ['leather', 'velvet', 'linen', 'fabric', 'mahogany', 'oak', 'teak', 'metal', 'rattan', 'mesh']
+SIZES_BY_TYPE = {
+    'sofas': ['2-seater', '3-seater', '5-seater l-shape'],
+    'beds': ['4x6', '5x6', '6x6'],
+    'tables': ['4-seater', '6-seater', 'coffee'],
+}
+
+FIRST_NAMES = ['Amina', 'Brian', 'Caroline', 'David', 'Esther', 'Felix', 'Grace', 'Hassan', 'Irene', 'James', 'Wanjiru', 'Otieno']
+LAST_NAMES = ['Mwangi', 'Ochieng', 'Kamau', 'Njeri', 'Wekesa', 'Mutua', 'Achieng', 'Kiprono', 'Odhiambo', 'Chebet']
+CITIES = ['Nairobi', 'Mombasa', 'Kisumu', 'Nakuru', 'Eldoret', 'Thika', 'Nyeri', 'Machakos']
+ORDER_STATUSES = [('completed', 50), ('deposit_paid', 20), ('pending', 15), ('payment_failed', 10), ('cancelled', 5)]
+
+BLOG_TAGS = ['Interior Design', 'Buying Guide', 'Care Tips', 'Small Spaces', 'Trends', 'DIY']
+BLOG_TOPICS = [
+    'How to choose the right {noun}', 'Caring for your {material} {noun}', '{count} ways to style a {noun}',
+    'The {material} {noun} buying guide', 'Small-space ideas with a {noun}',
+]
+PARAGRAPHS = [
+    'Measure the room before you shop and leave at least 90cm of walking space around every piece.',
+    'Natural materials age well: oiled hardwood and full-grain leather develop a patina that synthetic finishes never will.',
+    'Mix textures rather than colours when a room feels flat; a linen throw on a velvet sofa does more than a new paint colour.',
+    'Direct sunlight fades fabric quickly, so rotate cushions monthly and consider UV-filtering curtains for west-facing rooms.',
+    'Vacuum upholstery weekly with a soft brush attachment and blot spills immediately instead of rubbing them.',
+    'A rug should be large enough for at least the front legs of every seat in the conversation area to rest on it.',
+    'Scale matters more than style: an oversized sectional will make even a beautiful room feel cramped.',
+    'Lighting in layers - ambient, task and accent - makes the same furniture look completely different at night.',
+]
+
+IMAGE_POOL_DIR = 'products/seed'
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep generated created_at/updated_at values instead of stamping now()"""
+    saved = []
+    for model in models:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                saved.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, auto_now, auto_now_add in saved:
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+@contextmanager
+def per_row_delete_signals_muted():
+    """
+    Bulk deletes would otherwise fire one receiver (and query) per deleted
+    image, order and post; the affected derived data is rebuilt afterwards.
+    """
+    receivers = [
+        (update_primary_image_on_delete, ProductImage),
+        (remove_order_from_rollup, Order),
+        (remove_from_search_index, BlogPost),
+    ]
+    for receiver, sender in receivers:
+        post_delete.disconnect(receiver, sender=sender)
+    try:
+        yield
+    finally:
+        for receiver, sender in receivers:
+            post_delete.connect(receiver, sender=sender)
+
+
+class Command(BaseCommand):
+    help = 'Bulk-generate a deterministic catalog (products, variations, images, tags, carts, orders, blog posts)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--size', choices=sorted(SIZES), default='small',
+                            help='Fixture set: small (1k products), medium (10k) or large (100k). Default: small')
+        parser.add_argument('--products', type=int, help='Override the number of products')
+        parser.add_argument('--carts', type=int, help='Override the number of carts')
+        parser.add_argument('--orders', type=int, help='Override the number of orders')
+        parser.add_argument('--posts', type=int, help='Override the number of blog posts')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (default: 42)')
+        parser.add_argument('--prefix', default='seed',
+                            help='Slug/SKU/session prefix marking generated rows (default: seed)')
+        parser.add_argument('--image-pool', type=int, default=12,
+                            help='Distinct tiny image files shared by all products (default: 12)')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT (default: 2000)')
+        parser.add_argument('--related', action='store_true',
+                            help='Also rebuild the related-products table afterwards')
+        parser.add_argument('--flush', action='store_true',
+                            help='Delete previously generated rows with this prefix first')
+
+    def handle(self, *args, **options):
+        products, carts, orders, posts = SIZES[options['size']]
+        self.product_count = options['products'] if options['products'] is not None else products
+        self.cart_count = options['carts'] if options['carts'] is not None else carts
+        self.order_count = options['orders'] if options['orders'] is not None else orders
+        self.post_count = options['posts'] if options['posts'] is not None else posts
+        self.prefix = slugify(options['prefix'])
+        self.batch_size = options['batch_size']
+        self.rng = random.Random(options['seed'])
+        # Fixed reference time so the same seed generates the same relative dates
+        self.now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        self.rows = 0
+
+        started = time.monotonic()
+        if options['flush']:
+            self.flush()
+        if Product.objects.filter(slug__startswith=f'{self.prefix}-').exists():
+            raise CommandError(f"Generated rows with prefix '{self.prefix}' already exist; rerun with --flush")
+
+        with transaction.atomic():
+            self.step('Taxonomy', self.create_taxonomy)
+            self.step('Image pool', lambda: self.create_image_pool(options['image_pool']))
+            with explicit_timestamps(Product, Cart, Order, BlogPost):
+                self.step('Products', self.create_products)
+                self.step('Product relations', self.create_product_relations)
+                self.step('Images', self.create_images)
+                self.step('Variations', self.create_variations)
+                self.step('FAQs', self.create_faqs)
+                self.step('Carts', self.create_carts)
+                self.step('Orders', self.create_orders)
+                self.step('Blog posts', self.create_posts)
+            self.step('Derived data', self.rebuild_derived)
+
+        if options['related']:
+            from products.recommendations import build_related_products
+            self.step('Related products', lambda: build_related_products().relations)
+
+        elapsed = time.monotonic() - started
+        rate = self.rows / elapsed * 60 if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Seeded {self.rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/min) with seed {options['seed']}"
+        ))
+
+    def step(self, label, func):
+        started = time.monotonic()
+        rows = func() or 0
+        self.rows += rows
+        self.stdout.write(f"   {label}: {rows} rows in {time.monotonic() - started:.2f}s")
+
+    def bulk(self, model, objects):
+        return model.objects.bulk_create(objects, batch_size=self.batch_size)
+
+    # -- taxonomy and files ---------------------------------------------------
+
+    def create_taxonomy(self):
+        created = 0
+        self.rooms = {}
+        for order, (name, slug) in enumerate(ROOMS, start=1):
+            self.rooms[slug], was_created = RoomCategory.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'order': order,
+                                     'description': f'Beautiful furniture for your {name.lower()}'},
+            )
+            created += was_created
+        self.types = []
+        for order, (name, slug, icon, noun, rooms) in enumerate(TYPES, start=1):
+            product_type, was_created = ProductType.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'icon': icon, 'order': order,
+                                     'description': f'Various {name.lower()} for your home'},
+            )
+            self.types.append((product_type, noun, [self.rooms[room] for room in rooms]))
+            created += was_created
+        self.tags = []
+        for name, slug, color in TAGS + [ON_SALE_TAG]:
+            tag, was_created = Tag.objects.get_or_create(slug=slug, defaults={'name': name, 'color_code': color})
+            self.tags.append(tag)
+            created += was_created
+        self.on_sale_tag = self.tags.pop()
+        return created
+
+    def create_image_pool(self, size):
+        """Tiny solid-colour JPEGs in storage, reused by every generated ProductImage"""
+        from PIL import Image
+
+        self.image_pool = []
+        written = 0
+        for index in range(max(size, 1)):
+            name = f'{IMAGE_POOL_DIR}/{self.prefix}-{index:02d}.jpg'
+            # Drawn even when the file already exists so the rest of the run sees the same RNG state
+            colour = tuple(self.rng.randrange(40, 230) for _ in range(3))
+            if not default_storage.exists(name):
+                buffer = io.BytesIO()
+                Image.new('RGB', (32, 24), colour).save(buffer, 'JPEG', quality=70)
+                name = default_storage.save(name, ContentFile(buffer.getvalue()))
+                written += 1
+            self.image_pool.append(name)
+        self.stdout.write(f"   ({written} new image files, {len(self.image_pool)} in pool)")
+        return 0
+
+    # -- catalogue --------------------------------------------------------------
+
+    def create_products(self):
+        rng = self.rng
+        self.products = []  # (id, name, current_price, type index) of active products
+        batch = []
+        meta = []
+        for index in range(self.product_count):
+            type_index = rng.randrange(len(self.types))
+            material = rng.choice(MATERIALS)
+            name = f"{rng.choice(STYLES)} {material.title()} {self.types[type_index][1]}"
+            base_price = Decimal(rng.randrange(50, 2500) * 100)
+            sale_price = sale_start = sale_end = None
+            if rng.random() < 0.25:
+                sale_price = (base_price * Decimal(rng.choice(['0.70', '0.80', '0.85', '0.90']))).quantize(Decimal('1'))
+                sale_start = self.now - timedelta(days=rng.randrange(0, 20))
+                sale_end = self.now + timedelta(days=rng.randrange(-5, 40))
+            created_at = self.now - timedelta(minutes=rng.randrange(0, 365 * 24 * 60))
+            is_active = rng.random() < 0.97
+            batch.append(Product(
+                name=name,
+                slug=f'{self.prefix}-{index:06d}-{slugify(name)}',
+                description=f"{name} in {material}. " + ' '.join(rng.sample(PARAGRAPHS, 2)),
+                base_price=base_price, sale_price=sale_price, sale_start=sale_start, sale_end=sale_end,
+                is_active=is_active, created_at=created_at, updated_at=created_at,
+            ))
+            on_sale = sale_in_effect(sale_price, sale_start, sale_end, self.now)
+            meta.append((name, sale_price if on_sale else base_price, type_index, is_active, on_sale))
+
+        created = self.bulk(Product, batch)
+        for product, (name, price, type_index, is_active, on_sale) in zip(created, meta):
+            if is_active:
+                self.products.append((product.id, name, price, type_index))
+        self.product_meta = [(product.id, *info) for product, info in zip(created, meta)]
+        return len(created)
+
+    def create_product_relations(self):
+        rng = self.rng
+        room_rows, type_rows, tag_rows = [], [], []
+        RoomThrough = Product.room_categories.through
+        TypeThrough = Product.product_types.through
+        TagThrough = Product.tags.through
+        for product_id, _, _, type_index, _, on_sale in self.product_meta:
+            product_type, _, rooms = self.types[type_index]
+            type_rows.append(TypeThrough(product_id=product_id, producttype_id=product_type.id))
+            for room in rng.sample(rooms, min(len(rooms), rng.choice([1, 1, 2]))):
+                room_rows.append(RoomThrough(product_id=product_id, roomcategory_id=room.id))
+            for tag in rng.sample(self.tags, rng.choice([0, 1, 1, 2, 3])):
+                tag_rows.append(TagThrough(product_id=product_id, tag_id=tag.id))
+            if on_sale:
+                tag_rows.append(TagThrough(product_id=product_id, tag_id=self.on_sale_tag.id))
+        for through, rows in ((RoomThrough, room_rows), (TypeThrough, type_rows), (TagThrough, tag_rows)):
+            self.bulk(through, rows)
+        return len(room_rows) + len(type_rows) + len(tag_rows)
+
+    def create_images(self):
+        rng = self.rng
+        images = []
+        for product_id, name, *_ in self.product_meta:
+            for order in range(rng.choice([1, 2, 3, 3, 4])):
+                images.append(ProductImage(
+                    product_id=product_id, image=rng.choice(self.image_pool),
+                    alt_text=f'{name} view {order + 1}'[:100], is_primary=order == 0, order=order,
+                ))
+        self.bulk(ProductImage, images)
+        return len(images)
+
+    def create_variations(self):
+        rng = self.rng
+        variations = []
+        for index, (product_id, _, _, type_index, *_) in enumerate(self.product_meta):
+            type_slug = self.types[type_index][0].slug
+            sizes = SIZES_BY_TYPE.get(type_slug)
+            for number, color in enumerate(rng.sample(COLORS, rng.choice([1, 2, 3, 4]))):
+                attributes = {'color': color, 'material': rng.choice(MATERIALS)}
+                if sizes:
+                    attributes['size'] = rng.choice(sizes)
+                variations.append(ProductVariation(
+                    product_id=product_id,
+                    sku=f'{self.prefix.upper()}-{index:07d}-{number}',
+                    attributes=canonicalize_attributes(attributes),
+                    stock_quantity=rng.choice([0, 2, 5, 10, 25]),
+                    price_modifier=Decimal(rng.choice([0, 0, 0, 1500, 3000, -1000])),
+                    is_active=rng.random() < 0.95,
+                ))
+        created = self.bulk(ProductVariation, variations)
+
+        prices = {product_id: price for product_id, _, price, _ in self.products}
+        names = {product_id: name for product_id, name, _, _ in self.products}
+        self.variations = [
+            (variation.id, names[variation.product_id], variation.attributes,
+             prices[variation.product_id] + variation.price_modifier)
+            for variation in created
+            if variation.is_active and variation.product_id in prices and variation.stock_quantity
+        ]
+        index_rows = [
+            ProductVariationAttribute(
+                variation_id=variation.id, product_id=variation.product_id,
+                name=name, value=value, is_active=variation.is_active,
+            )
+            for variation in created
+            for name, value in attribute_pairs(variation.attributes)
+        ]
+        self.bulk(ProductVariationAttribute, index_rows)
+        return len(created) + len(index_rows)
+
+    def create_faqs(self):
+        rng = self.rng
+        faqs = [
+            ProductFAQ(product_id=product_id, question=question, answer=answer, order=order)
+            for product_id, *_ in self.product_meta
+            for order, (question, answer) in enumerate(rng.sample([
+                ('Is delivery included?', 'Delivery within Nairobi is free; other towns are quoted at checkout.'),
+                ('Can I pay a deposit?', 'Yes, pay half via M-Pesa to confirm and the balance on delivery.'),
+                ('Is assembly required?', 'Our team assembles every piece on delivery at no extra cost.'),
+                ('What is the warranty?', 'Frames carry a five-year warranty; upholstery carries one year.'),
+            ], rng.choice([0, 1, 2])))
+        ]
+        self.bulk(ProductFAQ, faqs)
+        return len(faqs)
+
+    # -- shopping activity -------------------------------------------------------
+
+    def create_carts(self):
+        rng = self.rng
+        if not self.variations:
+            return 0
+        carts = []
+        for index in range(self.cart_count):
+            updated_at = self.now - timedelta(minutes=rng.randrange(0, 60 * 24 * 60))
+            carts.append(Cart(
+                session_id=f'{self.prefix}-cart-{index:08d}',
+                created_at=updated_at - timedelta(minutes=rng.randrange(0, 600)), updated_at=updated_at,
+            ))
+        carts = self.bulk(Cart, carts)
+        items = [
+            CartItem(cart_id=cart.id, variation_id=variation[0], quantity=rng.choice([1, 1, 1, 2]))
+            for cart in carts
+            for variation in rng.sample(self.variations, min(len(self.variations), rng.choice([1, 1, 2, 3, 4])))
+        ]
+        self.bulk(CartItem, items)
+        return len(carts) + len(items)
+
+    def create_orders(self):
+        rng = self.rng
+        if not self.variations:
+            return 0
+        statuses = [status for status, _ in ORDER_STATUSES]
+        weights = [weight for _, weight in ORDER_STATUSES]
+        orders, order_lines = [], []
+        for index in range(self.order_count):
+            lines = [
+                (variation, rng.choice([1, 1, 2]))
+                for variation in rng.sample(self.variations, min(len(self.variations), rng.choice([1, 1, 2, 3])))
+            ]
+            subtotal = sum(price * quantity for (_, _, _, price), quantity in lines)
+            status = rng.choices(statuses, weights)[0]
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            created_at = self.now - timedelta(minutes=rng.randrange(0, 180 * 24 * 60))
+            order = Order(
+                customer_name=f'{first} {last}',
+                customer_email=f'{first}.{last}.{index}@example.com'.lower(),
+                customer_phone=f'2547{rng.randrange(10_000_000, 99_999_999)}',
+                shipping_address=f'{rng.randrange(1, 400)} {rng.choice(STYLES)} Road',
+                shipping_city=rng.choice(CITIES),
+                shipping_zip_code=f'{rng.randrange(100, 999)}00',
+                cart_session=f'{self.prefix}-order-{index:08d}',
+                subtotal=subtotal,
+                status=status,
+                payment_confirmed=status in ('deposit_paid', 'completed'),
+                deposit_paid=status in ('deposit_paid', 'completed'),
+                balance_paid=status == 'completed',
+                created_at=created_at,
+                updated_at=created_at,
+            )
+            order.calculate_downpayment()
+            orders.append(order)
+            order_lines.append(lines)
+
+        orders = self.bulk(Order, orders)
+        items = [
+            OrderItem(
+                order_id=order.id, variation_id=variation_id, product_name=name,
+                variation_attributes=attributes, quantity=quantity,
+                unit_price=price, total_price=price * quantity,
+            )
+            for order, lines in zip(orders, order_lines)
+            for (variation_id, name, attributes, price), quantity in lines
+        ]
+        self.bulk(OrderItem, items)
+        return len(orders) + len(items)
+
+    # -- blog ---------------------------------------------------------------------
+
+    def create_posts(self):
+        rng = self.rng
+        author, _ = User.objects.get_or_create(
+            username=f'{self.prefix}-editor', defaults={'first_name': 'Catalog', 'last_name': 'Editor'},
+        )
+        tags = [BlogTag.objects.get_or_create(name=name)[0] for name in BLOG_TAGS]
+        posts = []
+        for index in range(self.post_count):
+            product_type, noun, _ = rng.choice(self.types)
+            title = rng.choice(BLOG_TOPICS).format(
+                noun=noun.lower(), material=rng.choice(MATERIALS), count=rng.randrange(3, 12),
+            )
+            title = f'{title[0].upper()}{title[1:]}'
+            body = [f'<h2>{title}</h2>'] + [
+                f'<p>{paragraph}</p>' for paragraph in rng.sample(PARAGRAPHS, rng.randrange(3, len(PARAGRAPHS)))
+            ]
+            content = '\n'.join(body)
+            content_format, rendered, text, reading_time = render_content(content)
+            published_at = self.now - timedelta(minutes=rng.randrange(0, 365 * 24 * 60))
+            posts.append(BlogPost(
+                title=title, slug=f'{self.prefix}-{index:05d}-{slugify(title)}'[:200],
+                excerpt=text[:200], content=content, content_format=content_format,
+                rendered_content=rendered, search_text=text, reading_time=reading_time,
+                status='published' if rng.random() < 0.9 else 'draft', is_featured=rng.random() < 0.05,
+                published_at=published_at, created_at=published_at, updated_at=published_at, author=author,
+            ))
+        posts = self.bulk(BlogPost, posts)
+
+        TagThrough = BlogPost.tags.through
+        ProductThrough = BlogPost.related_products.through
+        CategoryThrough = BlogPost.related_categories.through
+        rooms = list(self.rooms.values())
+        tag_rows, product_rows, category_rows = [], [], []
+        for post in posts:
+            tag_rows += [TagThrough(blogpost_id=post.id, blogtag_id=tag.id) for tag in rng.sample(tags, rng.randrange(1, 4))]
+            if self.products:
+                product_rows += [
+                    ProductThrough(blogpost_id=post.id, product_id=product[0])
+                    for product in rng.sample(self.products, min(len(self.products), rng.randrange(0, 7)))
+                ]
+            category_rows += [
+                CategoryThrough(blogpost_id=post.id, roomcategory_id=room.id) for room in rng.sample(rooms, rng.randrange(0, 3))
+            ]
+        for through, rows in ((TagThrough, tag_rows), (ProductThrough, product_rows), (CategoryThrough, category_rows)):
+            self.bulk(through, rows)
+        return len(posts) + len(tag_rows) + len(product_rows) + len(category_rows)
+
+    # -- derived data ---------------------------------------------------------------
+
+    def rebuild_derived(self):
+        primary = ProductImage.objects.filter(product=OuterRef('pk')).order_by('-is_primary', 'order', 'id')
+        Product.objects.filter(slug__startswith=f'{self.prefix}-').update(
+            primary_image=Subquery(primary.values('id')[:1])
+        )
+        rebuild_search_index()
+        call_command('rebuild_order_rollups', stdout=io.StringIO())
+        return 0
+
+    def flush(self):
+        started = time.monotonic()
+        with transaction.atomic(), per_row_delete_signals_muted():
+            deleted = 0
+            for queryset in (
+                BlogPost.objects.filter(slug__startswith=f'{self.prefix}-'),
+                Order.objects.filter(cart_session__startswith=f'{self.prefix}-order-'),
+                Cart.objects.filter(session_id__startswith=f'{self.prefix}-cart-'),
+                Product.objects.filter(slug__startswith=f'{self.prefix}-'),
+            ):
+                deleted += queryset.delete()[0]
+            rebuild_search_index()
+            call_command('rebuild_order_rollups', stdout=io.StringIO())
+        self.stdout.write(self.style.WARNING(
+            f"⚠️ Flushed {deleted} previously generated rows in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,520 @@
+"""
+In-process metrics, exposed in the Prometheus text format at /metrics.
+
+Counters and histograms are kept per process. The web server runs several
+worker processes. With METRICS_DIR set, each process also writes a snapshot
+of its values to its own file in that directory:
+- at most every METRICS_FLUSH_SECONDS
+- when it exits
+
+/metrics sums the snapshots of every process, including ones that have
+exited: a scrape folds the snapshots of exited processes into its own
+process's snapshot and deletes them. Counters therefore never go backwards
+when a worker is recycled.
+
+Gauges (queue depths) are computed from the database at scrape time, so
+they need no merging.
+
+The metrics the app records are defined at the bottom of this module.
+"""
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.db.models import Count
+from django.utils import timezone
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+# Payment ages: from the 5 minute reconciliation threshold up to the 24 hour give-up cut-off
+PAYMENT_AGE_BUCKETS = (60, 300, 600, 1800, 3600, 7200, 21600, 43200, 86400)
+KNOWN_METHODS = frozenset({'GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'})
+
+
+def _format_value(value):
+    value = float(value)
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _merge_snapshot(merged, snapshot, known):
+    """Add a snapshot ({name: [[label values, value], ...]}) into ``merged`` ({name: {labels: value}})"""
+    for name, samples in snapshot.items():
+        if name not in known:
+            continue  # written by an older release
+        values = merged.setdefault(name, {})
+        for labels, value in samples:
+            key = tuple(labels)
+            if isinstance(value, list):
+                current = values.get(key)
+                if current is None or len(current) != len(value):
+                    values[key] = list(value)
+                else:
+                    values[key] = [a + b for a, b in zip(current, value)]
+            else:
+                values[key] = values.get(key, 0.0) + value
+    return merged
+
+
+def _process_exited(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except PermissionError:
+        pass  # alive, but owned by another user
+    return False
+
+
+class Registry:
+    """The process's metrics, plus the snapshot files shared with the other workers"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self._last_flush = 0.0
+        self._pid = None
+        self._snapshot_name = None
+        # Counts taken over from the snapshots of exited processes
+        self.retired = {}
+
+    def register(self, metric):
+        if metric.name in self.metrics:
+            raise ValueError(f'Metric {metric.name} is already registered')
+        self.metrics[metric.name] = metric
+
+    def _directory(self):
+        directory = getattr(settings, 'METRICS_DIR', '')
+        return Path(directory) if directory else None
+
+    def snapshot(self):
+        """{metric name: [[label values, value], ...]} for counters and histograms"""
+        with self.lock:
+            live = {
+                name: [[list(labels), value if isinstance(value, float) else list(value)]
+                       for labels, value in metric.values.items()]
+                for name, metric in self.metrics.items()
+                if metric.kind != 'gauge'
+            }
+            if not self.retired:
+                return live
+            merged = {name: dict(values) for name, values in self.retired.items()}
+        _merge_snapshot(merged, live, self.metrics)
+        return {name: [[list(labels), value] for labels, value in values.items()] for name, values in merged.items()}
+
+    def flush(self):
+        """Write this process's snapshot (atomically) for the other workers' scrapes"""
+        directory = self._directory()
+        if directory is None:
+            return
+        directory.mkdir(parents=True, exist_ok=True)
+        if self._pid != os.getpid():
+            # First flush in this process (workers forked from a preloading master included)
+            self._pid = os.getpid()
+            self._snapshot_name = f'{self._pid}-{time.time_ns()}.json'
+            atexit.register(self.flush)
+        path = directory / self._snapshot_name
+        temporary = path.with_suffix('.tmp')
+        temporary.write_text(json.dumps(self.snapshot()), encoding='utf-8')
+        os.replace(temporary, path)
+        self._last_flush = time.monotonic()
+
+    def maybe_flush(self):
+        if time.monotonic() - self._last_flush >= getattr(settings, 'METRICS_FLUSH_SECONDS', 5):
+            self.flush()
+
+    def fold_exited(self, directory):
+        """
+        Take over the snapshots of exited worker processes: their counts are
+        added to this process's snapshot and their files deleted, so the
+        directory does not grow with every worker restart. Renaming a file
+        claims it, so two workers never fold the same one.
+        """
+        if os.name != 'posix':
+            return  # os.kill(pid, 0) is not a liveness check elsewhere
+        claimed = []
+        for path in directory.glob('*.json'):
+            pid = path.name.split('-', 1)[0]
+            if not pid.isdigit() or int(pid) == os.getpid() or not _process_exited(int(pid)):
+                continue
+            claim = path.with_name(f'{path.name}.{os.getpid()}.folding')
+            try:
+                os.rename(path, claim)
+            except OSError:
+                continue  # another worker got to it first
+            try:
+                snapshot = json.loads(claim.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                snapshot = {}
+            with self.lock:
+                _merge_snapshot(self.retired, snapshot, self.metrics)
+            claimed.append(claim)
+        if claimed:
+            self.flush()
+            for claim in claimed:
+                claim.unlink(missing_ok=True)
+
+    def collect(self):
+        """Counter and histogram values summed over every process's snapshot"""
+        directory = self._directory()
+        if directory is None:
+            snapshots = [self.snapshot()]
+        else:
+            self.flush()
+            self.fold_exited(directory)
+            snapshots = []
+            for path in directory.glob('*.json'):
+                try:
+                    snapshots.append(json.loads(path.read_text(encoding='utf-8')))
+                except (OSError, ValueError):
+                    continue  # a worker is replacing it right now; its values will be back next scrape
+
+        merged = {}
+        for snapshot in snapshots:
+            _merge_snapshot(merged, snapshot, self.metrics)
+        return merged
+
+    def render(self):
+        """The Prometheus text exposition of every metric"""
+        merged = self.collect()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.documentation}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            values = metric.collect() if metric.kind == 'gauge' else merged.get(name, {})
+            for labels, value in sorted(values.items()):
+                lines.extend(metric.sample_lines(labels, value))
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.registry = registry
+        registry.register(self)
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def sample_lines(self, labels, value):
+        return [f'{self.name}{_format_labels(list(zip(self.labelnames, labels)))} {_format_value(value)}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.registry.lock:
+            self.values[key] = self.values.get(key, 0.0) + float(amount)
+
+
+class Gauge(Metric):
+    """A value computed when scraped: ``collect`` returns {label values tuple: value}"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=(), collect=None, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self._collect = collect
+
+    def collect(self):
+        return self._collect() if self._collect else {}
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        # Stored as [per-bucket counts..., +Inf count, sum]
+        key = self._key(labels)
+        with self.registry.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            entry[bisect_left(self.buckets, value)] += 1
+            entry[-1] += value
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def sample_lines(self, labels, value):
+        pairs = list(zip(self.labelnames, labels))
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), value[:-1]):
+            cumulative += count
+            le = '+Inf' if bound == float('inf') else _format_value(bound)
+            lines.append(f'{self.name}_bucket{_format_labels(pairs + [("le", le)])} {_format_value(cumulative)}')
+        lines.append(f'{self.name}_sum{_format_labels(pairs)} {_format_value(value[-1])}')
+        lines.append(f'{self.name}_count{_format_labels(pairs)} {_format_value(cumulative)}')
+        return lines
+
+
+# -- gauges computed at scrape time ---------------------------------------------------
+
+def queue_depths():
+    """Backlogs of the background workers: notifications to send and payments awaiting a result"""
+    from notifications.models import Notification
+    from orders.models import PaymentAttempt
+
+    waiting = (Notification.STATUS_PENDING, Notification.STATUS_SENDING, Notification.STATUS_DEAD)
+    depths = {('notifications', status): 0 for status in waiting}
+    counts = (
+        Notification.objects.filter(status__in=waiting)
+        .values_list('status').annotate(count=Count('id')).order_by()
+    )
+    for status, count in counts:
+        depths[('notifications', status)] = count
+    depths[('payment_attempts', PaymentAttempt.STATUS_PENDING)] = PaymentAttempt.objects.filter(
+        status=PaymentAttempt.STATUS_PENDING
+    ).count()
+    return depths
+
+
+def queue_oldest_age():
+    """Seconds the oldest item of each queue has been waiting"""
+    from notifications.models import Notification
+    from orders.models import PaymentAttempt
+
+    now = timezone.now()
+    oldest = {
+        ('notifications',): Notification.objects.filter(status=Notification.STATUS_PENDING)
+        .order_by('created_at').values_list('created_at', flat=True).first(),
+        ('payment_attempts',): PaymentAttempt.objects.filter(status=PaymentAttempt.STATUS_PENDING)
+        .order_by('created_at').values_list('created_at', flat=True).first(),
+    }
+    return {key: (now - created).total_seconds() if created else 0.0 for key, created in oldest.items()}
+
+
+# -- the app's metrics --------------------------------------------------------------------
+
+HTTP_REQUESTS = Counter(
+    'sofahub_http_requests_total', 'HTTP requests by route and status.', ['method', 'route', 'status'],
+)
+HTTP_REQUEST_DURATION = Histogram(
+    'sofahub_http_request_duration_seconds', 'Time to produce a response, per route.', ['method', 'route'],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    'sofahub_db_queries_per_request', 'Database queries issued by one request, per route.', ['route'],
+    buckets=QUERY_COUNT_BUCKETS,
+)
+DB_QUERY_SECONDS = Counter(
+    'sofahub_db_query_seconds_total', 'Time spent in database queries, per route.', ['route'],
+)
+
+IMAGE_REQUESTS = Counter(
+    'sofahub_image_requests_total', 'Image and media file requests by outcome.', ['endpoint', 'outcome'],
+)
+IMAGE_BYTES = Counter(
+    'sofahub_image_bytes_total', 'Bytes of image and media files served.', ['endpoint'],
+)
+IMAGE_DURATION = Histogram(
+    'sofahub_image_serve_duration_seconds', 'Time to serve an image or media file.', ['endpoint'],
+)
+
+MPESA_CALLS = Counter(
+    'sofahub_mpesa_calls_total', 'Daraja API calls by operation and outcome.', ['operation', 'outcome'],
+)
+MPESA_CALL_DURATION = Histogram(
+    'sofahub_mpesa_call_duration_seconds', 'Daraja API call latency.', ['operation'],
+)
+MPESA_CALLBACKS = Counter(
+    'sofahub_mpesa_callbacks_total', 'M-Pesa callbacks received, by how they were handled.', ['outcome'],
+)
+PAYMENT_RESULTS = Counter(
+    'sofahub_payment_results_total', 'Payment attempts resolved, by result and who resolved them.',
+    ['result', 'source'],
+)
+PAYMENT_RECONCILIATIONS = Counter(
+    'sofahub_payment_reconciliation_total',
+    'Pending payment attempts checked by reconciliation, by outcome.', ['outcome'],
+)
+PAYMENT_PENDING_AGE = Histogram(
+    'sofahub_payment_reconciliation_pending_age_seconds',
+    'Age of the pending payment attempts picked up by reconciliation.', buckets=PAYMENT_AGE_BUCKETS,
+)
+PAYMENT_RESOLUTION_LAG = Histogram(
+    'sofahub_payment_resolution_lag_seconds',
+    'Time from the STK push to its result, for attempts resolved by reconciliation.', buckets=PAYMENT_AGE_BUCKETS,
+)
+
+CART_ADDITIONS = Counter(
+    'sofahub_cart_additions_total', 'Add-to-cart requests by outcome.', ['outcome'],
+)
+CHECKOUTS = Counter(
+    'sofahub_checkouts_total', 'Checkout requests by outcome.', ['outcome'],
+)
+CHECKOUT_VALUE = Counter(
+    'sofahub_checkout_value_kes_total', 'Order subtotal (KES) of checkouts whose payment request was sent.',
+)
+
+QUEUE_DEPTH = Gauge(
+    'sofahub_queue_depth', 'Items waiting in the background queues.', ['queue', 'status'], collect=queue_depths,
+)
+QUEUE_OLDEST_AGE = Gauge(
+    'sofahub_queue_oldest_age_seconds', 'Age of the oldest pending item in each queue.', ['queue'],
+    collect=queue_oldest_age,
+)
+
+
+# -- recording helpers --------------------------------------------------------------------
+
+def route_label(request):
+    """The URL pattern that handled the request (bounded cardinality, unlike the path)"""
+    match = getattr(request, 'resolver_match', None)
+    return f'/{match.route}' if match is not None and match.route else 'unmatched'
+
+
+_active_counter = ContextVar('query_counter', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counter = _active_counter.get()
+    if counter is None:
+        return execute(sql, params, many, context)
+    return counter._execute(execute, sql, params, many, context)
+
+
+def _install_query_hook(connection, **kwargs):
+    if _count_query not in connection.execute_wrappers:
+        # At the front, so execute_wrapper() blocks (which pop the last wrapper) leave it in place
+        connection.execute_wrappers.insert(0, _count_query)
+
+
+def install_query_hooks():
+    """Route the queries of every database connection, in every thread, to the active QueryCounter"""
+    connection_created.connect(_install_query_hook, dispatch_uid='core.metrics')
+    for connection in connections.all(initialized_only=True):
+        _install_query_hook(connection)
+
+
+class QueryCounter:
+    """
+    Counts the queries (and their time) issued while ``count()`` is active,
+    including those an async view runs through sync_to_async; needs
+    install_query_hooks()
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - started
+
+    @contextmanager
+    def count(self):
+        token = _active_counter.set(self)
+        try:
+            yield self
+        finally:
+            _active_counter.reset(token)
+
+
+def observe_request(request, response, seconds, queries):
+    method = request.method if request.method in KNOWN_METHODS else 'OTHER'
+    route = route_label(request)
+    HTTP_REQUESTS.inc(method=method, route=route, status=response.status_code)
+    HTTP_REQUEST_DURATION.observe(seconds, method=method, route=route)
+    DB_QUERIES_PER_REQUEST.observe(queries.queries, route=route)
+    DB_QUERY_SECONDS.inc(queries.seconds, route=route)
+    REGISTRY.maybe_flush()
+
+
+def observe_image_serving(endpoint):
+    """View decorator: count, time and measure the files an image view serves"""
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @functools.wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                started = time.perf_counter()
+                response = await view(request, *args, **kwargs)
+                record_image_response(endpoint, response, time.perf_counter() - started)
+                return response
+            return async_wrapper
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            started = time.perf_counter()
+            response = view(request, *args, **kwargs)
+            record_image_response(endpoint, response, time.perf_counter() - started)
+            return response
+        return wrapper
+    return decorator
+
+
+def record_image_response(endpoint, response, seconds):
+    if response.status_code == 200:
+        outcome = 'served'
+        size = response.get('Content-Length') or (0 if response.streaming else len(response.content))
+        IMAGE_BYTES.inc(int(size), endpoint=endpoint)
+    else:
+        outcome = 'not_found' if response.status_code == 404 else 'error'
+    IMAGE_REQUESTS.inc(endpoint=endpoint, outcome=outcome)
+    IMAGE_DURATION.observe(seconds, endpoint=endpoint)
+
+
+class _Call:
+    outcome = 'ok'
+
+
+@contextmanager
+def mpesa_call(operation):
+    """
+    Time one Daraja API call. Set ``.outcome`` on the yielded object
+    ('accepted', 'rejected', ...); an exception records 'error'.
+    """
+    call = _Call()
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call.outcome = 'error'
+        raise
+    finally:
+        MPESA_CALL_DURATION.observe(time.perf_counter() - started, operation=operation)
+        MPESA_CALLS.inc(operation=operation, outcome=call.outcome)
@@ -0,0 +1,229 @@
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponsePermanentRedirect
+from django.utils.crypto import constant_time_compare
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import metrics, profiling
+from .redirects import resolve_redirect, resolve_redirect_async
+
+# Backend-only URL spaces that never have SEO redirects
+REDIRECT_EXEMPT_PREFIXES = ('/api/', '/admin/', '/media/', '/static/', '/metrics')
+
+
+class HybridMiddleware:
+    """
+    Base for middleware that runs in both WSGI and ASGI deployments: under
+    ASGI ``__call__`` hands over to ``__acall__``, so async views are not
+    pushed back onto a thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.handle(request)
+
+    def handle(self, request):
+        raise NotImplementedError
+
+    async def __acall__(self, request):
+        raise NotImplementedError
+
+
+class RedirectMiddleware(HybridMiddleware):
+    """
+    Answer requests for moved pages with a 301, using the in-memory redirect
+    map (no database query per request).
+    """
+
+    def handle(self, request):
+        if self.applies_to(request):
+            response = self.redirect(request, resolve_redirect(request.path))
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self.applies_to(request):
+            response = self.redirect(request, await resolve_redirect_async(request.path))
+            if response is not None:
+                return response
+        return await self.get_response(request)
+
+    @staticmethod
+    def applies_to(request):
+        return request.method in ('GET', 'HEAD') and not request.path.startswith(REDIRECT_EXEMPT_PREFIXES)
+
+    @staticmethod
+    def redirect(request, entry):
+        if entry is None:
+            return None
+        target = entry['new_path']
+        query_string = request.META.get('QUERY_STRING', '')
+        if query_string:
+            target = f"{target}?{query_string}"
+        return HttpResponsePermanentRedirect(target)
+
+
+class StaticFilesMiddleware(HybridMiddleware, WhiteNoiseMiddleware):
+    """
+    WhiteNoise, made async-capable. WhiteNoise itself only runs sync, which
+    under ASGI would put every request on a thread just to pass through it.
+    Static files are still served from a thread.
+    """
+
+    def __init__(self, get_response=None, settings=settings):
+        WhiteNoiseMiddleware.__init__(self, get_response, settings=settings)
+        HybridMiddleware.__init__(self, get_response)
+
+    def find_static_file(self, request):
+        if self.autorefresh:
+            return self.find_file(request.path_info)
+        return self.files.get(request.path_info)
+
+    def handle(self, request):
+        static_file = self.find_static_file(request)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        path = request.path_info
+        if not self.autorefresh:
+            static_file = self.files.get(path)
+        elif path.startswith(self.static_prefix) or any(path.startswith(prefix) for _, prefix in self.directories):
+            # Autorefresh looks files up on disk; other URLs can never match
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(path)
+        else:
+            static_file = None
+        if static_file is not None:
+            response = await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+            if response.streaming:
+                response.streaming_content = read_in_thread(iter(response.streaming_content))
+            return response
+        return await self.get_response(request)
+
+
+async def read_in_thread(chunks):
+    """Async iterator over a file response's chunks, read in the thread pool instead of all at once"""
+    read = sync_to_async(next, thread_sensitive=False)
+    while (chunk := await read(chunks, None)) is not None:
+        yield chunk
+
+
+class RequestProfilingMiddleware(HybridMiddleware):
+    """
+    Opt-in request profiling, enabled with PROFILING_ENABLED.
+
+    A sampled fraction of requests (PROFILING_SAMPLE_RATE) gets:
+    - a Server-Timing header with total, DB, cache, serialization and render time
+    - one structured log line (see core.profiling)
+
+    Requests slower than PROFILING_SLOW_MS are logged as warnings. A fraction
+    of requests (PROFILING_CPROFILE_RATE) also runs under cProfile, and the
+    profile is logged when the request turns out slow. Sending
+    PROFILING_TOKEN in an X-Profile-Token header forces both for that
+    request, so a slow production endpoint can be diagnosed from the outside.
+    cProfile only follows the current thread, so async requests skip it.
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'PROFILING_ENABLED', False):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.cprofile_rate = settings.PROFILING_CPROFILE_RATE
+        self.slow_seconds = settings.PROFILING_SLOW_MS / 1000
+        self.token = settings.PROFILING_TOKEN
+        profiling.install_hooks()
+
+    def is_forced(self, request):
+        return bool(self.token) and constant_time_compare(request.headers.get('X-Profile-Token', ''), self.token)
+
+    def handle(self, request):
+        forced = self.is_forced(request)
+        if not forced and random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = profiling.RequestProfile()
+        request.profile = profile
+        profiler = None
+        if forced or random.random() < self.cprofile_rate:
+            profiler = profiling.start_cprofile()
+        try:
+            with profile.activate():
+                response = self.get_response(request)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+
+        slow = self.finish(request, response, profile)
+        if profiler is not None and (slow or forced):
+            profiling.report_cprofile(request, profiler)
+        return response
+
+    async def __acall__(self, request):
+        if not self.is_forced(request) and random.random() >= self.sample_rate:
+            return await self.get_response(request)
+
+        profile = profiling.RequestProfile()
+        request.profile = profile
+        with profile.activate():
+            response = await self.get_response(request)
+        self.finish(request, response, profile)
+        return response
+
+    def finish(self, request, response, profile):
+        """Add Server-Timing and log the profile; returns whether the request was slow"""
+        slow = profile.duration >= self.slow_seconds
+        response['Server-Timing'] = profile.server_timing()
+        profiling.log_profile(request, response, profile, slow)
+        return slow
+
+    def process_template_response(self, request, response):
+        """Time DRF/template rendering, which happens after the view returns"""
+        profile = getattr(request, 'profile', None)
+        if profile is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                profile.phases['render'] += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """Request count, latency and DB queries per route (see core.metrics); off with METRICS_ENABLED=false"""
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        metrics.install_query_hooks()
+
+    def handle(self, request):
+        started = time.perf_counter()
+        with metrics.QueryCounter().count() as queries:
+            response = self.get_response(request)
+        metrics.observe_request(request, response, time.perf_counter() - started, queries)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with metrics.QueryCounter().count() as queries:
+            response = await self.get_response(request)
+        metrics.observe_request(request, response, time.perf_counter() - started, queries)
+        return response
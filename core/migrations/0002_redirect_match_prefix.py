@@ -0,0 +1,28 @@
+# Generated by Django 4.2.25 on 2026-10-19 01:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RenameIndex(
+            model_name='redirect',
+            new_name='core_redire_old_pat_90abf3_idx',
+            old_name='core_redire_old_pat_e93f1f_idx',
+        ),
+        migrations.RenameIndex(
+            model_name='redirect',
+            new_name='core_redire_is_acti_b0ee05_idx',
+            old_name='core_redire_is_acti_7fe4e2_idx',
+        ),
+        migrations.AddField(
+            model_name='redirect',
+            name='match_prefix',
+            field=models.BooleanField(default=False, help_text='Also redirect paths below old_path, keeping the rest of the path (e.g. /category/old/x → /category/new/x)'),
+        ),
+    ]
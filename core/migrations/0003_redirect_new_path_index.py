@@ -0,0 +1,17 @@
+# Generated by Django 4.2.25 on 2026-10-19 01:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_redirect_match_prefix'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='redirect',
+            index=models.Index(fields=['new_path'], name='core_redire_new_pat_afe5dd_idx'),
+        ),
+    ]
@@ -1,8 +1,69 @@
+import copy
+
 from django.db import models
+from django.db.models.fields.files import FieldFile
+
+
+class TrackedFieldsMixin:
+    """
+    Model mixin that remembers the values of ``tracked_fields`` as they were
+    loaded from the database, so save() and signal handlers can tell what
+    changed without re-fetching the row.
+
+    Instances that were never saved report every tracked field as changed.
+    The snapshot is taken again after each save, so post_save receivers still
+    see the values from before the save.
+    """
+    tracked_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_tracked_fields()
+        return instance
+
+    def _tracked_value(self, name):
+        value = getattr(self, name)
+        if isinstance(value, FieldFile):
+            return value.name or ''
+        if isinstance(value, (dict, list)):
+            # JSON values are often mutated in place; keep an independent copy
+            return copy.deepcopy(value)
+        return value
 
-# Create your models here.
+    def _snapshot_tracked_fields(self):
+        deferred = self.get_deferred_fields()
+        self._loaded_values = {
+            name: self._tracked_value(name)
+            for name in self.tracked_fields
+            if name not in deferred
+        }
 
-class Redirect(models.Model):
+    @property
+    def changed_fields(self):
+        """Names of tracked fields whose value differs from the loaded one"""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return set(self.tracked_fields)
+        return {name for name, old_value in loaded.items() if self._tracked_value(name) != old_value}
+
+    def has_changed(self, name):
+        return name in self.changed_fields
+
+    def get_loaded_value(self, name):
+        """Value of a tracked field when the instance was loaded (None for new instances)"""
+        return getattr(self, '_loaded_values', {}).get(name)
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot_tracked_fields()
+
+
+class Redirect(TrackedFieldsMixin, models.Model):
     """
     Model to store URL redirects for SEO purposes.
     Automatically created when product, category, or blog post slugs change.
@@ -22,15 +83,23 @@ class Redirect(models.Model):
         default='manual',
         help_text="Type of redirect"
     )
+    match_prefix = models.BooleanField(
+        default=False,
+        help_text="Also redirect paths below old_path, keeping the rest of the path (e.g. /category/old/x → /category/new/x)"
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    # Fields the in-memory redirect map depends on
+    tracked_fields = ('old_path', 'new_path', 'redirect_type', 'match_prefix', 'is_active')
     
     class Meta:
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['old_path']),
             models.Index(fields=['is_active', 'old_path']),
+            models.Index(fields=['new_path']),
         ]
     
     def __str__(self):
@@ -0,0 +1,20 @@
+from rest_framework.pagination import PageNumberPagination
+
+
+class OptionalPageNumberPagination(PageNumberPagination):
+    """
+    Page-number pagination that only kicks in when the client asks for it.
+
+    Requests without ?page= or ?page_size= keep receiving a plain list, so
+    existing frontends are unaffected; clients that pass either parameter get
+    the usual {count, next, previous, results} envelope.
+    """
+    page_size = 12
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.page_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
@@ -0,0 +1,265 @@
+"""
+Per-request profiling.
+
+A RequestProfile collects where one request spent its time:
+- wall time
+- SQL query count and time, and repeated statements
+- cache hits and misses
+- time spent serializing and rendering the response
+
+RequestProfilingMiddleware (core.middleware) creates one for each sampled
+request. The hooks installed here record into the profile that is active in
+the current context, so with no active profile they cost one ContextVar
+lookup. The context follows the request into sync_to_async threads, so
+async views are profiled too.
+"""
+import cProfile
+import functools
+import io
+import json
+import logging
+import pstats
+import re
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.utils import timezone
+from django.utils.text import slugify
+
+logger = logging.getLogger(__name__)
+
+_active_profile = ContextVar('request_profile', default=None)
+_MISSING = object()
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_VALUE_LIST_RE = re.compile(r'\((?:\s*(?:%s|\?|N)\s*,)+\s*(?:%s|\?|N)\s*\)')
+
+
+def fingerprint(sql):
+    """SQL with literals and IN/VALUES lists collapsed, so repeats of one statement group together"""
+    sql = _STRING_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('N', sql)
+    return _VALUE_LIST_RE.sub('(...)', sql)
+
+
+class RequestProfile:
+    """Counters for one request; see RequestProfilingMiddleware"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.statements = defaultdict(lambda: [0, 0.0])  # sql -> [count, seconds]
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.phases = defaultdict(float)  # 'serialize' / 'render' -> seconds
+        self._open_phases = set()
+
+    @contextmanager
+    def activate(self):
+        """Make this the current profile; install_hooks() routes queries and cache reads to it"""
+        token = _active_profile.set(self)
+        try:
+            yield self
+        finally:
+            _active_profile.reset(token)
+            self.duration = time.perf_counter() - self.started
+
+    def _execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.queries += 1
+            self.db_time += elapsed
+            entry = self.statements[sql]
+            entry[0] += 1
+            entry[1] += elapsed
+
+    @contextmanager
+    def phase(self, name):
+        """Add the block's time to a phase; nested blocks of the same phase count once"""
+        if name in self._open_phases:
+            yield
+            return
+        self._open_phases.add(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._open_phases.discard(name)
+            self.phases[name] += time.perf_counter() - started
+
+    def repeated_queries(self, limit=5):
+        """The statements run more than once, most repeated first (the usual N+1 signature)"""
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, (count, seconds) in self.statements.items():
+            entry = grouped[fingerprint(sql)]
+            entry[0] += count
+            entry[1] += seconds
+        repeated = [
+            {
+                # Keep both ends of long statements: the FROM/WHERE tell repeats apart
+                'sql': sql if len(sql) <= 300 else f'{sql[:150]} ... {sql[-150:]}',
+                'count': count,
+                'ms': round(seconds * 1000, 2),
+            }
+            for sql, (count, seconds) in grouped.items() if count > 1
+        ]
+        repeated.sort(key=lambda entry: (-entry['count'], -entry['ms']))
+        return repeated[:limit]
+
+    def server_timing(self):
+        """Server-Timing header value (shown in the browser's network panel)"""
+        repeated = sum(entry['count'] for entry in self.repeated_queries(limit=None))
+        metrics = [
+            f'total;dur={self.duration * 1000:.1f}',
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries, {repeated} repeated"',
+            f'cache;desc="{self.cache_hits} hits, {self.cache_misses} misses"',
+        ]
+        metrics += [f'{name};dur={seconds * 1000:.1f}' for name, seconds in sorted(self.phases.items())]
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        return {
+            'duration_ms': round(self.duration * 1000, 2),
+            'db_queries': self.queries,
+            'db_ms': round(self.db_time * 1000, 2),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+            **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in sorted(self.phases.items())},
+            'repeated_queries': self.repeated_queries(),
+        }
+
+
+def profile_phase(name):
+    """Decorator: count the function's time as ``name`` in the active profile, if any"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profile = _active_profile.get()
+            if profile is None:
+                return func(*args, **kwargs)
+            with profile.phase(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _profile_query(execute, sql, params, many, context):
+    profile = _active_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    return profile._execute(execute, sql, params, many, context)
+
+
+def _install_query_hook(connection, **kwargs):
+    if _profile_query not in connection.execute_wrappers:
+        # At the front, so execute_wrapper() blocks (which pop the last wrapper) leave it in place
+        connection.execute_wrappers.insert(0, _profile_query)
+
+
+def _profiled_cache_get(get):
+    @functools.wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        profile = _active_profile.get()
+        if profile is None:
+            return get(self, key, default, version)
+        value = get(self, key, _MISSING, version)
+        if value is _MISSING:
+            profile.cache_misses += 1
+            return default
+        profile.cache_hits += 1
+        return value
+    return wrapper
+
+
+def _profiled_cache_get_many(get_many):
+    @functools.wraps(get_many)
+    def wrapper(self, keys, version=None):
+        profile = _active_profile.get()
+        if profile is None:
+            return get_many(self, keys, version=version)
+        keys = list(keys)
+        # Some backends implement get_many with get(); count each key once
+        token = _active_profile.set(None)
+        try:
+            found = get_many(self, keys, version=version)
+        finally:
+            _active_profile.reset(token)
+        profile.cache_hits += len(found)
+        profile.cache_misses += len(keys) - len(found)
+        return found
+    return wrapper
+
+
+def install_hooks():
+    """
+    Time queries on every database connection (in every thread), and wrap the
+    configured cache backends' get/get_many and DRF's serializer.data, so
+    active profiles see DB, cache and serialization activity.
+    Safe to call more than once.
+    """
+    from rest_framework.serializers import BaseSerializer
+
+    connection_created.connect(_install_query_hook, dispatch_uid='core.profiling')
+    for connection in connections.all(initialized_only=True):
+        _install_query_hook(connection)
+
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if not getattr(backend, '_profiling_hooks', False):
+            backend.get = _profiled_cache_get(backend.get)
+            backend.get_many = _profiled_cache_get_many(backend.get_many)
+            backend._profiling_hooks = True
+
+    # Serializer.data and ListSerializer.data both go through BaseSerializer.data
+    if not getattr(BaseSerializer, '_profiling_hooks', False):
+        BaseSerializer.data = property(profile_phase('serialize')(BaseSerializer.data.fget))
+        BaseSerializer._profiling_hooks = True
+
+
+def start_cprofile():
+    """A running cProfile.Profile, or None if another profiler already owns the interpreter"""
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        return None
+    return profiler
+
+
+def report_cprofile(request, profiler, limit=25):
+    """Log the top functions by cumulative time and, if PROFILING_CPROFILE_DIR is set, save the stats"""
+    output = io.StringIO()
+    stats = pstats.Stats(profiler, stream=output)
+    stats.sort_stats('cumulative').print_stats(limit)
+    logger.warning("cProfile for %s %s\n%s", request.method, request.path, output.getvalue())
+
+    directory = getattr(settings, 'PROFILING_CPROFILE_DIR', '')
+    if directory:
+        Path(directory).mkdir(parents=True, exist_ok=True)
+        name = f"{timezone.now():%Y%m%dT%H%M%S%f}-{request.method}-{slugify(request.path)[:80] or 'root'}.prof"
+        stats.dump_stats(str(Path(directory) / name))
+
+
+def log_profile(request, response, profile, slow):
+    """One JSON log line per profiled request; slow requests are logged as warnings"""
+    data = {
+        'method': request.method,
+        'path': request.path,
+        'status': response.status_code,
+        'slow': slow,
+        **profile.as_dict(),
+    }
+    logger.log(logging.WARNING if slow else logging.INFO, 'request_profile %s', json.dumps(data))
@@ -0,0 +1,245 @@
+"""
+Redirect map and redirect graph maintenance.
+
+Active Redirect rows are loaded once into a dict of exact paths plus a list of
+prefix rules, so resolving a path is a dictionary lookup instead of a query.
+The map's version is the Redirect table's row count plus its latest
+``updated_at``, read from the database, so it is the same in every worker
+whatever cache backend is configured. Each process compares its loaded version
+at most once per REDIRECT_MAP_CHECK_INTERVAL seconds and reloads when it
+changed; saves and deletes in the current process reload it right away.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max
+from django.utils import timezone
+
+
+def normalize_path(path):
+    """Leading slash, no trailing slash (except for the root), no query string."""
+    path = (path or '').split('?', 1)[0].strip()
+    if not path.startswith('/'):
+        path = '/' + path
+    if len(path) > 1:
+        path = path.rstrip('/') or '/'
+    return path
+
+
+def follow_chain(path, edges):
+    """
+    Follow ``edges`` (old_path -> new_path) from ``path`` to the final target.
+    Returns ``(final_path, cycle)``; ``cycle`` is the list of paths forming a
+    loop if one is reached, otherwise an empty list.
+    """
+    seen = [path]
+    current = path
+    while current in edges:
+        current = edges[current]
+        if current in seen:
+            return current, seen[seen.index(current):]
+        seen.append(current)
+    return current, []
+
+
+class RedirectMap:
+    def __init__(self):
+        self.exact = {}
+        self.prefixes = []  # (old_path, entry), longest prefix first
+        self.version = None
+        self.loaded = False
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def check_interval(self):
+        return getattr(settings, 'REDIRECT_MAP_CHECK_INTERVAL', 5)
+
+    def invalidate(self):
+        """
+        Force a reload on the next lookup in this process. Other processes
+        notice the change through current_version() within check_interval.
+        """
+        self.loaded = False
+
+    @staticmethod
+    def current_version():
+        """(row count, latest updated_at) of the Redirect table; changes on every insert, update or delete"""
+        from .models import Redirect
+
+        stats = Redirect.objects.aggregate(count=Count('id'), updated=Max('updated_at'))
+        return stats['count'], stats['updated']
+
+    def is_fresh(self):
+        """True while lookups can skip the version check (no database access needed)"""
+        return self.loaded and time.monotonic() - self.checked_at < self.check_interval
+
+    def _ensure_fresh(self):
+        if self.is_fresh():
+            return
+        now = time.monotonic()
+        version = self.current_version()
+        if self.loaded and version == self.version:
+            self.checked_at = now
+            return
+        with self.lock:
+            if not self.loaded or version != self.version:
+                self._load(version)
+            self.checked_at = now
+
+    def _load(self, version):
+        from .models import Redirect
+
+        exact = {}
+        prefixes = []
+        rows = Redirect.objects.filter(is_active=True).values(
+            'id', 'old_path', 'new_path', 'redirect_type', 'match_prefix',
+            'is_active', 'created_at', 'updated_at',
+        )
+        for row in rows:
+            old_path = normalize_path(row['old_path'])
+            exact[old_path] = row
+            if row['match_prefix'] and old_path != '/':
+                prefixes.append((old_path, row))
+        prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+
+        # Collapse any remaining chains so every lookup is a single hop, and
+        # drop rules that loop back on themselves.
+        edges = {old_path: normalize_path(row['new_path']) for old_path, row in exact.items()}
+        for old_path, row in list(exact.items()):
+            final_path, cycle = follow_chain(old_path, edges)
+            if cycle:
+                del exact[old_path]
+            elif final_path != normalize_path(row['new_path']):
+                exact[old_path] = {**row, 'new_path': final_path}
+
+        self.exact = exact
+        self.prefixes = prefixes
+        self.version = version
+        self.loaded = True
+
+    def resolve(self, path):
+        """
+        Return the redirect entry for ``path`` (a dict shaped like
+        RedirectSerializer output) or None. Prefix matches get ``new_path``
+        with the remainder of the requested path appended.
+        """
+        self._ensure_fresh()
+        return self.lookup(path)
+
+    def lookup(self, path):
+        """resolve() against the map as loaded, without checking its version"""
+        path = normalize_path(path)
+
+        entry = self.exact.get(path)
+        if entry is not None:
+            return entry
+
+        for old_path, entry in self.prefixes:
+            if path.startswith(old_path + '/'):
+                return {**entry, 'new_path': entry['new_path'].rstrip('/') + path[len(old_path):]}
+        return None
+
+    def resolve_many(self, paths):
+        return {path: self.resolve(path) for path in paths}
+
+
+redirect_map = RedirectMap()
+
+
+def point_redirect(old_path, new_path, redirect_type):
+    """
+    Record that ``old_path`` moved to ``new_path`` while keeping the redirect
+    graph one hop deep:
+
+    * a redirect *from* ``new_path`` is removed, since that URL is live again
+      (otherwise renaming a -> b -> a would loop);
+    * ``old_path`` -> ``new_path`` is created or updated;
+    * every redirect that pointed at ``old_path`` is re-pointed at ``new_path``.
+
+    Returns ``(redirect, created, repointed_count)``.
+    """
+    from .models import Redirect
+
+    old_path = normalize_path(old_path)
+    new_path = normalize_path(new_path)
+
+    with transaction.atomic():
+        Redirect.objects.filter(old_path=new_path).delete()
+
+        redirect, created = Redirect.objects.get_or_create(
+            old_path=old_path,
+            defaults={
+                'new_path': new_path,
+                'redirect_type': redirect_type,
+                'is_active': True,
+            }
+        )
+        if not created and (redirect.new_path != new_path or not redirect.is_active):
+            redirect.new_path = new_path
+            redirect.is_active = True
+            redirect.save()
+
+        repointed = Redirect.objects.filter(new_path=old_path).exclude(pk=redirect.pk).update(
+            new_path=new_path, updated_at=timezone.now()
+        )
+        # update() bypasses post_save, so reload the map explicitly
+        transaction.on_commit(invalidate_redirect_map)
+
+    return redirect, created, repointed
+
+
+def compact_redirects(dry_run=False):
+    """
+    Rewrite every active redirect to point straight at its final target and
+    deactivate redirects that loop or lead into a loop.
+
+    Returns a dict with the rewritten ``(old_path, old_target, new_target)``
+    tuples under 'collapsed' and the deactivated paths under 'cycles'.
+    """
+    from .models import Redirect
+
+    rows = list(Redirect.objects.filter(is_active=True).values_list('id', 'old_path', 'new_path'))
+    edges = {normalize_path(old_path): normalize_path(new_path) for _, old_path, new_path in rows}
+
+    collapsed = []
+    cyclic_ids = []
+    cyclic_paths = []
+    for pk, old_path, new_path in rows:
+        final_path, cycle = follow_chain(normalize_path(old_path), edges)
+        if cycle:
+            cyclic_ids.append(pk)
+            cyclic_paths.append(old_path)
+        elif final_path != normalize_path(new_path):
+            collapsed.append((pk, old_path, new_path, final_path))
+
+    if not dry_run and (collapsed or cyclic_ids):
+        with transaction.atomic():
+            now = timezone.now()
+            for pk, _, _, final_path in collapsed:
+                Redirect.objects.filter(pk=pk).update(new_path=final_path, updated_at=now)
+            Redirect.objects.filter(pk__in=cyclic_ids).update(is_active=False, updated_at=now)
+            transaction.on_commit(invalidate_redirect_map)
+
+    return {
+        'collapsed': [(old_path, new_path, final_path) for _, old_path, new_path, final_path in collapsed],
+        'cycles': cyclic_paths,
+    }
+
+
+def resolve_redirect(path):
+    return redirect_map.resolve(path)
+
+
+async def resolve_redirect_async(path):
+    """resolve_redirect for async code: only hops to a thread when the map has to query the database"""
+    if redirect_map.is_fresh():
+        return redirect_map.lookup(path)
+    return await sync_to_async(resolve_redirect)(path)
+
+
+def invalidate_redirect_map():
+    redirect_map.invalidate()
@@ -0,0 +1,49 @@
+"""
+JSON rendering for the API.
+
+FastJSONRenderer is a drop-in replacement for DRF's JSONRenderer that encodes
+with orjson when it is installed (several times faster on large lists) and
+falls back to DRF's encoder otherwise. Values orjson does not know natively
+(Decimal, lazy strings, datetimes) go through DRF's own encoder, so the output
+is the same either way.
+"""
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+# DRF's encoder.default: Decimal -> float, datetime -> ISO 8601 with 'Z', lazy strings, etc.
+_drf_default = JSONEncoder().default
+
+if orjson is not None:
+    # Integer dict keys are used for side-loaded objects; datetimes keep DRF's formatting
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+
+def has_fast_encoder():
+    return orjson is not None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer that uses orjson for compact output when available"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        # Indented output (?indent / Accept: ...; indent=) is for humans: leave it to DRF
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=_drf_default, option=ORJSON_OPTIONS)
+        # Same as DRF: escape the two line terminators that are valid JSON but not valid JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+def json_response(data, status=200):
+    """A JSON HttpResponse rendered like the API's, for plain Django views (DRF views cannot be async)"""
+    return HttpResponse(FastJSONRenderer().render(data), status=status, content_type='application/json')
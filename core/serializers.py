@@ -5,6 +5,6 @@ from .models import Redirect
 class RedirectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Redirect
-        fields = ['id', 'old_path', 'new_path', 'redirect_type', 'is_active', 'created_at', 'updated_at']
+        fields = ['id', 'old_path', 'new_path', 'redirect_type', 'match_prefix', 'is_active', 'created_at', 'updated_at']
         read_only_fields = ['created_at', 'updated_at']
 
@@ -1,8 +1,13 @@
-from django.db.models.signals import post_save, pre_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User, Permission
 from django.contrib.contenttypes.models import ContentType
 from .models import Redirect
+from .redirects import invalidate_redirect_map, point_redirect
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 @receiver(post_save, sender=User)
@@ -19,7 +24,7 @@ def set_user_permissions(sender, instance, created, **kwargs):
             set_staff_permissions(instance)
         except Exception as e:
             # If there's an error, just log it and continue
-            print(f"Warning: Could not set permissions for {instance.username}: {e}")
+            logger.warning("Could not set permissions for %s: %s", instance.username, e)
 
 
 def set_staff_permissions(user):
@@ -58,16 +63,24 @@ def set_staff_permissions(user):
         all_permissions = product_permissions | contact_permissions | order_permissions | cart_permissions
         user.user_permissions.set(all_permissions)
         
-        print(f"✅ Set permissions for staff user: {user.username}")
-        print(f"   - Product permissions: {product_permissions.count()}")
-        print(f"   - Contact permissions: {contact_permissions.count()}")
-        print(f"   - Order permissions: {order_permissions.count()}")
-        print(f"   - Cart permissions: {cart_permissions.count()}")
+        logger.info("Set permissions for staff user %s", user.username)
         
     except ContentType.DoesNotExist as e:
-        print(f"Warning: ContentType not found: {e}")
+        logger.warning("ContentType not found: %s", e)
     except Exception as e:
-        print(f"Warning: Error setting permissions: {e}")
+        logger.warning("Error setting permissions: %s", e)
+
+
+@receiver(post_save, sender=Redirect)
+def reload_redirect_map_on_save(sender, instance, created, **kwargs):
+    """Rebuild the in-memory redirect map once the change is committed"""
+    if created or instance.changed_fields:
+        transaction.on_commit(invalidate_redirect_map)
+
+
+@receiver(post_delete, sender=Redirect)
+def reload_redirect_map_on_delete(sender, **kwargs):
+    transaction.on_commit(invalidate_redirect_map)
 
 
 # Redirect signal handlers for slug changes
@@ -85,86 +98,36 @@ def create_redirect_if_slug_changed(instance, old_slug, new_slug, redirect_type)
         old_path = f"{path_prefix}{old_slug}"
         new_path = f"{path_prefix}{new_slug}"
         
-        # Create redirect if it doesn't already exist
-        redirect, created = Redirect.objects.get_or_create(
-            old_path=old_path,
-            defaults={
-                'new_path': new_path,
-                'redirect_type': redirect_type,
-                'is_active': True
-            }
-        )
-        
-        if created:
-            print(f"✅ Created redirect: {old_path} → {new_path}")
-        elif redirect.new_path != new_path:
-            # Update redirect if path changed again
-            redirect.new_path = new_path
-            redirect.save()
-            print(f"✅ Updated redirect: {old_path} → {new_path}")
-
-
-# Store old slugs before save
-_product_old_slugs = {}
-_category_old_slugs = {}
-_blog_old_slugs = {}
+        # Create the redirect and re-point older redirects at the new path,
+        # so every legacy URL resolves in a single hop
+        redirect, created, repointed = point_redirect(old_path, new_path, redirect_type)
 
-
-@receiver(pre_save, sender='products.Product')
-def store_product_old_slug(sender, instance, **kwargs):
-    """Store old slug before product save"""
-    if instance.pk:
-        try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            _product_old_slugs[instance.pk] = old_instance.slug
-        except sender.DoesNotExist:
-            pass
+        if created:
+            logger.info("Created redirect %s -> %s", old_path, new_path)
+        else:
+            logger.info("Updated redirect %s -> %s", old_path, new_path)
+        if repointed:
+            logger.info("Re-pointed %s older redirect(s) to %s", repointed, new_path)
 
 
+# Old slugs come from the models' loaded-value snapshot (core.models.TrackedFieldsMixin),
+# so no extra query is needed before each save.
 @receiver(post_save, sender='products.Product')
 def handle_product_slug_change(sender, instance, created, **kwargs):
     """Create redirect when product slug changes"""
-    if not created and instance.pk in _product_old_slugs:
-        old_slug = _product_old_slugs[instance.pk]
-        create_redirect_if_slug_changed(instance, old_slug, instance.slug, 'product')
-        del _product_old_slugs[instance.pk]
-
-
-@receiver(pre_save, sender='products.RoomCategory')
-def store_category_old_slug(sender, instance, **kwargs):
-    """Store old slug before category save"""
-    if instance.pk:
-        try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            _category_old_slugs[instance.pk] = old_instance.slug
-        except sender.DoesNotExist:
-            pass
+    if not created and instance.has_changed('slug'):
+        create_redirect_if_slug_changed(instance, instance.get_loaded_value('slug'), instance.slug, 'product')
 
 
 @receiver(post_save, sender='products.RoomCategory')
 def handle_category_slug_change(sender, instance, created, **kwargs):
     """Create redirect when category slug changes"""
-    if not created and instance.pk in _category_old_slugs:
-        old_slug = _category_old_slugs[instance.pk]
-        create_redirect_if_slug_changed(instance, old_slug, instance.slug, 'category')
-        del _category_old_slugs[instance.pk]
-
-
-@receiver(pre_save, sender='blog.BlogPost')
-def store_blog_old_slug(sender, instance, **kwargs):
-    """Store old slug before blog post save"""
-    if instance.pk:
-        try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            _blog_old_slugs[instance.pk] = old_instance.slug
-        except sender.DoesNotExist:
-            pass
+    if not created and instance.has_changed('slug'):
+        create_redirect_if_slug_changed(instance, instance.get_loaded_value('slug'), instance.slug, 'category')
 
 
 @receiver(post_save, sender='blog.BlogPost')
 def handle_blog_slug_change(sender, instance, created, **kwargs):
     """Create redirect when blog post slug changes"""
-    if not created and instance.pk in _blog_old_slugs:
-        old_slug = _blog_old_slugs[instance.pk]
-        create_redirect_if_slug_changed(instance, old_slug, instance.slug, 'blog')
-        del _blog_old_slugs[instance.pk]
+    if not created and instance.has_changed('slug'):
+        create_redirect_if_slug_changed(instance, instance.get_loaded_value('slug'), instance.slug, 'blog')
@@ -3,6 +3,7 @@ from . import views
 
 urlpatterns = [
     path('redirects/', views.RedirectList.as_view(), name='redirect-list'),
+    path('redirects/resolve/', views.resolve_redirects, name='redirect-resolve'),
     path('redirects/<path:path>/', views.RedirectDetail.as_view(), name='redirect-detail'),
 ]
 
@@ -1,3 +1,4 @@
+import logging
 import uuid
 from django.utils import timezone
 from PIL import Image
@@ -5,6 +6,9 @@ from io import BytesIO
 from django.core.files.uploadedfile import InMemoryUploadedFile
 import sys
 
+logger = logging.getLogger(__name__)
+
+
 def generate_session_id():
     """Generate a unique session ID for anonymous users"""
     return str(uuid.uuid4())
@@ -16,30 +20,37 @@ def is_sale_active(sale_start, sale_end):
         return sale_start <= now <= sale_end
     return False
 
-def get_image_url(image_id, request=None):
+def get_image_base_url(request=None):
     """
-    Generate absolute URL for a product image by ID.
-    
-    Args:
-        image_id: The ProductImage ID
-        request: Optional HTTP request object for building absolute URI
-        
-    Returns:
-        Absolute URL string for the image endpoint
+    Absolute URL prefix of the ID-based image endpoint ('.../api/images/').
+    List serializers compute it once per response instead of once per image.
     """
     if request:
-        return request.build_absolute_uri(f'/api/images/{image_id}/')
+        return request.build_absolute_uri('/api/images/')
     
     # Fallback when request context is not available
     from django.conf import settings
     if hasattr(settings, 'SITE_URL'):
-        return f"{settings.SITE_URL}/api/images/{image_id}/"
+        return f"{settings.SITE_URL}/api/images/"
     
     # Final fallback - use DEBUG setting
     if settings.DEBUG:
-        return f"http://localhost:8000/api/images/{image_id}/"
+        return "http://localhost:8000/api/images/"
     else:
-        return f"https://sofahubbackend-production.up.railway.app/api/images/{image_id}/"
+        return "https://sofahubbackend-production.up.railway.app/api/images/"
+
+def get_image_url(image_id, request=None):
+    """
+    Generate absolute URL for a product image by ID.
+    
+    Args:
+        image_id: The ProductImage ID
+        request: Optional HTTP request object for building absolute URI
+        
+    Returns:
+        Absolute URL string for the image endpoint
+    """
+    return f"{get_image_base_url(request)}{image_id}/"
 
 def optimize_image(image, max_width=2000, max_height=2000, quality=85):
     """
@@ -67,7 +78,7 @@ def optimize_image(image, max_width=2000, max_height=2000, quality=85):
             new_height = int(original_height * ratio)
             # Use fastest possible resize
             img = img.resize((new_width, new_height), Image.Resampling.NEAREST)
-            print(f"✅ Emergency resize: {original_width}x{original_height} → {new_width}x{new_height}")
+            logger.debug("Emergency resize: %sx%s -> %sx%s", original_width, original_height, new_width, new_height)
         
         # Convert to RGB only if absolutely necessary
         if img.mode not in ('RGB', 'L'):
@@ -91,7 +102,7 @@ def optimize_image(image, max_width=2000, max_height=2000, quality=85):
         return optimized_image
         
     except Exception as e:
-        print(f"⚠️ Image optimization failed: {e}. Using original image.")
+        logger.warning("Image optimization failed, using original image: %s", e)
         return image
 
 def optimize_image_storage(image, max_width=2000, max_height=2000, quality=75):
@@ -128,7 +139,7 @@ def optimize_image_storage(image, max_width=2000, max_height=2000, quality=75):
             new_height = int(original_height * ratio)
             # Use fast resize method
             img = img.resize((new_width, new_height), Image.Resampling.NEAREST)
-            print(f"📦 Resized for storage: {original_width}x{original_height} → {new_width}x{new_height}")
+            logger.debug("Resized for storage: %sx%s -> %sx%s", original_width, original_height, new_width, new_height)
         
         # Save with aggressive compression to reduce storage
         output = BytesIO()
@@ -140,7 +151,7 @@ def optimize_image_storage(image, max_width=2000, max_height=2000, quality=75):
         new_size = output.getbuffer().nbytes
         if original_size > 0:
             savings = ((original_size - new_size) / original_size) * 100
-            print(f"💾 Storage saved: {original_size/1024:.1f}KB → {new_size/1024:.1f}KB ({savings:.1f}% smaller)")
+            logger.debug("Storage saved: %.1fKB -> %.1fKB (%.1f%% smaller)", original_size / 1024, new_size / 1024, savings)
         
         # Create new InMemoryUploadedFile
         optimized_image = InMemoryUploadedFile(
@@ -155,7 +166,7 @@ def optimize_image_storage(image, max_width=2000, max_height=2000, quality=75):
         return optimized_image
         
     except Exception as e:
-        print(f"⚠️ Storage optimization failed: {e}. Using original image.")
+        logger.warning("Storage optimization failed, using original image: %s", e)
         return image
 
 def optimize_image_async(image, max_width=2000, max_height=2000, quality=85):
@@ -166,10 +177,10 @@ def optimize_image_async(image, max_width=2000, max_height=2000, quality=85):
     try:
         # For now, just return the original image to prevent timeouts
         # In a real implementation, you'd queue this for background processing
-        print(f"📸 Image queued for background optimization: {image.name}")
+        logger.debug("Image queued for background optimization: %s", image.name)
         return image
     except Exception as e:
-        print(f"⚠️ Async optimization failed: {e}")
+        logger.warning("Async optimization failed: %s", e)
         return image
 
 def validate_product_image(image):
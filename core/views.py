@@ -1,35 +1,81 @@
-from rest_framework import generics
-from django.shortcuts import get_object_or_404
+from rest_framework import generics, status
+from rest_framework.decorators import api_view
+from rest_framework.response import Response
+from django.conf import settings
+from django.http import Http404, HttpResponse
+from django.utils.crypto import constant_time_compare
+from . import metrics
 from .models import Redirect
+from .pagination import OptionalPageNumberPagination
+from .redirects import resolve_redirect, redirect_map
 from .serializers import RedirectSerializer
 
+# Upper bound on paths accepted by one bulk resolve call
+MAX_RESOLVE_PATHS = 500
+
 
 class RedirectDetail(generics.RetrieveAPIView):
     """
     API endpoint to check if a path should redirect.
     Returns redirect information if found, 404 if not.
+    Served from the in-memory redirect map, not the database.
     """
     serializer_class = RedirectSerializer
     lookup_field = 'old_path'
     lookup_url_kwarg = 'path'
     
-    def get_object(self):
-        path = self.kwargs.get('path', '')
-        # Ensure path starts with /
-        if not path.startswith('/'):
-            path = '/' + path
-        
-        redirect = get_object_or_404(
-            Redirect.objects.filter(is_active=True),
-            old_path=path
-        )
-        return redirect
+    def retrieve(self, request, *args, **kwargs):
+        entry = resolve_redirect(self.kwargs.get('path', ''))
+        if entry is None:
+            raise Http404("No redirect for this path")
+        return Response(entry)
 
 
 class RedirectList(generics.ListAPIView):
     """
     API endpoint to list all active redirects.
+    Paginated when ?page or ?page_size is given.
     """
-    queryset = Redirect.objects.filter(is_active=True)
+    queryset = Redirect.objects.filter(is_active=True).order_by('old_path')
     serializer_class = RedirectSerializer
+    pagination_class = OptionalPageNumberPagination
+
+
+@api_view(['POST'])
+def resolve_redirects(request):
+    """
+    Resolve many paths in one call.
+
+    Body: {"paths": ["/product/a", "/category/b", ...]}
+    Returns {"redirects": {"/product/a": {"new_path": ..., "redirect_type": ...}, "/category/b": null}}
+    """
+    paths = request.data.get('paths')
+    if not isinstance(paths, list) or not all(isinstance(path, str) for path in paths):
+        return Response({'error': 'paths must be a list of strings'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(paths) > MAX_RESOLVE_PATHS:
+        return Response(
+            {'error': f'At most {MAX_RESOLVE_PATHS} paths can be resolved per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    redirects = {}
+    for path, entry in redirect_map.resolve_many(paths).items():
+        redirects[path] = None if entry is None else {
+            'new_path': entry['new_path'],
+            'redirect_type': entry['redirect_type'],
+        }
+    return Response({'redirects': redirects})
 
+
+def prometheus_metrics(request):
+    """
+    Prometheus scrape endpoint. Requires ``Authorization: Bearer <METRICS_TOKEN>``;
+    without a token configured it only answers in DEBUG.
+    """
+    token = settings.METRICS_TOKEN
+    if token:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            raise Http404
+    elif not settings.DEBUG:
+        raise Http404
+    return HttpResponse(metrics.REGISTRY.render(), content_type=metrics.CONTENT_TYPE)
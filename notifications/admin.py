@@ -0,0 +1,36 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Notification
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ['id', 'channel', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'created_at', 'sent_at']
+    list_filter = ['status', 'channel', 'created_at']
+    search_fields = ['recipient', 'subject']
+    readonly_fields = ['channel', 'recipient', 'subject', 'body', 'status', 'attempts', 'max_attempts',
+                       'next_attempt_at', 'claimed_at', 'last_error', 'created_at', 'sent_at']
+    actions = ['retry_notifications']
+
+    def retry_notifications(self, request, queryset):
+        """Put dead-lettered notifications back in the outbox"""
+        updated = queryset.filter(status=Notification.STATUS_DEAD).update(
+            status=Notification.STATUS_PENDING,
+            attempts=0,
+            next_attempt_at=timezone.now(),
+        )
+        self.message_user(request, f"{updated} notification(s) re-queued.")
+
+    retry_notifications.short_description = 'Retry selected dead-lettered notifications'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_module_permission(self, request):
+        return request.user.is_staff
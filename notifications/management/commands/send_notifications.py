@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.models import Notification
+from notifications.services import dispatch_pending
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued email/WhatsApp notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100,
+                            help='Notifications claimed per batch (default: 100)')
+        parser.add_argument('--email-concurrency', type=int, default=2,
+                            help='Parallel SMTP sends (default: 2)')
+        parser.add_argument('--whatsapp-concurrency', type=int, default=4,
+                            help='Parallel WhatsApp sends (default: 4)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, polling the outbox every --interval seconds when it is empty')
+        parser.add_argument('--interval', type=float, default=5,
+                            help='Seconds to wait when the outbox is empty in --loop mode (default: 5)')
+
+    def handle(self, *args, **options):
+        concurrency = {
+            Notification.CHANNEL_EMAIL: options['email_concurrency'],
+            Notification.CHANNEL_WHATSAPP: options['whatsapp_concurrency'],
+        }
+
+        while True:
+            stats = dispatch_pending(batch_size=options['batch_size'], concurrency=concurrency)
+            processed = sum(stats.values())
+            if processed:
+                self.stdout.write(f"Sent {stats['sent']} | retrying {stats['retried']} | dead-lettered {stats['dead']}")
+
+            if not options['loop']:
+                if not processed:
+                    self.stdout.write("Outbox is empty")
+                break
+            # Drain back-to-back while there is work, poll when idle
+            if not processed:
+                time.sleep(options['interval'])
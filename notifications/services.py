@@ -0,0 +1,171 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .models import Notification
+
+logger = logging.getLogger(__name__)
+
+# Rows left in 'sending' longer than this belong to a crashed or hung worker. They
+# count as a failed attempt and are retried (or dead-lettered). Sends must time out
+# well before this (settings.EMAIL_TIMEOUT) or a slow send could be delivered twice.
+STALE_CLAIM_AFTER = timedelta(minutes=10)
+
+
+def enqueue_notification(channel, recipient, body, subject='', max_attempts=5):
+    """
+    Add a notification to the outbox.
+
+    Call this inside the same ``transaction.atomic()`` block as the change that
+    triggers it: the message is only delivered if that change commits.
+    """
+    return Notification.objects.create(
+        channel=channel,
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        max_attempts=max_attempts,
+    )
+
+
+def send_email_notification(notification):
+    send_mail(
+        subject=notification.subject,
+        message=notification.body,
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[notification.recipient],
+        fail_silently=False,
+    )
+
+
+def send_whatsapp_notification(notification):
+    from orders.services import send_whatsapp_message
+
+    if not send_whatsapp_message(notification.recipient, notification.body):
+        raise RuntimeError("WhatsApp gateway rejected the message")
+
+
+CHANNEL_SENDERS = {
+    Notification.CHANNEL_EMAIL: send_email_notification,
+    Notification.CHANNEL_WHATSAPP: send_whatsapp_notification,
+}
+
+
+def retry_delay(attempts):
+    """Exponential backoff: 30s, 1m, 2m, 4m ... capped at one hour."""
+    return timedelta(seconds=min(30 * 2 ** max(attempts - 1, 0), 3600))
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to ``batch_size`` due notifications as 'sending' and return them.
+    SKIP LOCKED lets several workers drain the outbox without double-sending.
+    """
+    now = timezone.now()
+    # A message that keeps crashing or hanging the worker ends up dead-lettered
+    Notification.objects.filter(
+        status=Notification.STATUS_SENDING,
+        claimed_at__lt=now - STALE_CLAIM_AFTER,
+    ).update(
+        attempts=F('attempts') + 1,
+        status=Case(
+            When(attempts__gte=F('max_attempts') - 1, then=Value(Notification.STATUS_DEAD)),
+            default=Value(Notification.STATUS_PENDING),
+        ),
+        last_error='Claim expired: the worker crashed or hung while sending',
+    )
+
+    with transaction.atomic():
+        ids = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status=Notification.STATUS_PENDING, next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        Notification.objects.filter(id__in=ids).update(status=Notification.STATUS_SENDING, claimed_at=now)
+    return list(Notification.objects.filter(id__in=ids))
+
+
+def _deliver(notification):
+    """Send one notification, returning the error message or None. Runs on a worker thread."""
+    sender = CHANNEL_SENDERS.get(notification.channel)
+    if sender is None:
+        return f"Unknown channel '{notification.channel}'"
+    try:
+        sender(notification)
+    except Exception as e:
+        return str(e) or e.__class__.__name__
+    return None
+
+
+def dispatch_pending(batch_size=100, concurrency=None):
+    """
+    Deliver one batch from the outbox.
+
+    ``concurrency`` maps channel -> number of parallel sends (default 4 per
+    channel). Failed sends are rescheduled with backoff and moved to the dead
+    letter status after ``max_attempts``. Returns a dict of outcome counts.
+    """
+    concurrency = concurrency or {}
+    batch = claim_batch(batch_size)
+    stats = {'sent': 0, 'retried': 0, 'dead': 0}
+    if not batch:
+        return stats
+
+    by_channel = {}
+    for notification in batch:
+        by_channel.setdefault(notification.channel, []).append(notification)
+
+    # One pool per channel so a slow SMTP server doesn't hold up WhatsApp
+    # sends; all channels are submitted before any result is awaited.
+    executors = [
+        ThreadPoolExecutor(max_workers=max(1, concurrency.get(channel, 4)))
+        for channel in by_channel
+    ]
+    try:
+        futures = [
+            (notification, executor.submit(_deliver, notification))
+            for executor, notifications in zip(executors, by_channel.values())
+            for notification in notifications
+        ]
+        results = [(notification, future.result()) for notification, future in futures]
+    finally:
+        for executor in executors:
+            executor.shutdown()
+
+    now = timezone.now()
+    for notification, error in results:
+        if error is None:
+            Notification.objects.filter(pk=notification.pk).update(
+                status=Notification.STATUS_SENT,
+                attempts=F('attempts') + 1,
+                sent_at=now,
+                last_error='',
+            )
+            stats['sent'] += 1
+            continue
+
+        attempts = notification.attempts + 1
+        if attempts >= notification.max_attempts:
+            new_status = Notification.STATUS_DEAD
+            stats['dead'] += 1
+            logger.error("Notification %s dead-lettered after %s attempts: %s", notification.pk, attempts, error)
+        else:
+            new_status = Notification.STATUS_PENDING
+            stats['retried'] += 1
+            logger.warning("Notification %s failed (attempt %s), retrying: %s", notification.pk, attempts, error)
+
+        Notification.objects.filter(pk=notification.pk).update(
+            status=new_status,
+            attempts=attempts,
+            next_attempt_at=now + retry_delay(attempts),
+            last_error=error[:2000],
+        )
+
+    return stats
@@ -1,8 +1,27 @@
+from django import forms
 from django.contrib import admin
-from .models import Order, OrderItem
+from django.db import transaction
+from .models import Order, OrderItem, PaymentAttempt, MpesaCallbackLog, OrderStatusTransition
 from django.utils.html import format_html
 
 
+class OrderAdminForm(forms.ModelForm):
+    """Rejects status changes the order state machine does not allow"""
+
+    class Meta:
+        model = Order
+        fields = '__all__'
+
+    def clean_status(self):
+        new_status = self.cleaned_data['status']
+        # construct_instance() has not run yet, so the instance still holds the saved status
+        if self.instance.pk and new_status != self.instance.status and not self.instance.can_transition_to(new_status):
+            raise forms.ValidationError(
+                f"Cannot change status from '{self.instance.get_status_display()}' to '{dict(Order.ORDER_STATUS_CHOICES)[new_status]}'."
+            )
+        return new_status
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
@@ -16,14 +35,42 @@ class OrderItemInline(admin.TabularInline):
         return request.user.is_superuser
 
 
+class PaymentAttemptInline(admin.TabularInline):
+    model = PaymentAttempt
+    extra = 0
+    fields = ['checkout_request_id', 'phone_number', 'amount', 'status', 'result_code', 'result_desc',
+              'mpesa_receipt_number', 'created_at', 'completed_at']
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+class OrderStatusTransitionInline(admin.TabularInline):
+    model = OrderStatusTransition
+    extra = 0
+    fields = ['from_status', 'to_status', 'source', 'note', 'changed_by', 'created_at']
+    readonly_fields = fields
+
+    def has_add_permission(self, request, obj):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
+    form = OrderAdminForm
     list_display = ['id', 'customer_name', 'customer_phone', 'subtotal_display', 'status', 'payment_confirmed',
                     'created_at']
     list_filter = ['status', 'payment_confirmed', 'created_at']
     search_fields = ['customer_name', 'customer_phone', 'customer_email', 'id']
     readonly_fields = ['created_at', 'updated_at', 'subtotal', 'cart_session', 'mpesa_transaction_id']
-    inlines = [OrderItemInline]
+    inlines = [OrderItemInline, PaymentAttemptInline, OrderStatusTransitionInline]
     list_editable = ['status', 'payment_confirmed']
 
     fieldsets = [
@@ -50,6 +97,26 @@ class OrderAdmin(admin.ModelAdmin):
 
     subtotal_display.short_description = 'Subtotal'
 
+    def get_changelist_form(self, request, **kwargs):
+        """Validate list_editable status changes with the same form rules"""
+        kwargs.setdefault('form', OrderAdminForm)
+        return super().get_changelist_form(request, **kwargs)
+
+    def save_model(self, request, obj, form, change):
+        """
+        Route status edits through Order.transition_to so they are recorded.
+        OrderAdminForm.clean_status has already rejected disallowed transitions;
+        the other field edits and the transition are saved together or not at all.
+        """
+        if change and 'status' in form.changed_data:
+            new_status = obj.status
+            obj.status = form.initial['status']
+            with transaction.atomic():
+                super().save_model(request, obj, form, change)
+                obj.transition_to(new_status, source='admin', user=request.user)
+        else:
+            super().save_model(request, obj, form, change)
+
     def has_add_permission(self, request):
         return False
 
@@ -107,4 +174,46 @@ class OrderItemAdmin(admin.ModelAdmin):
 
     def has_module_permission(self, request):
         """Staff and superusers can see order items"""
-        return request.user.is_staff
\ No newline at end of file
+        return request.user.is_staff
+
+
+@admin.register(PaymentAttempt)
+class PaymentAttemptAdmin(admin.ModelAdmin):
+    list_display = ['checkout_request_id', 'order', 'amount', 'status', 'result_code', 'created_at', 'completed_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['checkout_request_id', 'merchant_request_id', 'mpesa_receipt_number', 'order__id']
+    readonly_fields = ['order', 'checkout_request_id', 'merchant_request_id', 'phone_number', 'amount', 'status',
+                       'result_code', 'result_desc', 'mpesa_receipt_number', 'created_at', 'completed_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return request.user.is_superuser
+
+    def has_change_permission(self, request, obj=None):
+        """Payment attempts are written by the gateway only"""
+        return False
+
+    def has_module_permission(self, request):
+        return request.user.is_staff
+
+
+@admin.register(MpesaCallbackLog)
+class MpesaCallbackLogAdmin(admin.ModelAdmin):
+    list_display = ['id', 'checkout_request_id', 'received_at']
+    search_fields = ['checkout_request_id']
+    readonly_fields = ['checkout_request_id', 'body', 'received_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        """The callback log is append-only"""
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_module_permission(self, request):
+        return request.user.is_superuser
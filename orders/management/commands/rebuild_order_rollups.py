@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from orders.models import Order, OrderDailyRollup
+
+
+class Command(BaseCommand):
+    help = 'Recompute the OrderDailyRollup table from the orders table'
+
+    def handle(self, *args, **options):
+        rows = (
+            Order.objects
+            .annotate(day=TruncDate('created_at', tzinfo=timezone.get_current_timezone()))
+            .values('day', 'status')
+            .annotate(order_count=Count('id'), revenue=Sum('subtotal'))
+            .order_by()
+        )
+        rollups = [
+            OrderDailyRollup(day=row['day'], status=row['status'],
+                             order_count=row['order_count'], revenue=row['revenue'] or 0)
+            for row in rows
+        ]
+
+        with transaction.atomic():
+            OrderDailyRollup.objects.all().delete()
+            OrderDailyRollup.objects.bulk_create(rollups, batch_size=1000)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Rebuilt {len(rollups)} order rollup rows"))
@@ -0,0 +1,57 @@
+from datetime import timedelta
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.metrics import REGISTRY
+from orders.reconciliation import reconcile_pending_payments
+
+
+class Command(BaseCommand):
+    help = 'Resolve pending M-Pesa payments whose callback never arrived by querying the STK Push status API'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=5,
+                            help='Only query attempts older than this many minutes (default: 5)')
+        parser.add_argument('--give-up-after', type=int, default=24,
+                            help='Mark attempts as failed after this many hours if a last query still has no result (default: 24)')
+        parser.add_argument('--recheck-after', type=int, default=2,
+                            help='Minimum minutes between two queries for the same attempt (default: 2)')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='Attempts handled per sweep (default: 50)')
+        parser.add_argument('--concurrency', type=int, default=4,
+                            help='Parallel gateway queries (default: 4)')
+        parser.add_argument('--rate', type=float, default=5.0,
+                            help='Maximum gateway queries per second (default: 5)')
+        parser.add_argument('--loop', action='store_true',
+                            help='Keep running, sweeping every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60,
+                            help='Seconds between sweeps in --loop mode (default: 60)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Query nothing and change nothing, only report what would be checked')
+
+    def handle(self, *args, **options):
+        while True:
+            report = reconcile_pending_payments(
+                older_than=timedelta(minutes=options['older_than']),
+                give_up_after=timedelta(hours=options['give_up_after']),
+                recheck_after=timedelta(minutes=options['recheck_after']),
+                batch_size=options['batch_size'],
+                concurrency=options['concurrency'],
+                rate=options['rate'],
+                dry_run=options['dry_run'],
+            )
+            # Share this process's counts with /metrics (no-op without METRICS_DIR)
+            REGISTRY.flush()
+            stats = report.as_dict()
+            self.stdout.write(
+                f"Checked {stats['checked']} | resolved {stats['resolved']} "
+                f"(succeeded {stats['succeeded']}, failed {stats['failed']}, expired {stats['expired']}) | "
+                f"still pending {stats['still_pending']} | errors {stats['errors']} | "
+                f"oldest pending {stats['oldest_pending_lag_seconds']}s | "
+                f"max resolution lag {stats['max_resolution_lag_seconds']}s"
+            )
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,97 @@
+# Generated by Django 4.2.25 on 2026-10-19 01:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def normalize_statuses_and_build_rollups(apps, schema_editor):
+    """Map legacy status values onto the state machine and seed the daily rollups."""
+    from collections import defaultdict
+    from decimal import Decimal
+    from django.utils import timezone
+
+    Order = apps.get_model('orders', 'Order')
+    OrderDailyRollup = apps.get_model('orders', 'OrderDailyRollup')
+
+    Order.objects.filter(status='confirmed').update(status='deposit_paid')
+    Order.objects.exclude(
+        status__in=['pending', 'payment_failed', 'deposit_paid', 'completed', 'cancelled']
+    ).update(status='pending')
+
+    totals = defaultdict(lambda: [0, Decimal('0')])
+    for created_at, status, subtotal in Order.objects.values_list('created_at', 'status', 'subtotal').iterator():
+        key = (timezone.localdate(created_at), status)
+        totals[key][0] += 1
+        totals[key][1] += subtotal or 0
+
+    OrderDailyRollup.objects.bulk_create([
+        OrderDailyRollup(day=day, status=status, order_count=count, revenue=revenue)
+        for (day, status), (count, revenue) in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('orders', '0005_paymentattempt_reconciliation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('payment_failed', 'Payment Failed'), ('deposit_paid', 'Deposit Paid'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('order_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'ordering': ['-day', 'status'],
+            },
+        ),
+        migrations.CreateModel(
+            name='OrderStatusTransition',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('pending', 'Pending'), ('payment_failed', 'Payment Failed'), ('deposit_paid', 'Deposit Paid'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('to_status', models.CharField(choices=[('pending', 'Pending'), ('payment_failed', 'Payment Failed'), ('deposit_paid', 'Deposit Paid'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], max_length=20)),
+                ('source', models.CharField(default='system', max_length=30)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['created_at', 'id'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='order',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('payment_failed', 'Payment Failed'), ('deposit_paid', 'Deposit Paid'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='pending', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'created_at'], name='orders_orde_status_25e057_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['cart_session'], name='orders_orde_cart_se_9383b6_idx'),
+        ),
+        migrations.AddField(
+            model_name='orderstatustransition',
+            name='changed_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='orderstatustransition',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_transitions', to='orders.order'),
+        ),
+        migrations.AddConstraint(
+            model_name='orderdailyrollup',
+            constraint=models.UniqueConstraint(fields=('day', 'status'), name='unique_order_rollup_day_status'),
+        ),
+        migrations.RunPython(normalize_statuses_and_build_rollups, migrations.RunPython.noop),
+    ]
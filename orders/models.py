@@ -1,16 +1,33 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import F
+from django.utils import timezone
 from products.models import ProductVariation
 from cart.models import Cart
 
 
+class InvalidStatusTransition(ValueError):
+    """Raised when an order is moved to a status its current status cannot reach."""
+
+
 class Order(models.Model):
     ORDER_STATUS_CHOICES = [
         ('pending', 'Pending'),
+        ('payment_failed', 'Payment Failed'),
         ('deposit_paid', 'Deposit Paid'),
         ('completed', 'Completed'),
         ('cancelled', 'Cancelled'),
     ]
 
+    # Allowed moves between statuses. Terminal statuses map to an empty set.
+    ORDER_STATUS_TRANSITIONS = {
+        'pending': {'payment_failed', 'deposit_paid', 'completed', 'cancelled'},
+        'payment_failed': {'pending', 'deposit_paid', 'cancelled'},
+        'deposit_paid': {'completed', 'cancelled'},
+        'completed': set(),
+        'cancelled': set(),
+    }
+
     # Customer information
     customer_name = models.CharField(max_length=100)
     customer_email = models.EmailField()
@@ -41,9 +58,60 @@ class Order(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['cart_session']),
+        ]
+
     def __str__(self):
         return f"Order #{self.id} - {self.customer_name}"
 
+    def can_transition_to(self, new_status):
+        return new_status in self.ORDER_STATUS_TRANSITIONS.get(self.status, set())
+
+    def transition_to(self, new_status, source='system', note='', user=None):
+        """
+        Move the order to ``new_status``, recording the change in the status
+        history and the daily rollups.
+
+        The update is conditional on the status still being the one this
+        instance was loaded with, so two concurrent writers cannot both apply
+        a transition. Returns False if the order already has ``new_status``.
+        """
+        old_status = self.status
+        if new_status == old_status:
+            return False
+        if not self.can_transition_to(new_status):
+            raise InvalidStatusTransition(
+                f"Order #{self.pk} cannot move from '{old_status}' to '{new_status}'"
+            )
+
+        with transaction.atomic():
+            now = timezone.now()
+            updated = Order.objects.filter(pk=self.pk, status=old_status).update(
+                status=new_status, updated_at=now
+            )
+            if not updated:
+                raise InvalidStatusTransition(
+                    f"Order #{self.pk} is no longer '{old_status}'; reload it and try again"
+                )
+            OrderStatusTransition.objects.create(
+                order=self,
+                from_status=old_status,
+                to_status=new_status,
+                source=source,
+                note=note,
+                changed_by=user,
+            )
+            day = timezone.localdate(self.created_at)
+            OrderDailyRollup.add(day, old_status, -1, -self.subtotal)
+            OrderDailyRollup.add(day, new_status, 1, self.subtotal)
+
+        self.status = new_status
+        self.updated_at = now
+        return True
+
     @property
     def total_items(self):
         return sum(item.quantity for item in self.items.all())
@@ -86,4 +154,109 @@ class OrderItem(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2)
 
     def __str__(self):
-        return f"{self.quantity} x {self.product_name} in Order #{self.order.id}"
\ No newline at end of file
+        return f"{self.quantity} x {self.product_name} in Order #{self.order.id}"
+
+
+class OrderStatusTransition(models.Model):
+    """History of every status change made through Order.transition_to."""
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='status_transitions')
+    from_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    source = models.CharField(max_length=30, default='system')  # checkout, mpesa, admin, reconciliation...
+    note = models.CharField(max_length=255, blank=True)
+    changed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created_at', 'id']
+
+    def __str__(self):
+        return f"Order #{self.order_id}: {self.from_status} → {self.to_status}"
+
+
+class OrderDailyRollup(models.Model):
+    """
+    Pre-aggregated order counts and revenue per creation day and current status.
+    Kept up to date on order creation, deletion and status transitions so ops
+    dashboards never aggregate the orders table itself.
+    """
+    day = models.DateField()
+    status = models.CharField(max_length=20, choices=Order.ORDER_STATUS_CHOICES)
+    order_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        ordering = ['-day', 'status']
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'status'], name='unique_order_rollup_day_status'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} {self.status}: {self.order_count} orders"
+
+    @classmethod
+    def add(cls, day, status, count, revenue):
+        """Atomically add ``count`` orders and ``revenue`` to one rollup row."""
+        rollup, _ = cls.objects.get_or_create(day=day, status=status)
+        cls.objects.filter(pk=rollup.pk).update(
+            order_count=F('order_count') + count,
+            revenue=F('revenue') + revenue,
+        )
+
+
+class PaymentAttempt(models.Model):
+    """
+    A single M-Pesa STK push for an order.
+
+    Safaricom identifies every push by CheckoutRequestID, so callbacks and
+    status queries are resolved with one indexed lookup on that column.
+    """
+    STATUS_PENDING = 'pending'
+    STATUS_SUCCEEDED = 'succeeded'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SUCCEEDED, 'Succeeded'),
+        (STATUS_FAILED, 'Failed'),
+    ]
+
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='payment_attempts')
+    checkout_request_id = models.CharField(max_length=100, unique=True)
+    merchant_request_id = models.CharField(max_length=100, blank=True, db_index=True)
+    phone_number = models.CharField(max_length=20)
+    amount = models.DecimalField(max_digits=10, decimal_places=2)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING)
+
+    # Result reported by the callback (or a status query)
+    result_code = models.IntegerField(null=True, blank=True)
+    result_desc = models.CharField(max_length=255, blank=True)
+    mpesa_receipt_number = models.CharField(max_length=50, blank=True)
+
+    # Reconciliation bookkeeping (see the reconcile_payments command)
+    last_checked_at = models.DateTimeField(null=True, blank=True)
+    check_count = models.PositiveIntegerField(default=0)
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.checkout_request_id} ({self.status}) for Order #{self.order_id}"
+
+
+class MpesaCallbackLog(models.Model):
+    """Append-only record of every raw callback body received from Safaricom."""
+    checkout_request_id = models.CharField(max_length=100, blank=True, db_index=True)
+    body = models.TextField()
+    received_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-received_at']
+
+    def __str__(self):
+        return f"Callback {self.checkout_request_id or '(unparsed)'} at {self.received_at}"
@@ -0,0 +1,191 @@
+"""
+Payment reconciliation for STK pushes whose callback never arrived.
+
+Pending payment attempts older than a threshold are queried with the STK
+Push Query API in small batches. Gateway calls run on a bounded thread pool
+behind a rate limiter; results are applied on the calling thread through
+``apply_payment_result`` so transitions stay idempotent with the callback.
+Attempts past the give-up cut-off are queried one last time too, and only
+expired when the gateway still has no result for them.
+
+Each sweep records its outcomes, the age of the attempts it picked up and
+the resolution lag in core.metrics; the age of the oldest pending attempt is
+sofahub_queue_oldest_age_seconds{queue="payment_attempts"}.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from core import metrics
+
+from .models import PaymentAttempt
+from .services import confirm_mpesa_payment, apply_payment_result
+
+logger = logging.getLogger(__name__)
+
+# ResultCode recorded when an attempt is given up on without a gateway answer
+EXPIRED_RESULT_CODE = -1
+
+
+class RateLimiter:
+    """Spaces out calls so that at most ``rate`` start per second across threads."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate > 0 else 0
+        self.lock = threading.Lock()
+        self.next_slot = time.monotonic()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self.lock:
+            now = time.monotonic()
+            slot = max(self.next_slot, now)
+            self.next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+
+
+@dataclass
+class ReconciliationReport:
+    checked: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    expired: int = 0
+    still_pending: int = 0
+    errors: int = 0
+    oldest_pending_lag_seconds: float = 0.0
+    resolution_lag_seconds: list = field(default_factory=list)
+
+    @property
+    def resolved(self):
+        return self.succeeded + self.failed + self.expired
+
+    def record_resolution(self, outcome, lag_seconds):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        self.resolution_lag_seconds.append(lag_seconds)
+        metrics.PAYMENT_RECONCILIATIONS.inc(outcome=outcome)
+        metrics.PAYMENT_RESOLUTION_LAG.observe(lag_seconds)
+
+    def as_dict(self):
+        lags = sorted(self.resolution_lag_seconds)
+        return {
+            'checked': self.checked,
+            'resolved': self.resolved,
+            'succeeded': self.succeeded,
+            'failed': self.failed,
+            'expired': self.expired,
+            'still_pending': self.still_pending,
+            'errors': self.errors,
+            'oldest_pending_lag_seconds': round(self.oldest_pending_lag_seconds, 1),
+            'max_resolution_lag_seconds': round(lags[-1], 1) if lags else 0.0,
+        }
+
+
+def pending_attempts(older_than, recheck_after, batch_size):
+    """Oldest pending attempts past ``older_than`` that were not checked recently."""
+    now = timezone.now()
+    queryset = PaymentAttempt.objects.filter(
+        status=PaymentAttempt.STATUS_PENDING,
+        created_at__lte=now - older_than,
+    ).exclude(
+        last_checked_at__gt=now - recheck_after,
+    ).select_related('order').order_by('created_at')
+    return list(queryset[:batch_size])
+
+
+def reconcile_pending_payments(older_than=timedelta(minutes=5), give_up_after=timedelta(hours=24),
+                               recheck_after=timedelta(minutes=2), batch_size=50,
+                               concurrency=4, rate=5.0, dry_run=False):
+    """
+    Query the gateway for one batch of stuck payment attempts and apply the
+    outcomes. Returns a ReconciliationReport.
+    """
+    report = ReconciliationReport()
+    now = timezone.now()
+
+    oldest = (
+        PaymentAttempt.objects.filter(status=PaymentAttempt.STATUS_PENDING)
+        .order_by('created_at')
+        .values_list('created_at', flat=True)
+        .first()
+    )
+    if oldest:
+        report.oldest_pending_lag_seconds = (now - oldest).total_seconds()
+
+    attempts = pending_attempts(older_than, recheck_after, batch_size)
+    if not attempts:
+        return report
+    if dry_run:
+        report.checked = len(attempts)
+        return report
+
+    cutoff = now - give_up_after
+    for attempt in attempts:
+        metrics.PAYMENT_PENDING_AGE.observe((now - attempt.created_at).total_seconds())
+
+    limiter = RateLimiter(rate)
+
+    def query(attempt):
+        limiter.wait()
+        try:
+            return confirm_mpesa_payment(attempt.checkout_request_id)
+        except Exception as e:
+            return {'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as executor:
+        responses = list(executor.map(query, attempts))
+
+    for attempt, response in zip(attempts, responses):
+        report.checked += 1
+        PaymentAttempt.objects.filter(pk=attempt.pk).update(
+            last_checked_at=timezone.now(),
+            check_count=F('check_count') + 1,
+        )
+
+        result_code = response.get('ResultCode')
+        if result_code in (None, ''):
+            # The gateway has no final answer yet ("The transaction is being
+            # processed") or the query itself failed; try again next sweep.
+            if response.get('error'):
+                report.errors += 1
+                metrics.PAYMENT_RECONCILIATIONS.inc(outcome='error')
+                logger.warning("STK query for %s failed: %s", attempt.checkout_request_id, response['error'])
+            elif attempt.created_at <= cutoff:
+                # Past the cut-off and the gateway still has no result: give up.
+                # A failed query is retried instead, since the customer may have paid.
+                if apply_payment_result(attempt, EXPIRED_RESULT_CODE, 'No payment result received before timeout',
+                                        source='reconciliation'):
+                    report.record_resolution('expired', (now - attempt.created_at).total_seconds())
+                else:
+                    metrics.PAYMENT_RECONCILIATIONS.inc(outcome='already_resolved')
+                continue
+            else:
+                metrics.PAYMENT_RECONCILIATIONS.inc(outcome='still_pending')
+            report.still_pending += 1
+            continue
+
+        try:
+            result_code = int(result_code)
+        except (TypeError, ValueError):
+            report.errors += 1
+            metrics.PAYMENT_RECONCILIATIONS.inc(outcome='error')
+            continue
+
+        if apply_payment_result(attempt, result_code, response.get('ResultDesc', ''), source='reconciliation'):
+            report.record_resolution(
+                'succeeded' if result_code == 0 else 'failed',
+                (timezone.now() - attempt.created_at).total_seconds(),
+            )
+        else:
+            metrics.PAYMENT_RECONCILIATIONS.inc(outcome='already_resolved')
+
+    logger.info("Payment reconciliation sweep: %s", report.as_dict())
+    return report
@@ -1,14 +1,65 @@
 import requests
 import base64
+import httpx
+import logging
 from datetime import datetime
+from decimal import Decimal
+from asgiref.sync import sync_to_async
 from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from core.metrics import PAYMENT_RESULTS, mpesa_call
+from notifications.models import Notification
+from notifications.services import enqueue_notification
 import json
 
+logger = logging.getLogger(__name__)
+
+
+MPESA_TOKEN_CACHE_KEY = 'mpesa:access_token'
+
 
 def get_mpesa_access_token():
     """
-    Get M-Pesa API access token
+    Get M-Pesa API access token.
+    Tokens are valid for an hour, so they are cached and reused across calls
+    instead of requesting a new one before every STK push or status query.
     """
+    cached_token = cache.get(MPESA_TOKEN_CACHE_KEY)
+    if cached_token:
+        return cached_token
+
+    url, headers = access_token_request()
+    try:
+        with mpesa_call('access_token'):
+            response = requests.get(url, headers=headers, timeout=10)
+            response.raise_for_status()
+        return cache_access_token(response.json())
+    except Exception as e:
+        logger.error("Error getting M-Pesa access token: %s", e)
+        return None
+
+
+async def get_mpesa_access_token_async(client):
+    """get_mpesa_access_token for async views, using the caller's httpx.AsyncClient"""
+    cached_token = await cache.aget(MPESA_TOKEN_CACHE_KEY)
+    if cached_token:
+        return cached_token
+
+    url, headers = access_token_request()
+    try:
+        with mpesa_call('access_token'):
+            response = await client.get(url, headers=headers, timeout=10)
+            response.raise_for_status()
+        return await sync_to_async(cache_access_token)(response.json())
+    except Exception as e:
+        logger.error("Error getting M-Pesa access token: %s", e)
+        return None
+
+
+def access_token_request():
+    """URL and headers of the Daraja OAuth token request"""
     if settings.MPESA_ENVIRONMENT == 'sandbox':
         url = 'https://sandbox.safaricom.co.ke/oauth/v1/generate?grant_type=client_credentials'
     else:
@@ -21,14 +72,15 @@ def get_mpesa_access_token():
     headers = {
         'Authorization': f'Basic {encoded_auth}'
     }
+    return url, headers
 
-    try:
-        response = requests.get(url, headers=headers)
-        response.raise_for_status()
-        return response.json()['access_token']
-    except Exception as e:
-        print(f"Error getting access token: {e}")
-        return None
+
+def cache_access_token(data):
+    access_token = data['access_token']
+    # Refresh a minute before Safaricom expires the token
+    expires_in = int(data.get('expires_in', 3599))
+    cache.set(MPESA_TOKEN_CACHE_KEY, access_token, max(expires_in - 60, 60))
+    return access_token
 
 
 def generate_mpesa_password():
@@ -49,6 +101,50 @@ def initiate_mpesa_payment(phone_number, amount, order_id):
     if not access_token:
         return {"ResponseCode": "1", "error": "Failed to get access token"}
 
+    url, payload, headers = stk_push_request(access_token, phone_number, amount, order_id)
+    try:
+        with mpesa_call('stk_push') as call:
+            response = requests.post(url, json=payload, headers=headers, timeout=15)
+            response_data = response.json()
+            call.outcome = 'accepted' if response.status_code == 200 else 'rejected'
+    except Exception as e:
+        return {"ResponseCode": "1", "error": str(e)}
+    return stk_push_result(response.status_code, response_data)
+
+
+async def initiate_mpesa_payment_async(phone_number, amount, order_id):
+    """
+    initiate_mpesa_payment for async views: the event loop serves other
+    requests while Safaricom answers.
+    """
+    async with httpx.AsyncClient() as client:
+        access_token = await get_mpesa_access_token_async(client)
+        if not access_token:
+            return {"ResponseCode": "1", "error": "Failed to get access token"}
+
+        url, payload, headers = stk_push_request(access_token, phone_number, amount, order_id)
+        try:
+            with mpesa_call('stk_push') as call:
+                response = await client.post(url, json=payload, headers=headers, timeout=15)
+                response_data = response.json()
+                call.outcome = 'accepted' if response.status_code == 200 else 'rejected'
+        except Exception as e:
+            return {"ResponseCode": "1", "error": str(e)}
+    return stk_push_result(response.status_code, response_data)
+
+
+def format_mpesa_phone(phone_number):
+    """Phone number as M-Pesa expects it: no '+', country code instead of a leading 0"""
+    phone_number = str(phone_number).strip()
+    if phone_number.startswith('+'):
+        phone_number = phone_number[1:]
+    if phone_number.startswith('0'):
+        phone_number = '254' + phone_number[1:]
+    return phone_number
+
+
+def stk_push_request(access_token, phone_number, amount, order_id):
+    """URL, JSON payload and headers of an STK push"""
     password, timestamp = generate_mpesa_password()
 
     if settings.MPESA_ENVIRONMENT == 'sandbox':
@@ -56,11 +152,7 @@ def initiate_mpesa_payment(phone_number, amount, order_id):
     else:
         url = 'https://api.safaricom.co.ke/mpesa/stkpush/v1/processrequest'
 
-    # Format phone number (remove + and add country code if needed)
-    if phone_number.startswith('+'):
-        phone_number = phone_number[1:]
-    if phone_number.startswith('0'):
-        phone_number = '254' + phone_number[1:]
+    phone_number = format_mpesa_phone(phone_number)
 
     payload = {
         "BusinessShortCode": settings.MPESA_SHORTCODE,
@@ -80,17 +172,13 @@ def initiate_mpesa_payment(phone_number, amount, order_id):
         'Authorization': f'Bearer {access_token}',
         'Content-Type': 'application/json'
     }
+    return url, payload, headers
 
-    try:
-        response = requests.post(url, json=payload, headers=headers)
-        response_data = response.json()
 
-        if response.status_code == 200:
-            return response_data
-        else:
-            return {"ResponseCode": "1", "error": response_data.get('errorMessage', 'Unknown error')}
-    except Exception as e:
-        return {"ResponseCode": "1", "error": str(e)}
+def stk_push_result(status_code, response_data):
+    if status_code == 200:
+        return response_data
+    return {"ResponseCode": "1", "error": response_data.get('errorMessage', 'Unknown error')}
 
 
 def send_whatsapp_message(phone_number, message):
@@ -98,7 +186,7 @@ def send_whatsapp_message(phone_number, message):
     Stub function for sending WhatsApp messages
     In a real implementation, this would integrate with WhatsApp Business API
     """
-    print(f"WHATSAPP MESSAGE to {phone_number}: {message}")
+    logger.info("WhatsApp message to %s: %s", phone_number, message)
     # This is a stub - in production, integrate with WhatsApp API
     return True
 
@@ -131,7 +219,146 @@ def confirm_mpesa_payment(checkout_request_id):
     }
 
     try:
-        response = requests.post(url, json=payload, headers=headers)
+        with mpesa_call('stk_query') as call:
+            response = requests.post(url, json=payload, headers=headers, timeout=15)
+            call.outcome = 'ok' if response.status_code == 200 else 'rejected'
         return response.json()
     except Exception as e:
-        return {"ResponseCode": "1", "error": str(e)}
\ No newline at end of file
+        return {"ResponseCode": "1", "error": str(e)}
+
+
+def parse_callback_metadata(stk_callback):
+    """
+    Flatten ``CallbackMetadata.Item`` (a list of Name/Value pairs) into a dict.
+    The order of items is not guaranteed, so values must be looked up by name.
+    """
+    items = (stk_callback.get('CallbackMetadata') or {}).get('Item') or []
+    return {item.get('Name'): item.get('Value') for item in items if isinstance(item, dict)}
+
+
+def record_payment_attempt(order, phone_number, amount, payment_response):
+    """
+    Store the identifiers returned by a successful STK push so that the
+    callback can be matched to the order by CheckoutRequestID.
+    """
+    from .models import PaymentAttempt
+
+    return PaymentAttempt.objects.create(
+        order=order,
+        checkout_request_id=payment_response['CheckoutRequestID'],
+        merchant_request_id=payment_response.get('MerchantRequestID', ''),
+        phone_number=phone_number,
+        amount=amount,
+    )
+
+
+def legacy_payment_attempt(stk_callback):
+    """
+    PaymentAttempt for a callback whose STK push was sent before attempts were
+    recorded, i.e. an order that started checkout before the upgrade and has
+    no attempts. The order is found by its SOFAHUB<id> account reference if
+    the callback carries one, otherwise by the paying phone number and amount
+    when exactly one such order matches. Returns None if no order matches.
+    """
+    from .models import Order, PaymentAttempt
+
+    metadata = parse_callback_metadata(stk_callback)
+    legacy_orders = Order.objects.filter(status__in=['pending', 'payment_failed'], payment_attempts__isnull=True)
+
+    reference = str(metadata.get('AccountReference') or stk_callback.get('AccountReference') or '')
+    if reference.startswith('SOFAHUB') and reference[len('SOFAHUB'):].isdigit():
+        order = legacy_orders.filter(pk=int(reference[len('SOFAHUB'):])).first()
+    elif metadata.get('PhoneNumber') and metadata.get('Amount') is not None:
+        # The STK push amount was int(deposit_amount)
+        amount = Decimal(str(metadata['Amount']))
+        phone_number = format_mpesa_phone(metadata['PhoneNumber'])
+        matches = [
+            order for order in legacy_orders.filter(deposit_amount__gte=amount, deposit_amount__lt=amount + 1)
+            if format_mpesa_phone(order.customer_phone) == phone_number
+        ]
+        order = matches[0] if len(matches) == 1 else None
+    else:
+        order = None
+    if order is None:
+        return None
+
+    attempt, _ = PaymentAttempt.objects.get_or_create(
+        checkout_request_id=stk_callback['CheckoutRequestID'],
+        defaults={
+            'order': order,
+            'merchant_request_id': stk_callback.get('MerchantRequestID', ''),
+            'phone_number': format_mpesa_phone(metadata.get('PhoneNumber') or order.customer_phone),
+            'amount': order.deposit_amount or order.subtotal,
+        },
+    )
+    logger.info("Matched legacy callback %s to order %s", attempt.checkout_request_id, attempt.order_id)
+    return attempt
+
+
+def apply_payment_result(attempt, result_code, result_desc='', receipt_number='', source='mpesa'):
+    """
+    Move a pending payment attempt to its final state and update the order.
+
+    The transition is a conditional UPDATE on ``status='pending'``, so only
+    the first caller wins; duplicate callbacks (Safaricom retries) and
+    concurrent status queries become no-ops and send no notifications.
+
+    Returns True if this call applied the result, False if it was already
+    applied.
+    """
+    from .models import Order, PaymentAttempt
+
+    succeeded = int(result_code) == 0
+    new_status = PaymentAttempt.STATUS_SUCCEEDED if succeeded else PaymentAttempt.STATUS_FAILED
+
+    with transaction.atomic():
+        # Lock and reload the order first: a status change made by staff since
+        # ``attempt.order`` was loaded must be seen here, not fail the transition
+        order = Order.objects.select_for_update().get(pk=attempt.order_id)
+        attempt.order = order
+
+        updated = PaymentAttempt.objects.filter(
+            pk=attempt.pk,
+            status=PaymentAttempt.STATUS_PENDING,
+        ).update(
+            status=new_status,
+            result_code=int(result_code),
+            result_desc=(result_desc or '')[:255],
+            mpesa_receipt_number=receipt_number or '',
+            completed_at=timezone.now(),
+        )
+        if not updated:
+            logger.info("Payment attempt %s already resolved, skipping", attempt.checkout_request_id)
+            return False
+        PAYMENT_RESULTS.inc(result=new_status, source=source)
+
+        if succeeded:
+            order.payment_confirmed = True
+            order.deposit_paid = True
+            order.mpesa_transaction_id = receipt_number or order.mpesa_transaction_id
+            order.save(update_fields=['payment_confirmed', 'deposit_paid', 'mpesa_transaction_id', 'updated_at'])
+            new_order_status = 'deposit_paid'
+
+            message = f"Payment confirmed for Order #{order.id} at SOFAHUB. Your deposit of {order.deposit_amount} KSh has been received. We'll contact you soon to arrange delivery. Balance of {order.remaining_amount} KSh will be paid upon delivery."
+        else:
+            new_order_status = 'payment_failed'
+
+            message = f"Payment failed for Order #{order.id} at SOFAHUB. Please try again or contact our support team."
+
+        enqueue_notification(Notification.CHANNEL_WHATSAPP, order.customer_phone, message)
+
+        if order.can_transition_to(new_order_status):
+            order.transition_to(new_order_status, source=source, note=f"{attempt.checkout_request_id}: {result_desc}"[:255])
+        elif order.status != new_order_status:
+            # e.g. a late success for an order staff already cancelled: keep the
+            # payment flags but leave the status for a human to sort out.
+            logger.warning(
+                "Order %s is '%s'; not moving it to '%s' after payment result %s",
+                order.id, order.status, new_order_status, result_code,
+            )
+
+    logger.info(
+        "Payment attempt %s for order %s resolved as %s (result code %s)",
+        attempt.checkout_request_id, order.id, new_status, result_code,
+    )
+    return True
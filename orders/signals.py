@@ -0,0 +1,17 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .models import Order, OrderDailyRollup
+
+
+@receiver(post_save, sender=Order)
+def add_order_to_rollup(sender, instance, created, raw=False, **kwargs):
+    """Count a new order in its day's rollup. Later status changes go through Order.transition_to."""
+    if created and not raw:
+        OrderDailyRollup.add(timezone.localdate(instance.created_at), instance.status, 1, instance.subtotal)
+
+
+@receiver(post_delete, sender=Order)
+def remove_order_from_rollup(sender, instance, **kwargs):
+    """Take a deleted order out of its day's rollup"""
+    OrderDailyRollup.add(timezone.localdate(instance.created_at), instance.status, -1, -instance.subtotal)
@@ -1,16 +1,31 @@
 from rest_framework import generics, status
 from rest_framework.response import Response
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from asgiref.sync import sync_to_async
 from django.shortcuts import get_object_or_404
-from django.views.decorators.csrf import csrf_exempt
 from django.http import JsonResponse
 from django.utils.decorators import method_decorator
+from django.utils import timezone
+from django.db import transaction
+from django.db.models import Sum
+from datetime import timedelta
 import json
+import logging
 from cart.models import Cart, CartItem
-from .models import Order, OrderItem
+from .models import Order, OrderItem, PaymentAttempt, MpesaCallbackLog, OrderDailyRollup
 from .serializers import OrderSerializer, CheckoutSerializer
-from .services import send_whatsapp_message, initiate_mpesa_payment
+from .services import (
+    initiate_mpesa_payment, initiate_mpesa_payment_async, record_payment_attempt, apply_payment_result,
+    legacy_payment_attempt, parse_callback_metadata,
+)
+from notifications.models import Notification
+from notifications.services import enqueue_notification
 from cart.views import get_or_create_cart
+from core.metrics import CHECKOUTS, CHECKOUT_VALUE, MPESA_CALLBACKS
+from core.renderers import json_response
+
+logger = logging.getLogger(__name__)
 
 
 class OrderDetail(generics.RetrieveAPIView):
@@ -19,201 +34,245 @@ class OrderDetail(generics.RetrieveAPIView):
     lookup_field = 'id'
 
 
-@api_view(['POST'])
-def checkout(request):
-    print("=" * 50)
-    print("CHECKOUT PROCESS STARTED")
-    print("=" * 50)
-    
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def order_summary(request):
+    """
+    Per-status order counts and revenue by day for ops dashboards.
+    Reads only the pre-aggregated OrderDailyRollup table.
+
+    Query params:
+        days: number of days of daily breakdown to return (default 30, max 366)
+    """
+    try:
+        days = min(max(int(request.query_params.get('days', 30)), 1), 366)
+    except ValueError:
+        return Response({'error': 'days must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+
+    totals = {
+        row['status']: {'count': row['count'], 'revenue': row['revenue']}
+        for row in OrderDailyRollup.objects.values('status').annotate(
+            count=Sum('order_count'), revenue=Sum('revenue')
+        )
+    }
+    status_counts = {
+        key: totals.get(key, {'count': 0, 'revenue': 0})
+        for key, _ in Order.ORDER_STATUS_CHOICES
+    }
+
+    since = timezone.localdate() - timedelta(days=days - 1)
+    daily = {}
+    for rollup in OrderDailyRollup.objects.filter(day__gte=since, order_count__gt=0).order_by('day'):
+        entry = daily.setdefault(rollup.day, {'date': rollup.day, 'orders': 0, 'revenue': 0, 'by_status': {}})
+        entry['orders'] += rollup.order_count
+        entry['revenue'] += rollup.revenue
+        entry['by_status'][rollup.status] = {'count': rollup.order_count, 'revenue': rollup.revenue}
+
+    return Response({
+        'status_counts': status_counts,
+        'days': days,
+        'daily': list(daily.values()),
+    })
+
+
+async def checkout(request):
+    """
+    Create the order from the cart and send the deposit STK push.
+
+    Async so the M-Pesa round trip does not hold a worker: the database work
+    runs in sync_to_async blocks and the gateway call awaits on the event loop.
+    """
+    if request.method != 'POST':
+        return json_response({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    try:
+        data = request_data(request)
+    except ValueError as e:
+        return json_response({'detail': f'JSON parse error - {e}'}, status=400)
+
+    error, placed = await sync_to_async(place_order)(request, data)
+    if error is not None:
+        return error
+    order, cart, deposit_amount, remaining_amount, mpesa_phone, customer_phone = placed
+
+    # Initiate M-Pesa payment for deposit amount only
+    payment_response = await initiate_mpesa_payment_async(mpesa_phone, float(deposit_amount), order.id)
+    logger.debug("Checkout: order %s STK push response %s", order.id, payment_response)
+
+    return await sync_to_async(finish_checkout)(
+        order, cart, payment_response, deposit_amount, remaining_amount, mpesa_phone, customer_phone,
+    )
+
+
+checkout.csrf_exempt = True  # csrf_exempt() would turn the coroutine into a sync view on Django 4.2
+
+
+def request_data(request):
+    """The JSON (or form) body as a dict; raises ValueError for malformed JSON"""
+    if request.content_type == 'application/json':
+        return json.loads(request.body or b'{}')
+    return request.POST.dict()
+
+
+def place_order(request, data):
+    """
+    Validate the cart and checkout data and create the order with its items.
+    Returns (error_response, None) or (None, details for the payment step).
+    """
     # Get session ID from request data (frontend sends it in the body)
-    session_id = request.data.get('session_id')
-    print(f"Session ID from request: {session_id}")
-    
+    session_id = data.get('session_id')
+
     if session_id:
         # Use the session ID from request data
         try:
             cart = Cart.objects.get(session_id=session_id)
-            print(f"Cart found by session ID: {cart.id}, Items: {cart.items.count()}")
         except Cart.DoesNotExist:
-            print(f"❌ No cart found for session ID: {session_id}")
-            return Response(
-                {"error": "Cart not found. Please add items to cart first."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
+            logger.debug("Checkout: no cart for session %s", session_id)
+            CHECKOUTS.inc(outcome='cart_not_found')
+            return json_response({"error": "Cart not found. Please add items to cart first."}, status=400), None
     else:
         # Fall back to Django session
         cart = get_or_create_cart(request)
-        print(f"Cart retrieved from Django session: {cart.id}, Items: {cart.items.count()}")
 
     if not cart.items.exists():
-        print("❌ Cart is empty - checkout failed")
-        return Response(
-            {"error": "Cart is empty"},
-            status=status.HTTP_400_BAD_REQUEST
-        )
+        logger.debug("Checkout: cart %s is empty", cart.id)
+        CHECKOUTS.inc(outcome='empty_cart')
+        return json_response({"error": "Cart is empty"}, status=400), None
+
+    serializer = CheckoutSerializer(data=data)
 
-    # Debug: Print the incoming data
-    print(f"Checkout request data: {request.data}")
-    
-    serializer = CheckoutSerializer(data=request.data)
-    
-    # Debug: Print validation errors if any
     if not serializer.is_valid():
-        print(f"❌ Serializer validation errors: {serializer.errors}")
-        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-    print("✅ Serializer validation passed")
-    
-    if serializer.is_valid():
-        # Create order
-        print("Creating order...")
-        order = Order.objects.create(
-            customer_name=serializer.validated_data['customer_name'],
-            customer_email=serializer.validated_data['customer_email'],
-            customer_phone=serializer.validated_data['customer_phone'],
-            shipping_address=serializer.validated_data['shipping_address'],
-            shipping_city=serializer.validated_data['shipping_city'],
-            shipping_zip_code=serializer.validated_data['shipping_zip_code'],
-            cart_session=cart.session_id,
-            subtotal=cart.subtotal
-        )
-        print(f"✅ Order created with ID: {order.id}")
-
-        # Calculate downpayment amounts
-        deposit_amount, remaining_amount = order.calculate_downpayment()
-        order.save()
-        print(f"Deposit amount: {deposit_amount}, Remaining: {remaining_amount}")
-
-        # Create order items
-        print("Creating order items...")
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                variation=cart_item.variation,
-                product_name=cart_item.variation.product.name,
-                variation_attributes=cart_item.variation.attributes,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.unit_price,
-                total_price=cart_item.total_price
-            )
-        print(f"✅ Created {cart.items.count()} order items")
-
-        # Use M-Pesa phone number if provided, otherwise use customer phone
-        mpesa_phone = serializer.validated_data.get('mpesa_phone') or serializer.validated_data['customer_phone']
-        print(f"Using M-Pesa phone: {mpesa_phone}")
-        
-        # Initiate M-Pesa payment for deposit amount
-        print("Initiating M-Pesa payment...")
-        payment_response = initiate_mpesa_payment(
-            mpesa_phone,
-            float(deposit_amount),  # Pay only the deposit amount
-            order.id
+        logger.debug("Checkout: invalid data for cart %s: %s", cart.id, serializer.errors)
+        CHECKOUTS.inc(outcome='invalid')
+        return json_response(serializer.errors, status=400), None
+
+    # Create order
+    order = Order.objects.create(
+        customer_name=serializer.validated_data['customer_name'],
+        customer_email=serializer.validated_data['customer_email'],
+        customer_phone=serializer.validated_data['customer_phone'],
+        shipping_address=serializer.validated_data['shipping_address'],
+        shipping_city=serializer.validated_data['shipping_city'],
+        shipping_zip_code=serializer.validated_data['shipping_zip_code'],
+        cart_session=cart.session_id,
+        subtotal=cart.subtotal
+    )
+
+    # Calculate downpayment amounts
+    deposit_amount, remaining_amount = order.calculate_downpayment()
+    order.save()
+
+    # Create order items
+    for cart_item in cart.items.all():
+        OrderItem.objects.create(
+            order=order,
+            variation=cart_item.variation,
+            product_name=cart_item.variation.product.name,
+            variation_attributes=cart_item.variation.attributes,
+            quantity=cart_item.quantity,
+            unit_price=cart_item.unit_price,
+            total_price=cart_item.total_price
         )
-        print(f"M-Pesa payment response: {payment_response}")
 
-        if payment_response.get('ResponseCode') == '0':
-            print("✅ M-Pesa payment initiated successfully")
-            # Send WhatsApp confirmation
-            message = f"Thank you for your order #{order.id} at SOFAHUB. Your deposit payment request ({deposit_amount} KSh) has been sent to M-Pesa. Please complete the payment to confirm your order. Balance of {remaining_amount} KSh will be paid upon delivery."
-            send_whatsapp_message(serializer.validated_data['customer_phone'], message)
+    # Use M-Pesa phone number if provided, otherwise use customer phone
+    customer_phone = serializer.validated_data['customer_phone']
+    mpesa_phone = serializer.validated_data.get('mpesa_phone') or customer_phone
+    return None, (order, cart, deposit_amount, remaining_amount, mpesa_phone, customer_phone)
+
+
+def finish_checkout(order, cart, payment_response, deposit_amount, remaining_amount, mpesa_phone, customer_phone):
+    """Record the STK push and clear the cart, or cancel the order if the push failed"""
+    if payment_response.get('ResponseCode') == '0':
+        message = f"Thank you for your order #{order.id} at SOFAHUB. Your deposit payment request ({deposit_amount} KSh) has been sent to M-Pesa. Please complete the payment to confirm your order. Balance of {remaining_amount} KSh will be paid upon delivery."
+
+        with transaction.atomic():
+            record_payment_attempt(order, mpesa_phone, deposit_amount, payment_response)
+
+            # Queue WhatsApp confirmation (delivered by the send_notifications worker)
+            enqueue_notification(Notification.CHANNEL_WHATSAPP, customer_phone, message)
 
             # Clear the cart
             cart.items.all().delete()
-            print("✅ Cart cleared")
-
-            order_serializer = OrderSerializer(order)
-            print("✅ Checkout completed successfully")
-            return Response(order_serializer.data, status=status.HTTP_201_CREATED)
-        else:
-            print(f"❌ M-Pesa payment initiation failed: {payment_response}")
-            # Payment initiation failed
-            order.status = 'cancelled'
-            order.save()
-            return Response(
-                {"error": "Payment initiation failed", "details": payment_response.get('error', 'Unknown error')},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-
-    print("❌ Serializer validation failed")
-    return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
-
-
-@csrf_exempt
-def mpesa_callback(request):
+
+        CHECKOUTS.inc(outcome='payment_requested')
+        CHECKOUT_VALUE.inc(order.subtotal)
+        return json_response(OrderSerializer(order).data, status=201)
+
+    # Payment initiation failed
+    logger.warning("Checkout: payment initiation failed for order %s: %s", order.id, payment_response)
+    order.transition_to('cancelled', source='checkout', note='Payment initiation failed')
+    CHECKOUTS.inc(outcome='payment_failed')
+    return json_response(
+        {"error": "Payment initiation failed", "details": payment_response.get('error', 'Unknown error')},
+        status=400
+    )
+
+
+async def mpesa_callback(request):
     """
-    Handle M-Pesa payment callback
+    Handle M-Pesa payment callback.
+
+    The raw body is appended to MpesaCallbackLog (with its CheckoutRequestID
+    when it parses) before anything else, then the payment attempt is found by
+    that indexed id. Callbacks for orders that started checkout before payment
+    attempts were recorded fall back to legacy_payment_attempt. Applying the
+    result is idempotent, so Safaricom retries are acknowledged without
+    re-processing the order. Async, so a burst of callbacks queues on the
+    event loop rather than on the workers.
     """
-    print(f"M-Pesa Callback received: {request.method}")
-    print(f"Headers: {dict(request.headers)}")
-    print(f"Body: {request.body}")
-    
     if request.method != 'POST':
         return JsonResponse({'status': 'error', 'message': 'Only POST requests allowed'}, status=405)
-    
+
+    raw_body = request.body.decode('utf-8', errors='replace')
     try:
-        # Parse the callback data
-        callback_data = json.loads(request.body)
-        print(f"Parsed callback data: {callback_data}")
-        
-        # Extract relevant information
-        result_code = callback_data.get('Body', {}).get('stkCallback', {}).get('ResultCode', -1)
-        checkout_request_id = callback_data.get('Body', {}).get('stkCallback', {}).get('CheckoutRequestID', '')
-        
-        print(f"Result Code: {result_code}")
-        print(f"Checkout Request ID: {checkout_request_id}")
-        
-        # Find the order by checkout request ID (we'll need to store this in the order)
-        # For now, we'll use the account reference to find the order
-        account_reference = callback_data.get('Body', {}).get('stkCallback', {}).get('CallbackMetadata', {}).get('Item', [{}])[0].get('Value', '')
-        
-        print(f"Account Reference: {account_reference}")
-        
-        if account_reference and account_reference.startswith('SOFAHUB'):
-            order_id = account_reference.replace('SOFAHUB', '')
-            print(f"Looking for order ID: {order_id}")
-            
-            try:
-                order = Order.objects.get(id=order_id)
-                print(f"Found order: {order.id}")
-                
-                if result_code == 0:
-                    # Payment successful
-                    order.payment_confirmed = True
-                    order.status = 'confirmed'
-                    order.save()
-                    
-                    # Send confirmation WhatsApp message
-                    message = f"Payment confirmed for Order #{order.id} at SOFAHUB. Your deposit of {order.deposit_amount} KSh has been received. We'll contact you soon to arrange delivery. Balance of {order.remaining_amount} KSh will be paid upon delivery."
-                    send_whatsapp_message(order.customer_phone, message)
-                    
-                    print(f"Payment successful for order {order.id}")
-                else:
-                    # Payment failed
-                    order.status = 'payment_failed'
-                    order.save()
-                    
-                    # Send failure notification
-                    message = f"Payment failed for Order #{order.id} at SOFAHUB. Please try again or contact our support team."
-                    send_whatsapp_message(order.customer_phone, message)
-                    
-                    print(f"Payment failed for order {order.id}, result code: {result_code}")
-                
-                return JsonResponse({'status': 'success'})
-                
-            except Order.DoesNotExist:
-                print(f"Order {order_id} not found")
-                return JsonResponse({'status': 'error', 'message': 'Order not found'}, status=404)
-        
-        return JsonResponse({'status': 'success'})
-        
+        callback_data = json.loads(raw_body)
     except json.JSONDecodeError as e:
-        print(f"JSON decode error: {e}")
+        log_entry = await MpesaCallbackLog.objects.acreate(body=raw_body)
+        logger.warning("M-Pesa callback %s has invalid JSON: %s", log_entry.id, e)
+        MPESA_CALLBACKS.inc(outcome='invalid')
         return JsonResponse({'status': 'error', 'message': 'Invalid JSON'}, status=400)
-    except Exception as e:
-        print(f"M-Pesa callback error: {e}")
+
+    body = callback_data.get('Body') if isinstance(callback_data, dict) else None
+    stk_callback = body.get('stkCallback') if isinstance(body, dict) else None
+    if not isinstance(stk_callback, dict):
+        stk_callback = {}
+    checkout_request_id = str(stk_callback.get('CheckoutRequestID') or '')[:100]
+    log_entry = await MpesaCallbackLog.objects.acreate(body=raw_body, checkout_request_id=checkout_request_id)
+
+    try:
+        result_code = stk_callback.get('ResultCode', -1)
+
+        attempt = await (
+            PaymentAttempt.objects.select_related('order')
+            .filter(checkout_request_id=checkout_request_id)
+            .afirst()
+        ) if checkout_request_id else None
+        if attempt is None and checkout_request_id:
+            attempt = await sync_to_async(legacy_payment_attempt)(stk_callback)
+
+        if attempt is None:
+            logger.warning("M-Pesa callback for unknown CheckoutRequestID %r", checkout_request_id)
+            MPESA_CALLBACKS.inc(outcome='unknown_attempt')
+            return JsonResponse({'status': 'error', 'message': 'Payment attempt not found'}, status=404)
+
+        metadata = parse_callback_metadata(stk_callback)
+        applied = await sync_to_async(apply_payment_result)(
+            attempt,
+            result_code,
+            result_desc=stk_callback.get('ResultDesc', ''),
+            receipt_number=metadata.get('MpesaReceiptNumber') or '',
+        )
+        MPESA_CALLBACKS.inc(outcome='applied' if applied else 'duplicate')
+        return JsonResponse({'status': 'success'})
+
+    except Exception:
+        logger.exception("M-Pesa callback %s failed", log_entry.id)
+        MPESA_CALLBACKS.inc(outcome='error')
         return JsonResponse({'status': 'error', 'message': 'Internal server error'}, status=500)
 
 
+mpesa_callback.csrf_exempt = True  # see checkout
+
+
 @api_view(['POST'])
 def test_mpesa(request):
     """
@@ -225,7 +284,7 @@ def test_mpesa(request):
         test_amount = request.data.get('amount', 1)
         test_order_id = request.data.get('order_id', 999)
         
-        print(f"Testing M-Pesa with phone: {test_phone}, amount: {test_amount}, order: {test_order_id}")
+        logger.info("Testing M-Pesa with phone %s, amount %s, order %s", test_phone, test_amount, test_order_id)
         
         # Test access token
         access_token = get_mpesa_access_token()
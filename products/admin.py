@@ -1,8 +1,7 @@
 from django import forms
 from django.utils.html import format_html
 from django.contrib import admin
-import json
-from .models import RoomCategory, ProductType, Tag, Product, ProductImage, ProductVariation, ProductFAQ
+from .models import RoomCategory, ProductType, Tag, Product, ProductImage, ProductVariation, ProductFAQ, ProductRelation
 
 
 class ProductImageInline(admin.TabularInline):
@@ -146,6 +145,20 @@ class ProductFAQInline(admin.TabularInline):
     fields = ['question', 'answer', 'order', 'is_active']
 
 
+class ProductRelationInline(admin.TabularInline):
+    """Read-only view of the precomputed related products (rebuilt by build_related_products)"""
+    model = ProductRelation
+    fk_name = 'product'
+    extra = 0
+    fields = ['rank', 'related', 'score']
+    readonly_fields = fields
+    can_delete = False
+    verbose_name_plural = 'Related products (computed)'
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(RoomCategory)
 class RoomCategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug', 'order', 'is_active', 'product_count']
@@ -279,7 +292,7 @@ class ProductAdmin(admin.ModelAdmin):
     list_filter = ['room_categories', 'product_types', 'tags', 'is_active', 'created_at']
     search_fields = ['name', 'description']
     prepopulated_fields = {'slug': ('name',)}
-    inlines = [ProductImageInline, ProductVariationInline, ProductFAQInline]
+    inlines = [ProductImageInline, ProductVariationInline, ProductFAQInline, ProductRelationInline]
     filter_horizontal = ['room_categories', 'product_types', 'tags']
     readonly_fields = ['current_price', 'is_on_sale', 'created_at', 'updated_at']
     fieldsets = [
@@ -323,12 +336,9 @@ class ProductVariationAdmin(admin.ModelAdmin):
     fields = ['product', 'sku', 'color', 'material', 'size', 'stock_quantity', 'price_modifier', 'is_active']
 
     def attributes_display(self, obj):
-        if obj.attributes:
-            try:
-                attrs = json.loads(obj.attributes)
-                return ", ".join([f"{k}: {v}" for k, v in attrs.items() if v])
-            except:
-                return obj.attributes
+        attrs = obj.get_attributes_dict()
+        if attrs:
+            return ", ".join([f"{k}: {v}" for k, v in attrs.items() if v])
         return "No attributes"
 
     attributes_display.short_description = 'Attributes'
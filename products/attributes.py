@@ -0,0 +1,193 @@
+"""
+Indexed variation attributes.
+
+ProductVariation.attributes is free-form JSON, which the database cannot
+filter efficiently. Every variation's attributes are mirrored into
+ProductVariationAttribute rows (one per key, value normalized) whenever the
+variation is saved, so storefront filters and facet counts are index lookups.
+"""
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Count
+
+# Attributes exposed as storefront filters / facets
+FILTERABLE_ATTRIBUTES = ('color', 'material', 'size')
+
+ATTRIBUTE_NAME_MAX_LENGTH = 50
+ATTRIBUTE_VALUE_MAX_LENGTH = 100
+
+
+def normalize_attribute_name(name):
+    return str(name).strip().lower()[:ATTRIBUTE_NAME_MAX_LENGTH]
+
+
+def normalize_attribute_value(value):
+    """Case- and whitespace-insensitive form used for matching"""
+    return ' '.join(str(value).split()).lower()[:ATTRIBUTE_VALUE_MAX_LENGTH]
+
+
+def parse_attributes(attributes):
+    """Attributes as a dict, whether stored as a dict or a JSON string"""
+    if isinstance(attributes, dict):
+        return attributes
+    try:
+        parsed = json.loads(attributes) if attributes else {}
+    except (json.JSONDecodeError, TypeError):
+        return {}
+    return parsed if isinstance(parsed, dict) else {}
+
+
+def canonicalize_attributes(attributes):
+    """
+    Canonical stored form: a dict with lowercase, stripped keys in sorted
+    order and lowercase, whitespace-collapsed string values. Empty and nested
+    values are dropped. Legacy JSON strings are parsed once here.
+    """
+    canonical = {}
+    for name, value in parse_attributes(attributes).items():
+        if value in (None, '') or isinstance(value, (dict, list)):
+            continue
+        name = str(name).strip().lower()
+        value = ' '.join(str(value).split()).lower()
+        if name and value:
+            canonical[name] = value
+    return dict(sorted(canonical.items()))
+
+
+def validate_variation_attributes(value):
+    """Attributes must be a flat object of scalar values"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value else {}
+        except json.JSONDecodeError:
+            raise ValidationError('Attributes must be a JSON object.')
+    if not isinstance(value, dict):
+        raise ValidationError('Attributes must be a JSON object.')
+    nested = sorted(str(key) for key, item in value.items() if isinstance(item, (dict, list)))
+    if nested:
+        raise ValidationError(f"Attribute values must be plain text, not lists or objects: {', '.join(nested)}")
+
+
+def attribute_pairs(attributes):
+    """Normalized (name, value) pairs for the non-empty scalar attributes"""
+    return [
+        (name[:ATTRIBUTE_NAME_MAX_LENGTH], value[:ATTRIBUTE_VALUE_MAX_LENGTH])
+        for name, value in canonicalize_attributes(attributes).items()
+    ]
+
+
+def sync_variation_attributes(variation):
+    """Replace the index rows of one variation"""
+    from .models import ProductVariationAttribute
+
+    ProductVariationAttribute.objects.filter(variation=variation).delete()
+    ProductVariationAttribute.objects.bulk_create([
+        ProductVariationAttribute(
+            variation=variation,
+            product_id=variation.product_id,
+            name=name,
+            value=value,
+            is_active=variation.is_active,
+        )
+        for name, value in attribute_pairs(variation.attributes)
+    ])
+
+
+def rebuild_attribute_index(batch_size=1000):
+    """Rebuild every index row from ProductVariation (after bulk writes). Returns rows written."""
+    from django.db import transaction
+    from .models import ProductVariation, ProductVariationAttribute
+
+    written = 0
+    with transaction.atomic():
+        ProductVariationAttribute.objects.all().delete()
+        batch = []
+        variations = ProductVariation.objects.values_list('id', 'product_id', 'attributes', 'is_active')
+        for variation_id, product_id, attributes, is_active in variations.iterator(chunk_size=batch_size):
+            batch.extend(
+                ProductVariationAttribute(
+                    variation_id=variation_id, product_id=product_id,
+                    name=name, value=value, is_active=is_active,
+                )
+                for name, value in attribute_pairs(attributes)
+            )
+            if len(batch) >= batch_size:
+                ProductVariationAttribute.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            ProductVariationAttribute.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def attribute_selections(query_params):
+    """{attribute: [normalized values]} from ?color=red,blue&size=3-seater"""
+    selections = {}
+    for name in FILTERABLE_ATTRIBUTES:
+        raw = query_params.get(name)
+        if not raw:
+            continue
+        values = [normalize_attribute_value(value) for value in raw.split(',') if value.strip()]
+        if values:
+            selections[name] = values
+    return selections
+
+
+def filter_by_attributes(queryset, selections):
+    """
+    Products with at least one active variation matching every selected
+    attribute (values within one attribute are OR-ed).
+    """
+    if not selections:
+        return queryset
+    from .models import ProductVariationAttribute
+
+    variation_ids = None
+    for name, values in selections.items():
+        matching = ProductVariationAttribute.objects.filter(
+            name=name, value__in=values, is_active=True
+        ).values('variation_id')
+        if variation_ids is None:
+            variation_ids = matching
+        else:
+            variation_ids = matching.filter(variation_id__in=variation_ids)
+
+    product_ids = ProductVariationAttribute.objects.filter(
+        variation_id__in=variation_ids
+    ).values('product_id')
+    return queryset.filter(id__in=product_ids)
+
+
+def attribute_facets(queryset, selections=None):
+    """
+    Product counts per value of each filterable attribute.
+
+    Each attribute's counts honour the other selected attributes but not its
+    own, so a shopper can still see (and add) sibling values.
+    """
+    from .models import ProductVariationAttribute
+
+    selections = selections or {}
+    facets = {}
+    for name in FILTERABLE_ATTRIBUTES:
+        others = {key: values for key, values in selections.items() if key != name}
+        product_ids = filter_by_attributes(queryset, others).order_by().values('id')
+        rows = (
+            ProductVariationAttribute.objects
+            .filter(name=name, is_active=True, product_id__in=product_ids)
+            .values('value')
+            .annotate(product_count=Count('product_id', distinct=True))
+            .order_by('-product_count', 'value')
+        )
+        facets[name] = [
+            {
+                'value': row['value'],
+                'label': row['value'].title(),
+                'product_count': row['product_count'],
+                'selected': row['value'] in selections.get(name, ()),
+            }
+            for row in rows
+        ]
+    return facets
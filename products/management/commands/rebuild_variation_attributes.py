@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from products.attributes import rebuild_attribute_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the indexed variation attributes (needed after bulk updates that skip save())'
+
+    def handle(self, *args, **options):
+        written = rebuild_attribute_index()
+        self.stdout.write(self.style.SUCCESS(f"✅ Indexed {written} variation attribute(s)"))
@@ -0,0 +1,32 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_productrelation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductVariationAttribute',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('value', models.CharField(max_length=100)),
+                ('is_active', models.BooleanField(default=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('variation', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='indexed_attributes', to='products.productvariation')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name', 'value', 'is_active'], name='products_pr_name_e90b09_idx'), models.Index(fields=['product', 'name'], name='products_pr_product_7ce0b1_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productvariationattribute',
+            constraint=models.UniqueConstraint(fields=('variation', 'name'), name='unique_variation_attribute'),
+        ),
+    ]
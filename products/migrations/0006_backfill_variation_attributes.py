@@ -0,0 +1,50 @@
+from django.db import migrations
+
+
+def backfill_variation_attributes(apps, schema_editor):
+    # Same normalization as products.attributes.attribute_pairs, frozen here
+    # so later changes to that module do not alter this migration.
+    import json
+
+    ProductVariation = apps.get_model('products', 'ProductVariation')
+    ProductVariationAttribute = apps.get_model('products', 'ProductVariationAttribute')
+
+    rows = []
+    for variation in ProductVariation.objects.all().iterator():
+        attributes = variation.attributes
+        if not isinstance(attributes, dict):
+            try:
+                attributes = json.loads(attributes) if attributes else {}
+            except (TypeError, ValueError):
+                attributes = {}
+            if not isinstance(attributes, dict):
+                attributes = {}
+
+        pairs = {}
+        for name, value in attributes.items():
+            if value in (None, '') or isinstance(value, (dict, list)):
+                continue
+            name = str(name).strip().lower()[:50]
+            value = ' '.join(str(value).split()).lower()[:100]
+            if name and value:
+                pairs[name] = value
+
+        rows.extend(
+            ProductVariationAttribute(
+                variation_id=variation.id, product_id=variation.product_id,
+                name=name, value=value, is_active=variation.is_active,
+            )
+            for name, value in pairs.items()
+        )
+    ProductVariationAttribute.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_productvariationattribute'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_variation_attributes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:07
+
+from django.db import migrations, models
+import json
+
+import products.attributes
+
+
+def canonicalize_variation_attributes(apps, schema_editor):
+    """
+    Rewrite every variation's attributes as a dict with sorted lowercase keys
+    and lowercase, whitespace-collapsed string values (legacy rows hold JSON
+    strings). Frozen copy of products.attributes.canonicalize_attributes.
+    """
+    ProductVariation = apps.get_model('products', 'ProductVariation')
+
+    def canonicalize(attributes):
+        if not isinstance(attributes, dict):
+            try:
+                attributes = json.loads(attributes) if attributes else {}
+            except (TypeError, ValueError):
+                attributes = {}
+            if not isinstance(attributes, dict):
+                attributes = {}
+        canonical = {}
+        for name, value in attributes.items():
+            if value in (None, '') or isinstance(value, (dict, list)):
+                continue
+            name = str(name).strip().lower()
+            value = ' '.join(str(value).split()).lower()
+            if name and value:
+                canonical[name] = value
+        return dict(sorted(canonical.items()))
+
+    changed = []
+    for variation in ProductVariation.objects.only('id', 'attributes').iterator():
+        canonical = canonicalize(variation.attributes)
+        if canonical != variation.attributes or list(canonical) != list(variation.attributes):
+            variation.attributes = canonical
+            changed.append(variation)
+    ProductVariation.objects.bulk_update(changed, ['attributes'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_backfill_variation_attributes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='productvariation',
+            name='attributes',
+            field=models.JSONField(default=dict, validators=[products.attributes.validate_variation_attributes]),
+        ),
+        migrations.RunPython(canonicalize_variation_attributes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 4.2.25 on 2026-10-19 02:10
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def dedupe_and_point_primary_images(apps, schema_editor):
+    """
+    Keep one is_primary image per product (the first by order, id) and fill
+    Product.primary_image: the primary image, else the first image.
+    """
+    Product = apps.get_model('products', 'Product')
+    ProductImage = apps.get_model('products', 'ProductImage')
+
+    chosen = {}
+    demote = []
+    images = ProductImage.objects.order_by('product_id', '-is_primary', 'order', 'id')
+    for image_id, product_id, is_primary in images.values_list('id', 'product_id', 'is_primary').iterator():
+        if product_id not in chosen:
+            chosen[product_id] = image_id
+        elif is_primary:
+            demote.append(image_id)
+
+    if demote:
+        ProductImage.objects.filter(id__in=demote).update(is_primary=False)
+
+    products = []
+    for product_id, image_id in chosen.items():
+        products.append(Product(id=product_id, primary_image_id=image_id))
+    Product.objects.bulk_update(products, ['primary_image'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_canonicalize_variation_attributes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='primary_image',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='products.productimage'),
+        ),
+        migrations.RunPython(dedupe_and_point_primary_images, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='productimage',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_primary', True)), fields=('product',), name='unique_primary_image_per_product'),
+        ),
+    ]
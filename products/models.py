@@ -1,12 +1,19 @@
 from django.db import models
 from django.utils.text import slugify
 from core.utils import is_sale_active
+from core.models import TrackedFieldsMixin
+from .attributes import (
+    canonicalize_attributes, parse_attributes, sync_variation_attributes, validate_variation_attributes
+)
 from django.utils import timezone
 from decimal import Decimal
 from django.conf import settings
-import json
+import logging
 
-class RoomCategory(models.Model):
+logger = logging.getLogger(__name__)
+
+
+class RoomCategory(TrackedFieldsMixin, models.Model):
     """Living Room, Bedroom, Dining, Office, Outdoor, etc."""
     name = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, max_length=100)
@@ -15,6 +22,8 @@ class RoomCategory(models.Model):
     is_active = models.BooleanField(default=True)
     order = models.PositiveIntegerField(default=0)
 
+    tracked_fields = ('slug', 'image')
+
     class Meta:
         verbose_name_plural = "Room Categories"
         ordering = ['order', 'name']
@@ -26,8 +35,9 @@ class RoomCategory(models.Model):
         if not self.slug:
             self.slug = slugify(self.name)
         
-        # Handle category image optimization based on mode
-        if self.image:
+        # Handle category image optimization based on mode.
+        # Only a newly uploaded image is optimized; re-encoding on every edit wastes time and quality.
+        if self.image and self.has_changed('image'):
             from core.utils import optimize_image, optimize_image_async, optimize_image_storage
             optimization_mode = getattr(settings, 'IMAGE_OPTIMIZATION_MODE', 'storage')
             
@@ -43,7 +53,7 @@ class RoomCategory(models.Model):
                     self.image = optimize_image_async(self.image, max_width=1200, max_height=1200, quality=85)
                 # If 'false' or any other value, no optimization
             except Exception as e:
-                print(f"⚠️ Category image optimization failed: {e}")
+                logger.warning("Category image optimization failed: %s", e)
         
         super().save(*args, **kwargs)
 
@@ -84,7 +94,23 @@ class Tag(models.Model):
         super().save(*args, **kwargs)
 
 
-class Product(models.Model):
+def sale_in_effect(sale_price, sale_start, sale_end, now):
+    """Whether a sale price applies at ``now`` (also used by products.read_models)"""
+    if not sale_price:
+        return False
+
+    if sale_start and sale_end:
+        return sale_start <= now <= sale_end
+    elif sale_start and not sale_end:
+        return sale_start <= now
+    elif not sale_start and sale_end:
+        return now <= sale_end
+    else:
+        # If no dates set, consider it always on sale if sale_price exists
+        return True
+
+
+class Product(TrackedFieldsMixin, models.Model):
     name = models.CharField(max_length=200)
     slug = models.SlugField(unique=True, max_length=200)
     description = models.TextField()
@@ -101,6 +127,18 @@ class Product(models.Model):
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Denormalized pointer to the image shown on cards, feeds and carts: the image
+    # flagged is_primary, else the first by (order, id). Maintained by products.signals.
+    primary_image = models.ForeignKey(
+        'ProductImage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name='+'
+    )
+
+    tracked_fields = ('slug',)
 
     def __str__(self):
         return self.name
@@ -108,19 +146,7 @@ class Product(models.Model):
     @property
     def is_on_sale(self):
         """Check if product is currently on sale"""
-        if not self.sale_price:
-            return False
-
-        now = timezone.now()
-        if self.sale_start and self.sale_end:
-            return self.sale_start <= now <= self.sale_end
-        elif self.sale_start and not self.sale_end:
-            return self.sale_start <= now
-        elif not self.sale_start and self.sale_end:
-            return now <= self.sale_end
-        else:
-            # If no dates set, consider it always on sale if sale_price exists
-            return True
+        return sale_in_effect(self.sale_price, self.sale_start, self.sale_end, timezone.now())
 
     @property
     def current_price(self):
@@ -173,15 +199,15 @@ class Product(models.Model):
             if should_have_tag and not has_on_sale_tag:
                 # Add the On Sale tag
                 self.tags.add(on_sale_tag)
-                print(f"✅ Added 'On Sale' tag to {self.name}")
+                logger.debug("Added On Sale tag to product %s", self.pk)
 
             elif not should_have_tag and has_on_sale_tag:
                 # Remove the On Sale tag
                 self.tags.remove(on_sale_tag)
-                print(f"✅ Removed 'On Sale' tag from {self.name}")
+                logger.debug("Removed On Sale tag from product %s", self.pk)
 
-        except Exception as e:
-            print(f"❌ Error updating On Sale tag for {self.name}: {e}")
+        except Exception:
+            logger.exception("Error updating On Sale tag for product %s", self.pk)
 
 
 def product_image_upload_path(instance, filename):
@@ -196,19 +222,34 @@ def product_image_upload_path(instance, filename):
     return f'products/{unique_filename}'
 
 
-class ProductImage(models.Model):
+class ProductImage(TrackedFieldsMixin, models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to=product_image_upload_path)
     alt_text = models.CharField(max_length=100, blank=True)
     is_primary = models.BooleanField(default=False)
     order = models.PositiveIntegerField(default=0)
 
+    tracked_fields = ('image',)
+
     class Meta:
         ordering = ['order', 'id']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['product'],
+                condition=models.Q(is_primary=True),
+                name='unique_primary_image_per_product',
+            ),
+        ]
 
     def __str__(self):
         return f"Image for {self.product.name}"
     
+    def validate_constraints(self, exclude=None):
+        # unique_primary_image_per_product is satisfied by save(), which demotes
+        # the previous primary image, so marking a new primary must not fail here.
+        exclude = set(exclude or ()) | {'product'}
+        super().validate_constraints(exclude=exclude)
+
     def clean(self):
         """Validate image before saving"""
         if self.image:
@@ -224,8 +265,8 @@ class ProductImage(models.Model):
         # Always validate (fast security checks)
         self.full_clean()
         
-        # Handle image optimization based on mode
-        if self.image:
+        # Handle image optimization based on mode (only for a newly uploaded image)
+        if self.image and self.has_changed('image'):
             from core.utils import optimize_image, optimize_image_async, optimize_image_storage
             optimization_mode = getattr(settings, 'IMAGE_OPTIMIZATION_MODE', 'storage')
             
@@ -241,19 +282,29 @@ class ProductImage(models.Model):
                     self.image = optimize_image_async(self.image, max_width=2000, max_height=2000, quality=85)
                 # If 'false' or any other value, no optimization
             except Exception as e:
-                print(f"⚠️ Failed to optimize image: {e}")
+                logger.warning("Failed to optimize product image: %s", e)
+
+        # A product has at most one primary image: demote the previous one first
+        if self.is_primary:
+            ProductImage.objects.filter(
+                product_id=self.product_id, is_primary=True
+            ).exclude(pk=self.pk).update(is_primary=False)
         
         super().save(*args, **kwargs)
 
 
-class ProductVariation(models.Model):
+class ProductVariation(TrackedFieldsMixin, models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='variations')
     sku = models.CharField(max_length=50, unique=True)
-    attributes = models.JSONField(default=dict)  # Default to empty dict
+    # Stored in canonical form (see products.attributes.canonicalize_attributes)
+    attributes = models.JSONField(default=dict, validators=[validate_variation_attributes])
     stock_quantity = models.PositiveIntegerField(default=0)
     price_modifier = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     is_active = models.BooleanField(default=True)
 
+    # Fields mirrored into ProductVariationAttribute
+    tracked_fields = ('attributes', 'is_active', 'product_id')
+
     def __str__(self):
         # More user-friendly display
         attrs = self.get_attributes_display()
@@ -266,14 +317,17 @@ class ProductVariation(models.Model):
         base_price = self.product.current_price or Decimal('0')
         return base_price + self.price_modifier
 
+    def save(self, *args, **kwargs):
+        if type(self.attributes) is not dict or self.has_changed('attributes'):
+            self.attributes = canonicalize_attributes(self.attributes)
+        reindex = bool(self.changed_fields)
+        super().save(*args, **kwargs)
+        if reindex:
+            sync_variation_attributes(self)
+
     def get_attributes_dict(self):
         """Safely get attributes as dictionary"""
-        if isinstance(self.attributes, dict):
-            return self.attributes
-        try:
-            return json.loads(self.attributes) if self.attributes else {}
-        except (json.JSONDecodeError, TypeError):
-            return {}
+        return parse_attributes(self.attributes)
 
     def get_attributes_display(self):
         """Get attributes as human-readable string"""
@@ -310,6 +364,31 @@ class ProductVariation(models.Model):
         self.attributes = attrs
 
 
+class ProductVariationAttribute(models.Model):
+    """
+    One normalized attribute of a variation (e.g. color=navy blue), kept in
+    sync with ProductVariation.attributes on save so attribute filters and
+    facets are index lookups instead of JSON scans. See products.attributes.
+    """
+    variation = models.ForeignKey(ProductVariation, on_delete=models.CASCADE, related_name='indexed_attributes')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    name = models.CharField(max_length=50)
+    value = models.CharField(max_length=100)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['variation', 'name'], name='unique_variation_attribute'),
+        ]
+        indexes = [
+            models.Index(fields=['name', 'value', 'is_active']),
+            models.Index(fields=['product', 'name']),
+        ]
+
+    def __str__(self):
+        return f"{self.name}={self.value}"
+
+
 class ProductFAQ(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='faqs')
     question = models.CharField(max_length=255)
@@ -322,3 +401,23 @@ class ProductFAQ(models.Model):
 
     def __str__(self):
         return f"FAQ: {self.question[:50]}"
+
+
+class ProductRelation(models.Model):
+    """
+    Precomputed "related products" for a product, top-K by score.
+    Rebuilt offline by the build_related_products command (see products.recommendations).
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='relations')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='unique_product_relation_rank'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} → {self.related_id} (#{self.rank})"
@@ -0,0 +1,169 @@
+"""
+values()-based read model for product cards.
+
+The product list is the hottest read path. For the default card shape (and
+any ?fields= subset of it) ProductList reads plain values() rows instead of
+model instances: one query for the page with the primary image joined in and
+one per taxonomy through the M2M through tables, with no model
+instantiation, descriptor access or per-card serializer calls. The cards are
+identical to ProductListSerializer's, which still serves ?expand= requests.
+"""
+from decimal import Decimal
+
+from django.utils import timezone
+from rest_framework import serializers
+
+from core.profiling import profile_phase
+
+from .models import Product, RoomCategory, sale_in_effect
+from .serializers import image_base_url
+
+READ_MODEL_FIELDS = frozenset({
+    'id', 'name', 'slug', 'description', 'current_price', 'is_on_sale', 'discount_percentage',
+    'primary_image', 'room_categories', 'product_types',
+})
+PRICE_FIELDS = frozenset({'current_price', 'is_on_sale', 'discount_percentage'})
+
+PRICE_COLUMNS = ('base_price', 'sale_price', 'sale_start', 'sale_end')
+IMAGE_COLUMNS = (
+    'primary_image_id', 'primary_image__image', 'primary_image__alt_text',
+    'primary_image__is_primary', 'primary_image__order',
+)
+
+# Same formatting as ProductListSerializer.current_price
+_price_field = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+
+
+def card_pricing(row, now):
+    """(is_on_sale, current_price, discount_percentage) as Product's properties compute them"""
+    base_price, sale_price = row['base_price'], row['sale_price']
+    on_sale = sale_in_effect(sale_price, row['sale_start'], row['sale_end'], now)
+    if on_sale and sale_price is not None:
+        current_price = sale_price
+    else:
+        current_price = base_price or Decimal('0')
+    discount = 0
+    if on_sale and sale_price and base_price > 0:
+        discount = round(((base_price - sale_price) / base_price) * 100, 1)
+    return on_sale, current_price, discount
+
+
+class ProductCardReadModel:
+    """Product cards (and their side-loaded taxonomies) for one list response"""
+
+    def __init__(self, fields, context):
+        self.fields = list(fields)
+        self.context = context
+        self.request = context.get('request')
+        self.room_categories = {}
+        self.product_types = {}
+
+    @staticmethod
+    def supports(fields):
+        return READ_MODEL_FIELDS.issuperset(fields)
+
+    def rows(self, queryset):
+        """The filtered, ordered product queryset narrowed to the columns the cards need"""
+        fields = set(self.fields)
+        columns = ['id'] + [name for name in ('name', 'slug', 'description') if name in fields]
+        if fields & PRICE_FIELDS:
+            columns.extend(PRICE_COLUMNS)
+        if 'primary_image' in fields:
+            columns.extend(IMAGE_COLUMNS)
+        return queryset.prefetch_related(None).values(*columns)
+
+    def _category_image_url(self, name):
+        if not name:
+            return None
+        url = RoomCategory._meta.get_field('image').storage.url(name)
+        return self.request.build_absolute_uri(url) if self.request else url
+
+    def _load_taxonomy(self, relation, product_ids, detail_columns, included, build):
+        """{product_id: [slim refs]} for one M2M relation, filling ``included`` with full details"""
+        m2m = Product._meta.get_field(relation)
+        through = m2m.remote_field.through
+        target = m2m.m2m_reverse_field_name()
+        # Same order as the prefetched relation: the target model's default ordering
+        ordering = [f'{target}__{name}' for name in m2m.related_model._meta.ordering]
+        columns = ['product_id', f'{target}_id', f'{target}__slug', f'{target}__name']
+        columns += [f'{target}__{column}' for column in detail_columns]
+
+        refs = {}
+        rows = through.objects.filter(product_id__in=product_ids).order_by(*ordering).values_list(*columns)
+        for product_id, object_id, slug, name, *details in rows:
+            refs.setdefault(product_id, []).append({'id': object_id, 'slug': slug, 'name': name})
+            if object_id not in included:
+                included[object_id] = build(object_id, slug, name, *details)
+        return refs
+
+    @profile_phase('serialize')
+    def render(self, rows):
+        rows = list(rows)
+        fields = self.fields
+        product_ids = [row['id'] for row in rows]
+
+        room_refs = type_refs = None
+        if 'room_categories' in fields:
+            room_refs = self._load_taxonomy(
+                'room_categories', product_ids, ('description', 'image', 'is_active', 'order'), self.room_categories,
+                lambda object_id, slug, name, description, image, is_active, order: {
+                    'id': object_id, 'slug': slug, 'name': name, 'description': description,
+                    'image': self._category_image_url(image), 'is_active': is_active, 'order': order,
+                },
+            )
+        if 'product_types' in fields:
+            type_refs = self._load_taxonomy(
+                'product_types', product_ids, ('description', 'icon', 'is_active', 'order'), self.product_types,
+                lambda object_id, slug, name, description, icon, is_active, order: {
+                    'id': object_id, 'slug': slug, 'name': name, 'description': description, 'icon': icon,
+                    'is_active': is_active, 'order': order,
+                },
+            )
+
+        base_url = image_base_url(self.context) if 'primary_image' in fields else None
+        priced = bool(PRICE_FIELDS.intersection(fields))
+        now = timezone.now()
+        cards = []
+        for row in rows:
+            if priced:
+                on_sale, current_price, discount = card_pricing(row, now)
+            card = {}
+            for name in fields:
+                if name == 'current_price':
+                    card[name] = _price_field.to_representation(current_price)
+                elif name == 'is_on_sale':
+                    card[name] = on_sale
+                elif name == 'discount_percentage':
+                    card[name] = discount
+                elif name == 'primary_image':
+                    card[name] = self._primary_image(row, base_url)
+                elif name == 'room_categories':
+                    card[name] = room_refs.get(row['id'], [])
+                elif name == 'product_types':
+                    card[name] = type_refs.get(row['id'], [])
+                else:
+                    card[name] = row[name]
+            cards.append(card)
+        return cards
+
+    @staticmethod
+    def _primary_image(row, base_url):
+        image_id = row['primary_image_id']
+        if image_id is None:
+            return None
+        return {
+            'id': image_id,
+            'image': f"{base_url}{image_id}/" if row['primary_image__image'] else None,
+            'alt_text': row['primary_image__alt_text'],
+            'is_primary': row['primary_image__is_primary'],
+            'order': row['primary_image__order'],
+        }
+
+    def included(self):
+        """Side-loaded room categories / product types seen by render(), keyed by id"""
+        included = {}
+        if 'room_categories' in self.fields:
+            included['room_categories'] = self.room_categories
+        if 'product_types' in self.fields:
+            included['product_types'] = self.product_types
+        return included
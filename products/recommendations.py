@@ -0,0 +1,189 @@
+"""
+Offline item-to-item similarity for "related products".
+
+Each active product becomes a sparse feature vector:
+
+* catalogue features - room categories, product types and tags, IDF-weighted
+  so a tag every product carries (e.g. "On Sale") counts for little;
+* behaviour features - one column per order and per cart the product appears
+  in, so products bought or carted together score higher.
+
+Similarity is the cosine between those vectors. It is computed as a sparse
+X·Xᵀ through an inverted index (feature -> products), so only pairs that
+actually share a feature are ever touched, one product at a time so only its
+top-K neighbours are held in memory. They are written to ProductRelation in
+one transaction.
+"""
+import heapq
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+from django.db import transaction
+
+from .models import Product, ProductRelation
+
+DEFAULT_TOP_K = 12
+
+# Relative weight of each feature family
+FEATURE_WEIGHTS = {
+    'room': 1.0,
+    'type': 2.0,
+    'tag': 0.5,
+    'order': 3.0,
+    'cart': 1.5,
+}
+
+# Baskets larger than this are mostly noise (bulk/test orders) and cost O(n²) pairs
+MAX_BASKET_SIZE = 40
+
+
+@dataclass
+class RecommendationReport:
+    products: int = 0
+    features: int = 0
+    pairs: int = 0
+    relations: int = 0
+    feature_counts: dict = field(default_factory=dict)
+
+    def as_dict(self):
+        return {
+            'products': self.products,
+            'features': self.features,
+            'pairs': self.pairs,
+            'relations': self.relations,
+            'feature_counts': self.feature_counts,
+        }
+
+
+def _catalogue_postings(product_ids):
+    """(feature, product_id) pairs from the M2M through tables"""
+    through_tables = {
+        'room': (Product.room_categories.through, 'roomcategory_id'),
+        'type': (Product.product_types.through, 'producttype_id'),
+        'tag': (Product.tags.through, 'tag_id'),
+    }
+    for family, (through, column) in through_tables.items():
+        rows = through.objects.filter(product_id__in=product_ids).values_list(column, 'product_id')
+        for value, product_id in rows.iterator(chunk_size=5000):
+            yield (family, value), product_id
+
+
+def _basket_postings(product_ids):
+    """(feature, product_id) pairs for orders and carts containing the product"""
+    from cart.models import CartItem
+    from orders.models import OrderItem
+
+    baskets = {
+        'order': OrderItem.objects.filter(variation__product_id__in=product_ids)
+                 .values_list('order_id', 'variation__product_id'),
+        'cart': CartItem.objects.filter(variation__product_id__in=product_ids)
+                .values_list('cart_id', 'variation__product_id'),
+    }
+    for family, rows in baskets.items():
+        for basket_id, product_id in rows.iterator(chunk_size=5000):
+            yield (family, basket_id), product_id
+
+
+def build_feature_index(product_ids):
+    """
+    Inverted index {feature: {product_id: weight}} with IDF and family weights
+    applied. Features shared by a single product are dropped: they cannot
+    relate two products.
+
+    ``product_ids`` is a queryset of active product ids, used as a subquery so
+    the catalogue size never hits a bound-parameter limit.
+    """
+    postings = defaultdict(set)
+    for source in (_catalogue_postings(product_ids), _basket_postings(product_ids)):
+        for feature, product_id in source:
+            postings[feature].add(product_id)
+
+    total = max(len(product_ids), 1)
+    index = {}
+    for feature, members in postings.items():
+        family = feature[0]
+        if len(members) < 2:
+            continue
+        if family in ('order', 'cart') and len(members) > MAX_BASKET_SIZE:
+            continue
+        idf = math.log(1 + total / len(members))
+        weight = FEATURE_WEIGHTS[family] * idf
+        index[feature] = {product_id: weight for product_id in members}
+    return index
+
+
+def nearest_neighbours(index, k):
+    """
+    Cosine top-k per product: {product_id: [(other_id, score), ...]} best
+    first, ties broken by id for stable output, plus the number of similar pairs.
+
+    X·Xᵀ is accumulated one product row at a time and only its k best entries
+    are kept, so memory stays O(products × k) even when a room category or
+    tag is shared by thousands of products (its n² pairs are still visited,
+    but never stored).
+    """
+    features_of = defaultdict(list)
+    squares = defaultdict(float)
+    for members in index.values():
+        for product_id, weight in members.items():
+            features_of[product_id].append((weight, members))
+            squares[product_id] += weight * weight
+    norms = {product_id: math.sqrt(square) for product_id, square in squares.items()}
+
+    neighbours = {}
+    pairs = 0
+    for product_id, features in features_of.items():
+        dot = defaultdict(float)
+        for weight, members in features:
+            for other, other_weight in members.items():
+                dot[other] += weight * other_weight
+        del dot[product_id]
+        if not dot:
+            continue
+        pairs += len(dot)
+        norm = norms[product_id]
+        best = heapq.nsmallest(k, ((-value / (norm * norms[other]), other) for other, value in dot.items()))
+        neighbours[product_id] = [(other, -score) for score, other in best]
+    return neighbours, pairs // 2
+
+
+def related_relations():
+    """
+    ProductRelation rows ready to serve: active neighbours only, in rank order,
+    with the neighbour product joined in the same query.
+    """
+    return (
+        ProductRelation.objects
+        .filter(related__is_active=True)
+        .select_related('related__primary_image')
+        .order_by('rank')
+    )
+
+
+def build_related_products(k=DEFAULT_TOP_K, dry_run=False):
+    """Recompute ProductRelation for all active products"""
+    report = RecommendationReport()
+    product_ids = Product.objects.filter(is_active=True).values('id')
+    report.products = len(product_ids)
+
+    index = build_feature_index(product_ids)
+    report.features = len(index)
+    for family, _ in index:
+        report.feature_counts[family] = report.feature_counts.get(family, 0) + 1
+
+    neighbours, report.pairs = nearest_neighbours(index, k)
+
+    relations = [
+        ProductRelation(product_id=product_id, related_id=related_id, rank=rank, score=round(score, 6))
+        for product_id, ranked in neighbours.items()
+        for rank, (related_id, score) in enumerate(ranked, start=1)
+    ]
+    report.relations = len(relations)
+
+    if not dry_run:
+        with transaction.atomic():
+            ProductRelation.objects.all().delete()
+            ProductRelation.objects.bulk_create(relations, batch_size=1000)
+
+    return report
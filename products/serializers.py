@@ -1,8 +1,14 @@
 from rest_framework import serializers
 from .models import RoomCategory, ProductType, Tag, Product, ProductImage, ProductVariation, ProductFAQ
+from .attributes import parse_attributes
+from core.compiled import CompiledSerializerMixin
+from core.fieldsets import SparseFieldsetMixin
 
+# Related products shown on a product page
+RELATED_PRODUCTS_LIMIT = 8
 
-class RoomCategorySerializer(serializers.ModelSerializer):
+
+class RoomCategorySerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     product_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -10,10 +16,14 @@ class RoomCategorySerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'slug', 'description', 'image', 'is_active', 'order', 'product_count']
 
     def get_product_count(self, obj):
+        # Annotated by the product detail queryset; counted per category otherwise
+        count = getattr(obj, 'active_product_count', None)
+        if count is not None:
+            return count
         return obj.products.filter(is_active=True).count()
 
 
-class ProductTypeSerializer(serializers.ModelSerializer):
+class ProductTypeSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     product_count = serializers.SerializerMethodField()
 
     class Meta:
@@ -22,6 +32,10 @@ class ProductTypeSerializer(serializers.ModelSerializer):
 
     def get_product_count(self, obj):
         """Get product count, filtered by room category if provided in context"""
+        count = getattr(obj, 'active_product_count', None)
+        if count is not None:
+            return count
+
         queryset = obj.products.filter(is_active=True)
         
         # Check if room_category filter is in request context
@@ -43,13 +57,13 @@ class ProductTypeSerializer(serializers.ModelSerializer):
         return queryset.count()
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ['id', 'name', 'slug', 'color_code']
 
 
-class ProductImageSerializer(serializers.ModelSerializer):
+class ProductImageSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     image = serializers.SerializerMethodField()
 
     class Meta:
@@ -65,32 +79,88 @@ class ProductImageSerializer(serializers.ModelSerializer):
         return None
 
 
-class ProductVariationSerializer(serializers.ModelSerializer):
+class VariationAttributesField(serializers.Field):
+    """
+    Read-only variation attributes. Rows are stored as canonical dicts
+    (see products.attributes), so the common case is returned as-is; only a
+    legacy string value is parsed.
+    """
+
+    def __init__(self, exclude=(), **kwargs):
+        kwargs['read_only'] = True
+        self.exclude = frozenset(exclude)
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        if type(value) is not dict:
+            value = parse_attributes(value)
+        if self.exclude:
+            return {key: item for key, item in value.items() if key not in self.exclude}
+        return value
+
+
+class ProductVariationSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    attributes = serializers.SerializerMethodField()
+    attributes = VariationAttributesField()
 
     class Meta:
         model = ProductVariation
         fields = ['id', 'sku', 'attributes', 'stock_quantity', 'price_modifier', 'price', 'is_active']
 
-    def get_attributes(self, obj):
-        """Safely parse attributes from JSON string or return as dict"""
-        if isinstance(obj.attributes, dict):
-            return obj.attributes
-        try:
-            import json
-            return json.loads(obj.attributes) if obj.attributes else {}
-        except (json.JSONDecodeError, TypeError):
-            return {}
 
-
-class ProductFAQSerializer(serializers.ModelSerializer):
+class ProductFAQSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductFAQ
         fields = ['id', 'question', 'answer', 'order']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+def image_base_url(context):
+    """Image endpoint prefix, computed once per serializer context"""
+    base_url = context.get('image_base_url')
+    if base_url is None:
+        from core.utils import get_image_base_url
+        base_url = context['image_base_url'] = get_image_base_url(context.get('request'))
+    return base_url
+
+
+def primary_image_data(product, context):
+    """
+    The product's primary image from the Product.primary_image pointer (use
+    select_related('primary_image')), in the same shape as ProductImageSerializer.
+    """
+    image = product.primary_image
+    if image is None:
+        return None
+
+    return {
+        'id': image.id,
+        'image': f"{image_base_url(context)}{image.id}/" if image.image else None,
+        'alt_text': image.alt_text,
+        'is_primary': image.is_primary,
+        'order': image.order,
+    }
+
+
+def taxonomy_ref(obj):
+    """Slim reference to a room category or product type"""
+    return {'id': obj.id, 'slug': obj.slug, 'name': obj.name}
+
+
+class RelatedProductSerializer(CompiledSerializerMixin, serializers.ModelSerializer):
+    """Slim product card used for recommendations"""
+    current_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    is_on_sale = serializers.BooleanField(read_only=True)
+    primary_image = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Product
+        fields = ['id', 'name', 'slug', 'current_price', 'is_on_sale', 'primary_image']
+
+    def get_primary_image(self, obj):
+        return primary_image_data(obj, self.context)
+
+
+class ProductSerializer(SparseFieldsetMixin, CompiledSerializerMixin, serializers.ModelSerializer):
     room_categories = RoomCategorySerializer(many=True, read_only=True)
     product_types = ProductTypeSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
@@ -100,10 +170,11 @@ class ProductSerializer(serializers.ModelSerializer):
     is_on_sale = serializers.BooleanField(read_only=True)
     discount_percentage = serializers.SerializerMethodField()
     faqs = serializers.SerializerMethodField()
+    related_products = serializers.SerializerMethodField()
 
     def get_images(self, obj):
-        """Return all images ordered by order field, then by id"""
-        images = obj.images.all().order_by('order', 'id')
+        """Return all images ordered by order field, then by id (ProductImage's default ordering)"""
+        images = obj.images.all()
         serializer = ProductImageSerializer(images, many=True, context=self.context)
         
         # Add metadata to help frontend with gallery display
@@ -126,49 +197,65 @@ class ProductSerializer(serializers.ModelSerializer):
             'id', 'name', 'slug', 'description', 'base_price', 'sale_price',
             'sale_start', 'sale_end', 'current_price', 'is_on_sale', 'discount_percentage',
             'room_categories', 'product_types', 'tags', 'images', 'variations', 'faqs',
-            'is_active', 'created_at', 'updated_at'
+            'related_products', 'is_active', 'created_at', 'updated_at'
         ]
 
     def get_discount_percentage(self, obj):
         return obj.discount_percentage
 
     def get_faqs(self, obj):
-        active_faqs = obj.faqs.filter(is_active=True).order_by('order', 'id')
+        # Prefetched into active_faqs by the product detail view
+        active_faqs = getattr(obj, 'active_faqs', None)
+        if active_faqs is None:
+            active_faqs = obj.faqs.filter(is_active=True).order_by('order', 'id')
         serializer = ProductFAQSerializer(active_faqs, many=True)
         return serializer.data
 
-
-class ProductListSerializer(serializers.ModelSerializer):
+    def get_related_products(self, obj):
+        relations = getattr(obj, 'top_relations', None)
+        if relations is None:
+            from .recommendations import related_relations
+            relations = related_relations().filter(product=obj)
+        related = [relation.related for relation in relations[:RELATED_PRODUCTS_LIMIT]]
+        return RelatedProductSerializer(related, many=True, context=self.context).data
+
+
+class ProductListSerializer(SparseFieldsetMixin, serializers.Serializer):
+    """
+    Read-only product card for list pages, built directly as a dict. Room
+    categories and product types are slim {id, slug, name} references; their
+    full details are side-loaded once per page by ProductListPagination, or
+    embedded in the references when the list is not paginated.
+    Description, tags, images and variations are only rendered via ?expand=.
+    """
     current_price = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
-    is_on_sale = serializers.BooleanField(read_only=True)
-    discount_percentage = serializers.SerializerMethodField()
-    primary_image = serializers.SerializerMethodField()
-    room_categories = RoomCategorySerializer(many=True, read_only=True)
-    product_types = ProductTypeSerializer(many=True, read_only=True)
+
+    expandable_fields = ('description', 'tags', 'images', 'variations')
 
     class Meta:
-        model = Product
         fields = [
-            'id', 'name', 'slug', 'current_price', 'is_on_sale', 'discount_percentage',
-            'primary_image', 'room_categories', 'product_types'
+            'id', 'name', 'slug', 'description', 'current_price', 'is_on_sale', 'discount_percentage',
+            'primary_image', 'room_categories', 'product_types', 'tags', 'images', 'variations',
         ]
 
-    def get_discount_percentage(self, obj):
-        return obj.discount_percentage
-
-    def get_primary_image(self, obj):
-        # Use prefetched images to avoid N+1 queries
-        images = obj.images.all()  # Uses prefetch_related from view
-        
-        # Find primary image in Python (no new query)
-        for img in images:
-            if img.is_primary:
-                serializer = ProductImageSerializer(img, context=self.context)
-                return serializer.data
-        
-        # Fallback to first image
-        if images:
-            serializer = ProductImageSerializer(images[0], context=self.context)
-            return serializer.data
-        
-        return None
+    def to_representation(self, obj):
+        fields = self.rendered_fields
+        data = {}
+        for name in fields:
+            if name == 'current_price':
+                data[name] = self.fields['current_price'].to_representation(obj.current_price)
+            elif name == 'primary_image':
+                data[name] = primary_image_data(obj, self.context)
+            elif name == 'room_categories':
+                data[name] = [taxonomy_ref(category) for category in obj.room_categories.all()]
+            elif name == 'product_types':
+                data[name] = [taxonomy_ref(product_type) for product_type in obj.product_types.all()]
+            elif name == 'tags':
+                data[name] = TagSerializer(obj.tags.all(), many=True).data
+            elif name == 'images':
+                data[name] = ProductImageSerializer(obj.images.all(), many=True, context=self.context).data
+            elif name == 'variations':
+                data[name] = ProductVariationSerializer(obj.variations.all(), many=True).data
+            else:
+                data[name] = getattr(obj, name)
+        return data
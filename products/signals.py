@@ -1,8 +1,34 @@
-from django.db.models.signals import post_delete, pre_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
-from .models import ProductImage
+from .models import Product, ProductImage
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
+
+def refresh_primary_image(product_id):
+    """Point Product.primary_image at the primary-flagged image, else the first one"""
+    image_id = (
+        ProductImage.objects.filter(product_id=product_id)
+        .order_by('-is_primary', 'order', 'id')
+        .values_list('id', flat=True)
+        .first()
+    )
+    # update() rather than save(): no timestamps or On Sale tag work for a pointer change
+    Product.objects.filter(pk=product_id).exclude(primary_image_id=image_id).update(primary_image_id=image_id)
+
+
+@receiver(post_save, sender=ProductImage)
+def update_primary_image_on_save(sender, instance, **kwargs):
+    refresh_primary_image(instance.product_id)
+
+
+@receiver(post_delete, sender=ProductImage)
+def update_primary_image_on_delete(sender, instance, **kwargs):
+    refresh_primary_image(instance.product_id)
+
+
 # Temporarily disable signals to debug upload issues
 DISABLE_SIGNALS = True
 
@@ -19,11 +45,11 @@ if not DISABLE_SIGNALS:
             
             if os.path.isfile(full_path):
                 os.remove(full_path)
-                print(f"🗑️  Deleted image file: {full_path}")
+                logger.debug("Deleted image file %s", full_path)
             else:
-                print(f"⚠️  Image file not found: {full_path}")
+                logger.warning("Image file not found: %s", full_path)
         except Exception as e:
-            print(f"❌ Error deleting image file: {e}")
+            logger.error("Error deleting image file: %s", e)
             # Don't raise the exception - just log it
 
 
@@ -47,10 +73,10 @@ if not DISABLE_SIGNALS:
                 
                 if os.path.isfile(full_path):
                     os.remove(full_path)
-                    print(f"🗑️  Deleted old image file: {full_path}")
+                    logger.debug("Deleted old image file %s", full_path)
                 else:
-                    print(f"⚠️  Old image file not found: {full_path}")
+                    logger.warning("Old image file not found: %s", full_path)
             except Exception as e:
-                print(f"❌ Error deleting old image file: {e}")
+                logger.error("Error deleting old image file: %s", e)
                 # Don't raise the exception - just log it
 
@@ -12,6 +12,8 @@ urlpatterns = [
     path('tags/', views.TagList.as_view(), name='tag-list'),
     # Mount list/detail at base so final URLs are /api/products/ and /api/products/<slug>/
     path('', views.ProductList.as_view(), name='product-list'),
+    path('facets/', views.ProductFacets.as_view(), name='product-facets'),
     path('<slug:slug>/', views.ProductDetail.as_view(), name='product-detail'),
     path('<slug:slug>/images/', views.product_images, name='product-images'),
+    path('<slug:slug>/related/', views.product_related, name='product-related'),
 ]
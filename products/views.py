@@ -1,20 +1,28 @@
 from rest_framework import generics, filters, status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
-from django.http import HttpResponse
+from asgiref.sync import sync_to_async
+from django.http import HttpResponseNotAllowed, StreamingHttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from django_filters import FilterSet, CharFilter
-from django.db.models import Q
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.shortcuts import get_object_or_404
 from django.conf import settings
 from decimal import Decimal
 from xml.sax.saxutils import escape
-from .models import RoomCategory, ProductType, Tag, Product, ProductImage
+from .models import RoomCategory, ProductType, Tag, Product, ProductImage, ProductFAQ
 from .serializers import (
     RoomCategorySerializer, ProductTypeSerializer, TagSerializer,
-    ProductSerializer, ProductListSerializer, ProductImageSerializer
+    ProductSerializer, ProductListSerializer, ProductImageSerializer,
+    RelatedProductSerializer, RELATED_PRODUCTS_LIMIT
 )
+from .read_models import ProductCardReadModel
+from .recommendations import DEFAULT_TOP_K, related_relations
+from .attributes import attribute_facets, attribute_selections, filter_by_attributes
+from core.fieldsets import SparseFieldsetViewMixin
+from core.pagination import OptionalPageNumberPagination
 from core.permissions import IsAdminOrReadOnly
 
 
@@ -100,14 +108,163 @@ class TagList(generics.ListCreateAPIView):
     ordering = ['name']
 
 
-class ProductList(generics.ListAPIView):
+class ProductListPagination(OptionalPageNumberPagination):
+    """
+    Paginated product lists side-load each room category and product type used
+    on the page once, keyed by id, next to the slim references on the cards.
+    Only relations the cards actually render (see ?fields=) are side-loaded.
+    Unpaginated lists embed those details in the cards instead (ProductList.list).
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.view = view
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        response.data['included'] = self.view.get_included(self.page.object_list)
+        return response
+
+
+def embed_included(cards, included):
+    """Replace the slim taxonomy references on ``cards`` with their full entries from ``included``"""
+    for relation, details in included.items():
+        for card in cards:
+            card[relation] = [details[ref['id']] for ref in card[relation]]
+    return cards
+
+
+def active_product_count(relation, products=None):
+    """
+    Correlated subquery counting the active products of the outer room
+    category / product type (a Count() over the join would only see the
+    products the prefetch is filtered on).
+    """
+    products = Product.objects.all() if products is None else products
+    counts = (
+        products.filter(is_active=True, **{relation: OuterRef('pk')})
+        .order_by()
+        .values(relation)
+        .annotate(count=Count('id', distinct=True))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def plan_product_queryset(queryset, fields, with_counts=False, room_category=None):
+    """
+    Join/prefetch only the relations that will be rendered (``fields`` as
+    resolved from ?fields= / ?expand=) and defer the description when it is not.
+
+    ``with_counts`` annotates room categories and product types with their
+    active product count (product types within ``room_category`` if given),
+    as rendered by the full category serializers on the detail page.
+    """
+    fields = set(fields)
+    if 'description' not in fields:
+        queryset = queryset.defer('description')
+    if 'primary_image' in fields:
+        queryset = queryset.select_related('primary_image')
+
+    prefetches = [name for name in ('tags', 'images', 'variations') if name in fields]
+    if 'faqs' in fields:
+        prefetches.append(Prefetch(
+            'faqs',
+            queryset=ProductFAQ.objects.filter(is_active=True).order_by('order', 'id'),
+            to_attr='active_faqs',
+        ))
+    if 'related_products' in fields:
+        prefetches.append(Prefetch('relations', queryset=related_relations(), to_attr='top_relations'))
+    prefetches.extend(
+        name for name in ('room_categories', 'product_types')
+        if name in fields and not with_counts
+    )
+    if with_counts:
+        if 'room_categories' in fields:
+            prefetches.append(Prefetch('room_categories', queryset=RoomCategory.objects.annotate(
+                active_product_count=active_product_count('room_categories')
+            )))
+        if 'product_types' in fields:
+            products = Product.objects.filter(room_categories__slug=room_category) if room_category else None
+            prefetches.append(Prefetch('product_types', queryset=ProductType.objects.annotate(
+                active_product_count=active_product_count('product_types', products)
+            )))
+    return queryset.prefetch_related(*prefetches)
+
+
+class ProductList(SparseFieldsetViewMixin, generics.ListAPIView):
     serializer_class = ProductListSerializer
+    pagination_class = ProductListPagination
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ProductFilterSet
     search_fields = ['name', 'description', 'tags__name']
     ordering_fields = ['name', 'base_price', 'created_at']
     ordering = ['-created_at']
     lookup_field = 'slug'
+    apply_attribute_filters = True
+    # Serve card shapes it supports from values() rows (see products.read_models)
+    use_read_model = True
+    read_model = None
+
+    def list(self, request, *args, **kwargs):
+        fields = self.get_rendered_fields()
+        if self.use_read_model and ProductCardReadModel.supports(fields):
+            self.read_model = ProductCardReadModel(fields, self.get_serializer_context())
+            rows = self.read_model.rows(self.filter_queryset(self.get_queryset()))
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response(self.read_model.render(page))
+            cards = self.read_model.render(rows)
+            products = None
+        else:
+            queryset = self.filter_queryset(self.get_queryset())
+            page = self.paginate_queryset(queryset)
+            if page is not None:
+                return self.get_paginated_response(self.get_serializer(page, many=True).data)
+            products = list(queryset)
+            cards = self.get_serializer(products, many=True).data
+
+        # A plain list has nowhere to put 'included', so the cards carry the
+        # full room category / product type details themselves
+        return Response(embed_included(cards, self.get_included(products)))
+
+    def get_included(self, products):
+        """Full room categories / product types referenced by the page's cards, keyed by id"""
+        if self.read_model is not None:
+            return self.read_model.included()
+
+        request = self.request
+        rendered = self.get_rendered_fields()
+        included = {}
+        if 'room_categories' in rendered:
+            room_categories = included['room_categories'] = {}
+            for product in products:
+                for category in product.room_categories.all():
+                    if category.id not in room_categories:
+                        room_categories[category.id] = {
+                            'id': category.id,
+                            'slug': category.slug,
+                            'name': category.name,
+                            'description': category.description,
+                            'image': request.build_absolute_uri(category.image.url) if category.image else None,
+                            'is_active': category.is_active,
+                            'order': category.order,
+                        }
+        if 'product_types' in rendered:
+            product_types = included['product_types'] = {}
+            for product in products:
+                for product_type in product.product_types.all():
+                    if product_type.id not in product_types:
+                        product_types[product_type.id] = {
+                            'id': product_type.id,
+                            'slug': product_type.slug,
+                            'name': product_type.name,
+                            'description': product_type.description,
+                            'icon': product_type.icon,
+                            'is_active': product_type.is_active,
+                            'order': product_type.order,
+                        }
+        return included
 
     def get_serializer_context(self):
         """Ensure request context is passed to serializers"""
@@ -116,7 +273,7 @@ class ProductList(generics.ListAPIView):
         return context
 
     def get_queryset(self):
-        queryset = Product.objects.filter(is_active=True).prefetch_related('images', 'variations')
+        queryset = plan_product_queryset(Product.objects.filter(is_active=True), self.get_rendered_fields())
 
         # Search functionality
         search = self.request.query_params.get('search', None)
@@ -153,6 +310,11 @@ class ProductList(generics.ListAPIView):
         if max_price:
             queryset = queryset.filter(base_price__lte=max_price)
 
+        # Variation attribute filters (?color=, ?material=, ?size=, comma-separated),
+        # answered from the ProductVariationAttribute index
+        if self.apply_attribute_filters:
+            queryset = filter_by_attributes(queryset, attribute_selections(self.request.query_params))
+
         # Sort by price
         sort_by = self.request.query_params.get('sort', None)
         if sort_by == 'price_low':
@@ -170,11 +332,35 @@ class ProductList(generics.ListAPIView):
         return queryset
 
 
-class ProductDetail(generics.RetrieveAPIView):
-    queryset = Product.objects.filter(is_active=True).prefetch_related('faqs', 'images', 'variations', 'room_categories', 'product_types')
+class ProductFacets(ProductList):
+    """
+    Product counts per color/material/size for the products matching the same
+    filters as the product list. Each attribute's counts ignore its own
+    selection so sibling values stay visible.
+    """
+    apply_attribute_filters = False
+
+    def list(self, request, *args, **kwargs):
+        selections = attribute_selections(request.query_params)
+        queryset = self.filter_queryset(self.get_queryset())
+        return Response({
+            'total': filter_by_attributes(queryset, selections).count(),
+            'attributes': attribute_facets(queryset, selections),
+        })
+
+
+class ProductDetail(SparseFieldsetViewMixin, generics.RetrieveAPIView):
     serializer_class = ProductSerializer
     lookup_field = 'slug'
 
+    def get_queryset(self):
+        return plan_product_queryset(
+            Product.objects.filter(is_active=True),
+            self.get_rendered_fields(),
+            with_counts=True,
+            room_category=self.request.query_params.get('room_category'),
+        )
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['request'] = self.request
@@ -214,15 +400,88 @@ def product_images(request, slug):
 
 
 @api_view(['GET'])
-def merchant_feed(request):
+def product_related(request, slug):
+    """
+    Precomputed related products for a product (see products.recommendations).
+    Optional ?limit= (default 8, at most the number of stored neighbours).
+    """
+    try:
+        limit = int(request.query_params.get('limit', RELATED_PRODUCTS_LIMIT))
+    except ValueError:
+        limit = RELATED_PRODUCTS_LIMIT
+    limit = max(1, min(limit, DEFAULT_TOP_K))
+
+    relations = list(
+        related_relations().filter(product__slug=slug, product__is_active=True)[:limit]
+    )
+    if not relations:
+        # Only hit the products table again to tell "unknown product" from "no recommendations yet"
+        get_object_or_404(Product, slug=slug, is_active=True)
+
+    related = [relation.related for relation in relations]
+    return Response({
+        'slug': slug,
+        'results': RelatedProductSerializer(related, many=True, context={'request': request}).data,
+    })
+
+
+MERCHANT_FEED_BATCH_SIZE = 1000
+
+
+async def merchant_feed(request):
     """
     Google Merchant Center feed in RSS 2.0 format.
     Exposes active products and variants with stable ids and KES prices.
+
+    Streamed: products are read in batches and written out as they arrive,
+    so the first bytes go out at once and the whole feed is never held in
+    memory.
     """
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(['GET', 'HEAD'])
     site_url = getattr(settings, 'SITE_URL', 'https://sofahub.co.ke').rstrip('/')
-    products = Product.objects.filter(is_active=True).prefetch_related('images', 'variations')
+    return StreamingHttpResponse(
+        merchant_feed_xml(request, site_url), content_type='application/xml; charset=utf-8'
+    )
+
+
+async def merchant_feed_xml(request, site_url):
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n'
+        '  <channel>\n'
+        '    <title>SofaHub Product Feed</title>\n'
+        f'    <link>{escape(site_url)}</link>\n'
+        '    <description>Product feed for Google Merchant Center</description>\n'
+    )
     now = timezone.now()
+    last_id = 0
+    while last_id is not None:
+        chunk, last_id = await sync_to_async(merchant_feed_chunk)(request, site_url, now, last_id)
+        yield chunk
+    yield '  </channel>\n</rss>\n'
+
 
+def merchant_feed_chunk(request, site_url, now, after_id):
+    """
+    The <item>s of the next batch of products (by id) after ``after_id``, and
+    the id to continue after (None once the last batch is done)
+    """
+    products = list(
+        Product.objects.filter(is_active=True, id__gt=after_id)
+        .prefetch_related('variations').order_by('id')[:MERCHANT_FEED_BATCH_SIZE]
+    )
+    chunk = ''.join(
+        merchant_feed_item_xml(item) + '\n'
+        for product in products
+        for item in merchant_feed_items(request, product, site_url, now)
+    )
+    last_id = products[-1].id if len(products) == MERCHANT_FEED_BATCH_SIZE else None
+    return chunk, last_id
+
+
+def merchant_feed_items(request, product, site_url, now):
+    """Feed entries for one product: one per active variant, or one for the product itself"""
     def amount(value: Decimal) -> str:
         return f"{Decimal(value):.2f} KES"
 
@@ -233,101 +492,80 @@ def merchant_feed(request):
 
     def first_image_url(product):
         from core.utils import get_image_url
-        images = list(product.images.all())
-        selected = None
-        for image in images:
-            if image.is_primary:
-                selected = image
-                break
-        if not selected and images:
-            selected = images[0]
-        if not selected or not selected.image:
+        if not product.primary_image_id:
             return None
-        return get_image_url(selected.id, request)
+        return get_image_url(product.primary_image_id, request)
 
     def stock_to_availability(in_stock: bool):
         return 'in stock' if in_stock else 'out of stock'
 
     items = []
-    for product in products:
-        product_link = f"{site_url}/product/{product.slug}"
-        image_link = first_image_url(product)
-        variations = [v for v in product.variations.all() if v.is_active]
-        on_sale = product.is_on_sale and product.sale_price is not None
-        sale_effective = None
-        if on_sale:
-            start = product.sale_start if product.sale_start and product.sale_start <= now else now
-            end = product.sale_end
-            if end:
-                sale_effective = f"{to_iso(start)}/{to_iso(end)}"
-
-        if variations:
-            for variation in variations:
-                base_variant_price = product.base_price + variation.price_modifier
-                current_variant_price = product.current_price + variation.price_modifier
-                title = f"{product.name} ({variation.sku})"
-                items.append({
-                    'id': variation.sku,
-                    'item_group_id': str(product.id),
-                    'title': title,
-                    'description': product.description,
-                    'link': product_link,
-                    'image_link': image_link,
-                    'availability': stock_to_availability(variation.stock_quantity > 0),
-                    'price': amount(base_variant_price if on_sale else current_variant_price),
-                    'sale_price': amount(current_variant_price) if on_sale else None,
-                    'sale_effective_date': sale_effective,
-                    'condition': 'new',
-                    'brand': 'SofaHub',
-                })
-        else:
+    product_link = f"{site_url}/product/{product.slug}"
+    image_link = first_image_url(product)
+    variations = [v for v in product.variations.all() if v.is_active]
+    on_sale = product.is_on_sale and product.sale_price is not None
+    sale_effective = None
+    if on_sale:
+        start = product.sale_start if product.sale_start and product.sale_start <= now else now
+        end = product.sale_end
+        if end:
+            sale_effective = f"{to_iso(start)}/{to_iso(end)}"
+
+    if variations:
+        for variation in variations:
+            base_variant_price = product.base_price + variation.price_modifier
+            current_variant_price = product.current_price + variation.price_modifier
+            title = f"{product.name} ({variation.sku})"
             items.append({
-                'id': f"product-{product.id}",
+                'id': variation.sku,
                 'item_group_id': str(product.id),
-                'title': product.name,
+                'title': title,
                 'description': product.description,
                 'link': product_link,
                 'image_link': image_link,
-                'availability': stock_to_availability(True),
-                'price': amount(product.base_price if on_sale else product.current_price),
-                'sale_price': amount(product.current_price) if on_sale else None,
+                'availability': stock_to_availability(variation.stock_quantity > 0),
+                'price': amount(base_variant_price if on_sale else current_variant_price),
+                'sale_price': amount(current_variant_price) if on_sale else None,
                 'sale_effective_date': sale_effective,
                 'condition': 'new',
                 'brand': 'SofaHub',
             })
-
-    xml_items = []
-    for item in items:
-        lines = [
-            "    <item>",
-            f"      <g:id>{escape(item['id'])}</g:id>",
-            f"      <g:item_group_id>{escape(item['item_group_id'])}</g:item_group_id>",
-            f"      <title>{escape(item['title'])}</title>",
-            f"      <description>{escape(item['description'] or '')}</description>",
-            f"      <link>{escape(item['link'])}</link>",
-            f"      <g:availability>{escape(item['availability'])}</g:availability>",
-            f"      <g:price>{escape(item['price'])}</g:price>",
-            f"      <g:condition>{escape(item['condition'])}</g:condition>",
-            f"      <g:brand>{escape(item['brand'])}</g:brand>",
-        ]
-        if item.get('image_link'):
-            lines.append(f"      <g:image_link>{escape(item['image_link'])}</g:image_link>")
-        if item.get('sale_price'):
-            lines.append(f"      <g:sale_price>{escape(item['sale_price'])}</g:sale_price>")
-        if item.get('sale_effective_date'):
-            lines.append(f"      <g:sale_price_effective_date>{escape(item['sale_effective_date'])}</g:sale_price_effective_date>")
-        lines.append("    </item>")
-        xml_items.append("\n".join(lines))
-
-    xml = (
-        '<?xml version="1.0" encoding="UTF-8"?>\n'
-        '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n'
-        '  <channel>\n'
-        '    <title>SofaHub Product Feed</title>\n'
-        f'    <link>{escape(site_url)}</link>\n'
-        '    <description>Product feed for Google Merchant Center</description>\n'
-        f"{chr(10).join(xml_items)}\n"
-        '  </channel>\n'
-        '</rss>\n'
-    )
-    return HttpResponse(xml, content_type='application/xml; charset=utf-8')
+    else:
+        items.append({
+            'id': f"product-{product.id}",
+            'item_group_id': str(product.id),
+            'title': product.name,
+            'description': product.description,
+            'link': product_link,
+            'image_link': image_link,
+            'availability': stock_to_availability(True),
+            'price': amount(product.base_price if on_sale else product.current_price),
+            'sale_price': amount(product.current_price) if on_sale else None,
+            'sale_effective_date': sale_effective,
+            'condition': 'new',
+            'brand': 'SofaHub',
+        })
+    return items
+
+
+def merchant_feed_item_xml(item):
+    lines = [
+        "    <item>",
+        f"      <g:id>{escape(item['id'])}</g:id>",
+        f"      <g:item_group_id>{escape(item['item_group_id'])}</g:item_group_id>",
+        f"      <title>{escape(item['title'])}</title>",
+        f"      <description>{escape(item['description'] or '')}</description>",
+        f"      <link>{escape(item['link'])}</link>",
+        f"      <g:availability>{escape(item['availability'])}</g:availability>",
+        f"      <g:price>{escape(item['price'])}</g:price>",
+        f"      <g:condition>{escape(item['condition'])}</g:condition>",
+        f"      <g:brand>{escape(item['brand'])}</g:brand>",
+    ]
+    if item.get('image_link'):
+        lines.append(f"      <g:image_link>{escape(item['image_link'])}</g:image_link>")
+    if item.get('sale_price'):
+        lines.append(f"      <g:sale_price>{escape(item['sale_price'])}</g:sale_price>")
+    if item.get('sale_effective_date'):
+        lines.append(f"      <g:sale_price_effective_date>{escape(item['sale_effective_date'])}</g:sale_price_effective_date>")
+    lines.append("    </item>")
+    return "\n".join(lines)
@@ -2,6 +2,10 @@
 ASGI config for sofahub_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+This is what the Procfile serves (uvicorn): the I/O-bound views (image
+serving, checkout's M-Pesa step, the M-Pesa callback, the merchant feed) are
+async, so a slow gateway or disk ties up a coroutine rather than a worker.
+wsgi.py still works for sync-only servers.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
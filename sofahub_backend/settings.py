@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 import os
 from pathlib import Path
+from django.core.exceptions import ImproperlyConfigured
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
     'contact',
     'orders',
     'blog',
+    'notifications',
 
     #'mptt',
     #'drf_recursive',
@@ -62,9 +64,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.RequestProfilingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'core.middleware.StaticFilesMiddleware',  # WhiteNoise
+    'core.middleware.RedirectMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -100,10 +105,14 @@ WSGI_APPLICATION = 'sofahub_backend.wsgi.application'
 # Database configuration for Railway
 import dj_database_url
 
+# DB_CONN_MAX_AGE: seconds to keep a connection open between requests. The app is served
+# over ASGI (see Procfile), where Django 4.2 runs each request's sync work in a new executor
+# thread: a persistent connection opened there is never reused and stays open until garbage
+# collected, so keep 0 (close after every request) unless serving over WSGI.
 DATABASES = {
     'default': dj_database_url.config(
         default='sqlite:///db.sqlite3',
-        conn_max_age=600,
+        conn_max_age=int(os.getenv('DB_CONN_MAX_AGE', '0')),
         conn_health_checks=True,
     )
 }
@@ -169,6 +178,10 @@ STATICFILES_FINDERS = [
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
@@ -209,9 +222,96 @@ ENABLE_HEAVY_VALIDATION = os.getenv('ENABLE_HEAVY_VALIDATION', str(DEBUG)).lower
 
 
 
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Cache configuration
+# REDIS_URL: shared cache for all workers (e.g. redis://localhost:6379/0).
+# Without it each process uses its own in-memory cache, which needs no external services.
+REDIS_URL = os.getenv('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'sofahub',
+        }
+    }
+
+# Session storage
+# SESSION_BACKEND: 'cached_db' (cache in front of the DB, default with REDIS_URL), 'signed_cookies'
+# (no server-side storage), 'cache' (cache only) or 'db' (default without REDIS_URL).
+# 'cache' and 'cached_db' require REDIS_URL: the LocMemCache fallback is per worker, so a
+# logout on one worker would leave the session alive in the other workers' caches.
+SESSION_BACKENDS = {
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+    'cache': 'django.contrib.sessions.backends.cache',
+    'db': 'django.contrib.sessions.backends.db',
+}
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'cached_db' if REDIS_URL else 'db').lower()
+if SESSION_BACKEND in ('cache', 'cached_db') and not REDIS_URL:
+    raise ImproperlyConfigured(f"SESSION_BACKEND={SESSION_BACKEND} requires REDIS_URL; use 'db' instead")
+SESSION_ENGINE = SESSION_BACKENDS.get(SESSION_BACKEND, SESSION_BACKENDS['db'])
 SESSION_COOKIE_NAME = 'sofahub_session'
 
+# Request profiling (core.middleware.RequestProfilingMiddleware), off unless PROFILING_ENABLED=true
+# PROFILING_SAMPLE_RATE: fraction of requests that get Server-Timing headers and a profile log line
+# PROFILING_SLOW_MS: requests slower than this are logged as warnings
+# PROFILING_CPROFILE_RATE: fraction of requests run under cProfile (logged when slow)
+# PROFILING_CPROFILE_DIR: also save those profiles as .prof files here (empty: log only)
+# PROFILING_TOKEN: clients sending it in X-Profile-Token are always profiled, with cProfile
+PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() == 'true'
+PROFILING_SAMPLE_RATE = float(os.getenv('PROFILING_SAMPLE_RATE', '1.0'))
+PROFILING_SLOW_MS = float(os.getenv('PROFILING_SLOW_MS', '500'))
+PROFILING_CPROFILE_RATE = float(os.getenv('PROFILING_CPROFILE_RATE', '0.0'))
+PROFILING_CPROFILE_DIR = os.getenv('PROFILING_CPROFILE_DIR', '')
+PROFILING_TOKEN = os.getenv('PROFILING_TOKEN', '')
+
+# Metrics (core.metrics), scraped from /metrics
+# METRICS_TOKEN: scrapers send 'Authorization: Bearer <token>'; without it /metrics only answers in DEBUG
+# METRICS_DIR: shared directory for per-process snapshots; needed when running more than one worker
+# process so every scrape sees all of them. The Procfile / railway.json web command defaults it
+# to /tmp/sofahub-metrics; snapshots of exited processes are folded in and deleted by scrapes.
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+METRICS_FLUSH_SECONDS = float(os.getenv('METRICS_FLUSH_SECONDS', '5'))
+
+# Logging (core.logs): records are written by a background thread, never inline in a request
+# LOG_LEVEL: level for the project's own loggers; per-request detail is logged at DEBUG
+# LOG_FORMAT: 'json' (one object per line, for the log pipeline) or 'text'
+# LOG_DEBUG_SAMPLE_RATE: fraction of DEBUG records kept, so LOG_LEVEL=DEBUG is safe under load
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'DEBUG' if DEBUG else 'INFO').upper()
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'text' if DEBUG else 'json')
+LOG_DEBUG_SAMPLE_RATE = float(os.getenv('LOG_DEBUG_SAMPLE_RATE', '1.0' if DEBUG else '0.01'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'json': {'()': 'core.logs.JsonFormatter'},
+        'text': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'filters': {
+        'sample_debug': {'()': 'core.logs.SamplingFilter', 'rate': LOG_DEBUG_SAMPLE_RATE},
+    },
+    'handlers': {
+        'queue': {'()': 'core.logs.QueueHandler', 'formatter': LOG_FORMAT, 'filters': ['sample_debug']},
+    },
+    'root': {'handlers': ['queue'], 'level': 'WARNING'},
+    'loggers': {
+        'django': {'handlers': ['queue'], 'level': 'INFO', 'propagate': False},
+        'core.profiling': {'level': 'INFO'},
+        **{app: {'level': LOG_LEVEL} for app in (
+            'sofahub_backend', 'core', 'products', 'cart', 'orders', 'blog', 'contact', 'notifications',
+        )},
+    },
+}
+
 # Media files configuration
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -228,6 +328,9 @@ EMAIL_USE_TLS = True
 EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', 'sofahub68@gmail.com')
 EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
 DEFAULT_FROM_EMAIL = 'SofaHub <sofahub68@gmail.com>'
+# Seconds before an SMTP connect/send gives up; must stay well below
+# notifications.services.STALE_CLAIM_AFTER (10 minutes)
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', '30'))
 
 # M-Pesa Configuration
 MPESA_ENVIRONMENT = os.environ.get('MPESA_ENVIRONMENT', 'sandbox')
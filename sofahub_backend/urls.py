@@ -19,10 +19,7 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from core.media_views import serve_media, serve_product_image
-
-# Debug: Print when URLs are loaded
-print("🔧 DEBUG: Loading URL patterns...")
-print("🔧 DEBUG: serve_product_image function:", serve_product_image)
+from core.views import prometheus_metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -33,6 +30,7 @@ urlpatterns = [
     path('api/contact/', include('contact.urls')),
     path('api/blog/', include('blog.urls')),
     path('api/', include('core.urls')),
+    path('metrics', prometheus_metrics, name='metrics'),
 ]
 
 # Serve media files using custom view
@@ -40,6 +38,3 @@ urlpatterns += [
     path('media/<path:path>', serve_media, name='media'),
     path('api/images/<int:image_id>/', serve_product_image, name='product-image-by-id'),
 ]
-
-print("🔧 DEBUG: URL patterns loaded successfully")
-print("🔧 DEBUG: Total URL patterns:", len(urlpatterns))